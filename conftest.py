@@ -1,4 +1,7 @@
 """Global Configurations for py.test runner"""
+import sys
+
+from robottelo.config import settings
 
 pytest_plugins = [
     # Plugins
@@ -6,9 +9,19 @@ pytest_plugins = [
     "pytest_plugins.markers",
     "pytest_plugins.issue_handlers",
     "pytest_plugins.manual_skipped",
+    "pytest_plugins.lock_stats",
+    "pytest_plugins.settings_snapshot",
+    "pytest_plugins.vm_teardown",
     # Fixtures
     "pytest_fixtures.api_fixtures",
+    "pytest_fixtures.vm_fixtures",
     # Component Fixtures
     "pytest_fixtures.satellite_auth",
     "pytest_fixtures.templatesync_fixtures",
 ]
+
+
+def pytest_collection_finish(session):
+    """Configure AirGun only if the collected tests imported it"""
+    if 'airgun' in sys.modules:
+        settings.configure_airgun()
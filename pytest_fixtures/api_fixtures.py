@@ -4,8 +4,6 @@ import os
 import pytest
 from fauxfactory import gen_string
 from nailgun import entities
-from wrapanapi import AzureSystem
-from wrapanapi import GoogleCloudSystem
 
 from robottelo import ssh
 from robottelo.constants import AZURERM_RG_DEFAULT
@@ -204,6 +202,9 @@ def module_puppet_environment(module_org, module_location):
 
 @pytest.fixture(scope='session')
 def googleclient():
+    # the cloud SDKs are imported only by the tests using them
+    from wrapanapi import GoogleCloudSystem
+
     gceclient = GoogleCloudSystem(
         project=settings.gce.project_id,
         zone=settings.gce.zone,
@@ -349,6 +350,8 @@ def module_azurerm_custom_finishimg(default_architecture, default_os, module_azu
 @pytest.fixture(scope='session')
 def azurermclient(azurerm_settings):
     """ Connect to AzureRM using wrapanapi AzureSystem"""
+    from wrapanapi import AzureSystem
+
     azurermclient = AzureSystem(
         username=azurerm_settings['app_ident'],
         password=azurerm_settings['secret'],
@@ -0,0 +1,17 @@
+from pytest import fixture
+
+from robottelo.vm_pool import VirtualMachinePool
+
+
+@fixture(scope='session')
+def vm_pool():
+    """Warm pool of clean booted client virtual machines, see
+    :mod:`robottelo.vm_pool`::
+
+        def test_positive_register(vm_pool):
+            with vm_pool.lease(DISTRO_RHEL7) as vm:
+                ...
+    """
+    pool = VirtualMachinePool()
+    yield pool
+    pool.close()
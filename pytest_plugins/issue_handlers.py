@@ -1,7 +1,6 @@
 import inspect
 import json
 import logging
-import re
 from collections import defaultdict
 from datetime import datetime
 
@@ -13,12 +12,18 @@ from robottelo.utils.issue_handlers import add_workaround
 from robottelo.utils.issue_handlers import bugzilla
 from robottelo.utils.issue_handlers import is_open
 from robottelo.utils.issue_handlers import should_deselect
-from robottelo.utils.version import search_version_key
+from robottelo.utils.issue_handlers.bugzilla_cache import BugzillaCache
+from robottelo.utils.issue_handlers.bugzilla_cache import BZ_CACHE_TTL
+from robottelo.utils.metadata_index import docstring_metadata
+from robottelo.utils.metadata_index import is_open_usages
+from robottelo.utils.metadata_index import MetadataIndex
 from robottelo.utils.version import VersionEncoder
 
 LOGGER = logging.getLogger('issue_handlers_plugin')
 
 DEFAULT_BZ_CACHE_FILE = 'bz_cache.json'
+DEFAULT_BZ_CACHE_DB = 'bz_cache.sqlite'
+METADATA_INDEX_CACHE_DIR = 'metadata_index'
 
 
 def pytest_addoption(parser):
@@ -26,9 +31,16 @@ def pytest_addoption(parser):
     parser.addoption(
         "--bz-cache",
         action='store_true',
-        help=f"Use an existing {DEFAULT_BZ_CACHE_FILE} file instead of calling BZ API."
-        f"Without this flag a cache file will be created with the name {DEFAULT_BZ_CACHE_FILE}."
-        "This default cache file can be used on subsequent runs by including this flag",
+        help=f"Use the persistent BZ cache file {DEFAULT_BZ_CACHE_DB}, only the missing BZs and "
+        "the stale BZs changed since cached are loaded from BZ API. "
+        f"The issue collection is written to the file {DEFAULT_BZ_CACHE_FILE}.",
+    )
+    parser.addoption(
+        "--bz-cache-ttl",
+        type=int,
+        default=BZ_CACHE_TTL,
+        help="The time in seconds after which a cached BZ is revalidated with BZ API, "
+        f"default {BZ_CACHE_TTL}.",
     )
 
 
@@ -51,33 +63,37 @@ def pytest_collection_modifyitems(session, items, config):
             item.add_marker(pytest.mark.skipif(is_open(issue), reason=issue))
 
 
-IS_OPEN = re.compile(
-    # To match `if is_open('BZ:123456'):`
-    r"\s*if\sis_open\(\S(?P<src>\D{2})\s*:\s*(?P<num>\d*)\S\)\d*"
-)
-
-NOT_IS_OPEN = re.compile(
-    # To match `if not is_open('BZ:123456'):`
-    r"\s*if\snot\sis_open\(\S(?P<src>\D{2})\s*:\s*(?P<num>\d*)\S\)\d*"
-)
-
-COMPONENT = re.compile(
-    # To match :CaseComponent: FooBar
-    r"\s*:CaseComponent:\s*(?P<component>\S*)",
-    re.IGNORECASE,
-)
-
-IMPORTANCE = re.compile(
-    # To match :CaseImportance: Critical
-    r"\s*:CaseImportance:\s*(?P<importance>\S*)",
-    re.IGNORECASE,
-)
+def get_item_metadata(metadata_index, item):  # pragma: no cover
+    """Return the component, BZs, importance and `is_open` usages of item,
+    taken from its test module metadata index.
 
-BZ = re.compile(
-    # To match :BZ: 123456, 456789
-    r"\s*:BZ:\s*(?P<bz>.*\S*)",
-    re.IGNORECASE,
-)
+    The docstrings of module, class and function are searched top-down, the
+    objects not found in the index, as inherited or generated test functions,
+    are inspected.
+    """
+    module_index = metadata_index.get(item.module.__file__)
+    cls = getattr(item, 'cls', None)
+    function_metadata = module_index['functions'].get(item.function.__qualname__)
+    mod_cls_fun = [(module_index['module'], item.module)]
+    if cls is not None:
+        mod_cls_fun.append((module_index['classes'].get(cls.__qualname__), cls))
+    mod_cls_fun.append((function_metadata, item.function))
+
+    metadata = {'component': None, 'bz': None, 'importance': None}
+    for obj_metadata, obj in mod_cls_fun:
+        if obj_metadata is None or not obj_metadata['docstring']:
+            # inspect.getdoc also returns the docstring inherited from a base class
+            obj_metadata = docstring_metadata(inspect.getdoc(obj))
+        for name in metadata:
+            if obj_metadata[name]:
+                metadata[name] = obj_metadata[name]
+
+    if function_metadata is not None:
+        metadata.update(is_open=function_metadata['is_open'])
+        metadata.update(not_is_open=function_metadata['not_is_open'])
+    else:
+        metadata.update(is_open_usages(inspect.getsource(item.function)))
+    return metadata
 
 
 def generate_issue_collection(items, config):  # pragma: no cover
@@ -126,46 +142,32 @@ def generate_issue_collection(items, config):  # pragma: no cover
     valid_markers = ["skip_if_open", "skip", "deselect"]
     collected_data = defaultdict(lambda: {"data": {}, "used_in": []})
 
-    use_bz_cache = config.getvalue('bz_cache')  # use existing json cache?
+    use_bz_cache = config.getvalue('bz_cache')  # use the persistent BZ cache?
     cached_data = None
     if use_bz_cache:
-        try:
-            with open(DEFAULT_BZ_CACHE_FILE, 'r') as bz_cache_file:
-                LOGGER.info(f'Using BZ cache file for issue collection: {DEFAULT_BZ_CACHE_FILE}')
-                cached_data = {
-                    k: search_version_key(k, v) for k, v in json.load(bz_cache_file).items()
-                }
-        except FileNotFoundError:
-            # no bz cache file exists
-            LOGGER.warning(
-                f'--bz-cache option used, cache file [{DEFAULT_BZ_CACHE_FILE}] not found'
-            )
+        LOGGER.info(f'Using BZ cache file for issue collection: {DEFAULT_BZ_CACHE_DB}')
+        cached_data = BugzillaCache(DEFAULT_BZ_CACHE_DB, ttl=config.getvalue('bz_cache_ttl'))
 
     deselect_data = {}  # a local cache for deselected tests
 
+    # the test modules metadata, cached in pytest cache dir across runs and workers
+    cache_dir = None
+    if getattr(config, 'cache', None) is not None:
+        cache_dir = str(config.cache.makedir(METADATA_INDEX_CACHE_DIR))
+    metadata_index = MetadataIndex(cache_dir)
+
     test_modules = set()
 
     # --- Build the issue marked usage collection ---
     for item in items:
-        component = None
-        bzs = None
-        importance = None
-
         # register test module as processed
         test_modules.add(item.module)
 
         # Find matches from docstrings top-down from: module, class, function.
-        mod_cls_fun = (item.module, getattr(item, 'cls', None), item.function)
-        for docstring in [d for d in map(inspect.getdoc, mod_cls_fun) if d is not None]:
-            component_matches = COMPONENT.findall(docstring)
-            if component_matches:
-                component = component_matches[-1]
-            bz_matches = BZ.findall(docstring)
-            if bz_matches:
-                bzs = bz_matches[-1]
-            importance_matches = IMPORTANCE.findall(docstring)
-            if importance_matches:
-                importance = importance_matches[-1]
+        metadata = get_item_metadata(metadata_index, item)
+        component = metadata['component']
+        bzs = metadata['bz']
+        importance = metadata['importance']
 
         filepath, lineno, testcase = item.location
         component_mark = slugify_component(component, False) if component is not None else None
@@ -191,8 +193,7 @@ def generate_issue_collection(items, config):  # pragma: no cover
                 item.add_marker(getattr(pytest.mark, issue_key.replace(':', '_')))
 
         # Then take the workarounds using `is_open` helper.
-        source = inspect.getsource(item.function)
-        if 'is_open(' in source:
+        if metadata['is_open'] or metadata['not_is_open']:
             kwargs = {
                 'filepath': filepath,
                 'lineno': lineno,
@@ -201,8 +202,8 @@ def generate_issue_collection(items, config):  # pragma: no cover
                 'importance': importance,
                 'component_mark': component_mark,
             }
-            add_workaround(collected_data, IS_OPEN.findall(source), 'is_open', **kwargs)
-            add_workaround(collected_data, NOT_IS_OPEN.findall(source), 'not is_open', **kwargs)
+            add_workaround(collected_data, metadata['is_open'], 'is_open', **kwargs)
+            add_workaround(collected_data, metadata['not_is_open'], 'not is_open', **kwargs)
 
         # Add component as a marker to anable filtering e.g: "-m contentviews"
         if component_mark is not None:
@@ -219,12 +220,9 @@ def generate_issue_collection(items, config):  # pragma: no cover
 
     # Take uses of `is_open` from outside of test cases e.g: SetUp methods
     for test_module in test_modules:
-        module_source = inspect.getsource(test_module)
-        component_matches = COMPONENT.findall(module_source)
-        module_component = None
-        if component_matches:
-            module_component = component_matches[0]
-        if 'is_open(' in module_source:
+        module_metadata = metadata_index.get(test_module.__file__)['module']
+        module_component = module_metadata['source_component']
+        if module_metadata['is_open'] or module_metadata['not_is_open']:
             kwargs = {
                 'filepath': test_module.__file__,
                 'lineno': 1,
@@ -237,21 +235,25 @@ def generate_issue_collection(items, config):  # pragma: no cover
 
             add_workaround(
                 collected_data,
-                IS_OPEN.findall(module_source),
+                module_metadata['is_open'],
                 'is_open',
                 validation=validation,
                 **kwargs,
             )
             add_workaround(
                 collected_data,
-                NOT_IS_OPEN.findall(module_source),
+                module_metadata['not_is_open'],
                 'not is_open',
                 validation=validation,
                 **kwargs,
             )
 
     # --- Collect BUGZILLA data ---
-    bugzilla.collect_data_bz(collected_data, cached_data)
+    try:
+        bugzilla.collect_data_bz(collected_data, cached_data)
+    finally:
+        if cached_data is not None:
+            cached_data.close()
 
     # --- add deselect markers dynamically ---
     for item in items:
@@ -260,15 +262,14 @@ def generate_issue_collection(items, config):  # pragma: no cover
             collected_data[issue]['data']['is_deselected'] = True
             item.add_marker(pytest.mark.deselect(reason=issue))
 
-    # --- if no cache file existed write a new cache file ---
-    if cached_data is None and use_bz_cache:
+    # --- write the issue collection file ---
+    if use_bz_cache:
         collected_data['_meta'] = {
             "version": settings.server.version,
             "hostname": settings.server.hostname,
             "created": datetime.now().isoformat(),
             "pytest": {"args": config.args, "pwd": str(config.invocation_dir)},
         }
-        # bz_cache_filename could be None from the option not being passed, write the file anyway
         with open(DEFAULT_BZ_CACHE_FILE, 'w') as collect_file:
             json.dump(collected_data, collect_file, indent=4, cls=VersionEncoder)
             LOGGER.info(f"Generated BZ cache file {DEFAULT_BZ_CACHE_FILE}")
@@ -0,0 +1,68 @@
+"""Lock contention report of locked and shared functions
+
+With ``--lock-stats`` each worker records its function locks and shared
+functions acquisitions, at the end of the session the records of all the
+workers are merged in a contention report.
+"""
+import os
+
+from robottelo.decorators import lock_stats
+
+LOCK_STATS_REPORT_FILE = 'lock_stats_report.txt'
+
+
+def pytest_addoption(parser):
+    """Add options to pytest to record the locks contention"""
+    parser.addoption(
+        "--lock-stats",
+        action='store_true',
+        default=False,
+        help='Record the function locks and shared functions wait and hold times, and '
+        f'report the most contended locks at session end in {LOCK_STATS_REPORT_FILE}.',
+    )
+    parser.addoption(
+        "--lock-stats-top",
+        type=int,
+        default=20,
+        help='The number of the most contended locks to report.',
+    )
+
+
+def _is_worker(config):
+    return hasattr(config, 'workerinput')
+
+
+def pytest_configure(config):
+    """Enable the lock stats recording, and create the session records
+    directory on the controller process"""
+    if not config.getoption('lock_stats'):
+        return
+    if not _is_worker(config):
+        config._lock_stats_dir = lock_stats.create_stats_dir()
+    lock_stats.enable_lock_stats(True)
+
+
+def pytest_unconfigure(config):
+    """Remove the session records directory on the controller process"""
+    stats_dir = getattr(config, '_lock_stats_dir', None)
+    if stats_dir is None:
+        return
+    lock_stats.remove_stats_dir(stats_dir)
+    config._lock_stats_dir = None
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """Merge the workers records in the contention report"""
+    if not config.getoption('lock_stats') or _is_worker(config):
+        return
+    records = lock_stats.load_records(config._lock_stats_dir)
+    top = config.getoption('lock_stats_top')
+    report_lines = lock_stats.contention_report(records, top=top)
+    with open(LOCK_STATS_REPORT_FILE, 'w') as handler:
+        handler.write('\n'.join(report_lines) + '\n')
+    terminalreporter.section('lock contention')
+    for line in lock_stats.contention_report(records, top=top, timeline=False):
+        terminalreporter.write_line(line)
+    terminalreporter.write_line(
+        'full report with workers timeline: {}'.format(os.path.abspath(LOCK_STATS_REPORT_FILE))
+    )
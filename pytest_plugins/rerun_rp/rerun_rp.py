@@ -1,12 +1,19 @@
 import logging
 
 import pytest
+import requests
 
 from robottelo.config import settings
+from robottelo.report_portal.portal import Launch
 from robottelo.report_portal.portal import ReportPortal
 
 LOGGER = logging.getLogger(__name__)
 
+# The pytest cache key of the latest launches and their failed tests, by satellite version
+LAUNCH_CACHE_KEY = 'rerun_rp/launches'
+# The launch info items that change when the launch results change
+LAUNCH_FINGERPRINT_KEYS = ('id', 'status', 'end_time', 'last_modified', 'statistics')
+
 
 class LaunchError(Exception):
     """To be raised in case of skipping the session due to Launch issues/info"""
@@ -14,23 +21,54 @@ class LaunchError(Exception):
     pass
 
 
-def _get_failed_tests(launch, fail_args):
-    """Returns failed test names from Report Portal Launch based on arguments"""
-    test_args = (
-        [dict(status='failed')]
-        if fail_args == ['all']
-        else [dict(defect_type=dtype) for dtype in fail_args]
-    )
-    tests = []
-    for t_args in test_args:
-        tests.extend([*launch.tests(**t_args).keys()])
+def _launch_fingerprint(launch):
+    """Returns the launch info items that change when the launch results change"""
+    return {key: launch.info.get(key) for key in LAUNCH_FINGERPRINT_KEYS}
+
+
+def _get_latest_launch(rp, sat_version, cached_launch=None):
+    """Returns the latest launch of satellite version from Report Portal, or the cached
+    launch info if Report Portal is not reachable"""
+    try:
+        return next(iter(rp.launches(sat_version=sat_version).values()))
+    except requests.exceptions.RequestException as err:
+        if cached_launch is None:
+            raise
+        LOGGER.warning(
+            f'Report Portal is not reachable, using the cached launch of satellite version '
+            f'{sat_version}: {err}'
+        )
+        return Launch(rp=rp, launch_info=cached_launch)
+
+
+def _get_failed_tests(launch, fail_args, cached_tests=None):
+    """Returns failed test names from Report Portal Launch based on arguments
+
+    :param dict cached_tests: The failed tests of the launch keyed by arguments, the tests
+        are taken from it while the launch is not changed, and updated when fetched
+    """
+    cache_key = ','.join(sorted(fail_args))
+    fingerprint = _launch_fingerprint(launch)
+    if cached_tests is not None:
+        cached = cached_tests.get(cache_key)
+        if cached and cached['fingerprint'] == fingerprint:
+            LOGGER.debug(f'Using the cached failed tests of launch {launch.info["id"]}')
+            return set(cached['tests'])
+    # a single query for all the defect types
+    test_args = dict(status='failed') if fail_args == ['all'] else dict(defect_type=fail_args)
+    tests = [*launch.tests(**test_args).keys()]
     # Formating test names for 'member of pytest test items' operation
-    tests = [str(test).replace('::', '.') for test in tests]
+    tests = {str(test).replace('::', '.') for test in tests}
+    if cached_tests is not None:
+        cached_tests[cache_key] = {'fingerprint': fingerprint, 'tests': sorted(tests)}
     return tests
 
 
 def _get_test_collection(rp_failed_tests, items):
-    """Returns the selected and deselected items"""
+    """Returns the selected and deselected items
+
+    :param set rp_failed_tests: The failed test names
+    """
     # Select test item if its in failed tests else deselect
     LOGGER.debug('Selecting/Deselecting tests based on latest launch test results..')
     selected = []
@@ -77,10 +115,19 @@ def pytest_collection_modifyitems(items, config):
                 f'Incorrect values to pytest option \'--only-failed\' are provided as '
                 f'{fail_args} but should be none/one/mix of {allowed_args}'
             )
-    # Fetch the latest launch
+    # Fetch the latest launch, the launches and failed tests are cached in pytest cache dir
     version = settings.server.version
     sat_version = f'{version.base_version}.{version.epoch}'
-    launch = next(iter(rp.launches(sat_version=sat_version).values()))
+    cache = getattr(config, 'cache', None)
+    cached_launches = cache.get(LAUNCH_CACHE_KEY, {}) if cache is not None else {}
+    cached_launch = cached_launches.get(sat_version)
+    launch = _get_latest_launch(
+        rp, sat_version, cached_launch=cached_launch and cached_launch['launch']
+    )
+    if cached_launch is None or cached_launch['launch']['id'] != launch.info['id']:
+        # a new launch, the failed tests of the previous one are not needed anymore
+        cached_launch = {'failed_tests': {}}
+    cached_launch['launch'] = launch.info
     # Stop session based on RP Launch statistics and info
     if launch.info['isProcessing']:
         raise LaunchError(f'The launch of satellite version {sat_version} is not Finished yet')
@@ -93,7 +140,10 @@ def pytest_collection_modifyitems(items, config):
             'failed. Which is higher than the threshold of 20%. '
             'Examine the failures thoroughly and check for any major issue.'
         )
-    rp_tests = _get_failed_tests(launch, fail_args)
+    rp_tests = _get_failed_tests(launch, fail_args, cached_launch['failed_tests'])
+    if cache is not None:
+        cached_launches[sat_version] = cached_launch
+        cache.set(LAUNCH_CACHE_KEY, cached_launches)
     selected, deselected = _get_test_collection(rp_tests, items)
     LOGGER.debug(
         f'Selected {len(selected)} failed and deselected {len(deselected)} passed tests '
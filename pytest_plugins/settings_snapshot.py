@@ -0,0 +1,49 @@
+"""Settings snapshot shared with the xdist workers
+
+The controller process parses and validates the settings once and writes
+their snapshot in a private directory of the session, the workers inherit the
+snapshot directory from the environment and load the snapshot instead of
+parsing the settings file again. The snapshot is keyed by the settings file
+content and the ``ROBOTTELO_*`` environment variables, so any change of them
+invalidates it. The snapshot directory is removed at the end of the session.
+"""
+import os
+import shutil
+import tempfile
+
+from robottelo.config import settings
+from robottelo.config.base import ImproperlyConfigured
+from robottelo.config.base import SETTINGS_SNAPSHOT_DIR_ENV
+
+SNAPSHOT_DIR_PREFIX = 'robottelo-settings-'
+
+
+def _is_worker(config):
+    return hasattr(config, 'workerinput')
+
+
+def pytest_configure(config):
+    """Write the settings snapshot on the xdist controller process"""
+    if _is_worker(config) or not getattr(config.option, 'numprocesses', None):
+        return
+    # the snapshot contains the credentials, mkdtemp creates the directory
+    # readable and writable by the current user only
+    snapshot_dir = tempfile.mkdtemp(prefix=SNAPSHOT_DIR_PREFIX)
+    config._settings_snapshot_dir = snapshot_dir
+    try:
+        settings.write_snapshot(snapshot_dir)
+    except (ImproperlyConfigured, OSError):
+        # the workers parse the settings and report the errors
+        return
+    os.environ[SETTINGS_SNAPSHOT_DIR_ENV] = snapshot_dir
+
+
+def pytest_unconfigure(config):
+    """Remove the settings snapshot directory of the session"""
+    snapshot_dir = getattr(config, '_settings_snapshot_dir', None)
+    if snapshot_dir is None:
+        return
+    if os.environ.get(SETTINGS_SNAPSHOT_DIR_ENV) == snapshot_dir:
+        del os.environ[SETTINGS_SNAPSHOT_DIR_ENV]
+    shutil.rmtree(snapshot_dir, ignore_errors=True)
+    config._settings_snapshot_dir = None
@@ -0,0 +1,74 @@
+"""Flush of the virtual machines background teardown
+
+The virtual machines destroyed with ``destroy(async_=True)`` are destroyed by
+the :mod:`robottelo.vm_teardown` workers, each process waits for them at its
+session end and saves its results in the session results directory, created
+by the controller process. The controller merges the results of all the
+processes and reports the leaked virtual machines.
+"""
+import os
+import shutil
+import tempfile
+
+import pytest
+
+from robottelo import vm_teardown
+from robottelo.vm_teardown import teardown_service
+
+VM_LEAK_REPORT_FILE = 'vm_leak_report.txt'
+RESULTS_DIR_PREFIX = 'robottelo-vm-teardown-'
+
+
+def _is_worker(config):
+    return hasattr(config, 'workerinput')
+
+
+def pytest_configure(config):
+    """Create the session teardown results directory on the controller
+    process, the workers inherit it from the environment"""
+    if _is_worker(config):
+        return
+    results_dir = tempfile.mkdtemp(prefix=RESULTS_DIR_PREFIX)
+    config._vm_teardown_dir = results_dir
+    os.environ[vm_teardown.TEARDOWN_RESULTS_DIR_ENV] = results_dir
+
+
+# run before the xdist worker notifies the controller of its session end
+@pytest.hookimpl(tryfirst=True)
+def pytest_sessionfinish(session, exitstatus):
+    """Wait for the queued virtual machines teardown, and save the results of
+    this process"""
+    teardown_service.flush()
+    results_dir = os.environ.get(vm_teardown.TEARDOWN_RESULTS_DIR_ENV)
+    if results_dir and os.path.isdir(results_dir):
+        if teardown_service.destroyed_count or teardown_service.leaks:
+            teardown_service.save_results(results_dir)
+
+
+def pytest_terminal_summary(terminalreporter, exitstatus, config):
+    """Report the virtual machines of all the processes that could not be
+    destroyed"""
+    results_dir = getattr(config, '_vm_teardown_dir', None)
+    if _is_worker(config) or results_dir is None:
+        return
+    destroyed_count, leaks = vm_teardown.load_results(results_dir)
+    if not leaks:
+        return
+    report_lines = vm_teardown.leak_report(destroyed_count, leaks)
+    with open(VM_LEAK_REPORT_FILE, 'w') as handler:
+        handler.write('\n'.join(report_lines) + '\n')
+    terminalreporter.section('leaked virtual machines')
+    for line in report_lines:
+        terminalreporter.write_line(line)
+    terminalreporter.write_line('leak report: {}'.format(os.path.abspath(VM_LEAK_REPORT_FILE)))
+
+
+def pytest_unconfigure(config):
+    """Remove the session teardown results directory"""
+    results_dir = getattr(config, '_vm_teardown_dir', None)
+    if results_dir is None:
+        return
+    if os.environ.get(vm_teardown.TEARDOWN_RESULTS_DIR_ENV) == results_dir:
+        del os.environ[vm_teardown.TEARDOWN_RESULTS_DIR_ENV]
+    shutil.rmtree(results_dir, ignore_errors=True)
+    config._vm_teardown_dir = None
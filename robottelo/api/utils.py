@@ -7,7 +7,6 @@ from fauxfactory import gen_string
 from inflector import Inflector
 from nailgun import entities
 from nailgun import entity_mixins
-from nailgun.client import request
 
 from robottelo import ssh
 from robottelo.config import settings
@@ -20,6 +19,10 @@ from robottelo.constants import FAKE_1_YUM_REPO
 from robottelo.constants import REPO_TYPE
 from robottelo.constants import RHEL_6_MAJOR_VERSION
 from robottelo.constants import RHEL_7_MAJOR_VERSION
+from robottelo.utils.pulp_task_poller import get_pulp_task_poller
+from robottelo.utils.task_waiter import api_search_tasks
+from robottelo.utils.task_waiter import TASK_WAIT_TIMEOUT
+from robottelo.utils.task_waiter import TaskWaiter
 
 
 def call_entity_method_with_timeout(entity_callable, timeout=300, **kwargs):
@@ -601,28 +604,30 @@ def wait_for_tasks(search_query, search_rate=1, max_tries=10, poll_rate=None, po
     :param search_query: Search query that will be passed to API call.
     :param search_rate: Delay between searches.
     :param max_tries: How many times search should be executed.
-    :param poll_rate: Delay between the end of one task check-up and
-            the start of the next check-up. Parameter for
-            ``nailgun.entities.ForemanTask.poll()`` method.
-    :param poll_timeout: Maximum number of seconds to wait until timing out.
-            Parameter for ``nailgun.entities.ForemanTask.poll()`` method.
+    :param poll_rate: Max delay between two polls of all the tasks, see
+            :class:`robottelo.utils.task_waiter.TaskWaiter`.
+    :param poll_timeout: Maximum number of seconds to wait for all the found
+            tasks together, 300 by default. The tasks are polled at once, it is
+            no longer a timeout by task. The search tries are not counted in it.
     :return: List of ``nailgun.entities.ForemanTasks`` entities.
     :raises: ``AssertionError``. If not tasks were found until timeout.
+    :raises: ``nailgun.entity_mixins.TaskFailedError``. If a task failed.
+    :raises: ``nailgun.entity_mixins.TaskTimedOutError``. If the tasks did not
+            finish until timeout.
     """
-    for _ in range(max_tries):
-        tasks = entities.ForemanTask().search(query={'search': search_query})
-        if len(tasks) > 0:
-            for task in tasks:
-                task.poll(poll_rate=poll_rate, timeout=poll_timeout)
-            break
-        else:
-            time.sleep(search_rate)
-    else:
-        raise AssertionError("No task was found using query '{}'".format(search_query))
-    return tasks
+    waiter = TaskWaiter(
+        api_search_tasks,
+        timeout=(poll_timeout or TASK_WAIT_TIMEOUT) + max_tries * search_rate,
+        max_interval=poll_rate,
+    )
+    tasks = waiter.add_search(search_query, max_tries=max_tries, search_rate=search_rate)
+    waiter.wait()
+    return tasks.result()
 
 
-def wait_for_syncplan_tasks(repo_backend_id=None, timeout=10, repo_name=None):
+def wait_for_syncplan_tasks(
+    repo_backend_id=None, timeout=10, repo_name=None, repo_backend_ids=None
+):
     """Search the pulp tasks and identify repositories sync tasks with
     specified name or backend_identifier
 
@@ -630,6 +635,9 @@ def wait_for_syncplan_tasks(repo_backend_id=None, timeout=10, repo_name=None):
         repo in Pulp environment
     :param timeout: Value to decided how long to check for the Sync task
     :param repo_name: If repo_backend_id can not be passed, pass the repo_name
+    :param repo_backend_ids: The Backend IDs of many repositories, to wait for
+        their sync tasks with one search by poll, see
+        :class:`robottelo.utils.pulp_task_poller.PulpTaskPoller`
     """
     if repo_name:
         repo_backend_id = (
@@ -637,51 +645,11 @@ def wait_for_syncplan_tasks(repo_backend_id=None, timeout=10, repo_name=None):
             .search(query={'search': 'name="{0}"'.format(repo_name), 'per_page': 1000})[0]
             .backend_identifier
         )
-    # Fetch the Pulp password
-    pulp_pass = ssh.command(
-        'grep "^default_password" /etc/pulp/server.conf | awk \'{print $2}\''
-    ).stdout[0]
-    # Set the Timeout value
-    timeup = time.time() + int(timeout) * 60
-    # Search Filter to filter out the task based on backend-id and sync action
-    filtered_req = {
-        'criteria': {
-            'filters': {
-                'tags': {'$in': ["pulp:repository:{0}".format(repo_backend_id)]},
-                'task_type': {'$in': ["pulp.server.managers.repo.sync.sync"]},
-            }
-        }
-    }
-    while True:
-        if time.time() > timeup:
-            raise entities.APIResponseError(
-                'Pulp task with repo_id {0} not found'.format(repo_backend_id)
-            )
-        # Send request to pulp API to get the task info
-        req = request(
-            'POST',
-            '{0}/pulp/api/v2/tasks/search/'.format(settings.server.get_url()),
-            verify=False,
-            auth=('admin', '{0}'.format(pulp_pass)),
-            headers={'content-type': 'application/json'},
-            data=filtered_req,
-        )
-        # Check Status code of response
-        if req.status_code != 200:
-            raise entities.APIResponseError(
-                'Pulp task with repo_id {0} not found'.format(repo_backend_id)
-            )
-        # Check content of response
-        # It is '[]' string for empty content when backend_identifier is wrong
-        if len(req.content) > 2:
-            if req.json()[0].get('state') in ['finished']:
-                return True
-            elif req.json()[0].get('error'):
-                raise AssertionError(
-                    "Pulp task with repo_id {0} errored or not "
-                    "found: '{1}'".format(repo_backend_id, req.json().get('error'))
-                )
-        time.sleep(2)
+    repo_backend_ids = list(repo_backend_ids or [])
+    if repo_backend_id:
+        repo_backend_ids.append(repo_backend_id)
+    get_pulp_task_poller().wait(repo_backend_ids, timeout=int(timeout) * 60)
+    return True
 
 
 def wait_for_errata_applicability_task(
@@ -693,47 +661,48 @@ def wait_for_errata_applicability_task(
     :param int from_when: Timestamp (in UTC) to limit number of returned tasks to investigate.
     :param int search_rate: Delay between searches.
     :param int max_tries: How many times search should be executed.
-    :param int poll_rate: Delay between the end of one task check-up and
-            the start of the next check-up. Parameter for
-            ``nailgun.entities.ForemanTask.poll()`` method.
-    :param int poll_timeout: Maximum number of seconds to wait until timing out.
-            Parameter for ``nailgun.entities.ForemanTask.poll()`` method.
+    :param int poll_rate: Max delay between two polls of all the tasks, see
+            :class:`robottelo.utils.task_waiter.TaskWaiter`.
+    :param int poll_timeout: Maximum number of seconds to wait for all the found
+            tasks together, it is no longer a timeout by task. The search tries
+            are not counted in it.
     :return: Relevant errata applicability task.
     :raises: ``AssertionError``. If not tasks were found for given host until timeout.
+    :raises: ``nailgun.entity_mixins.TaskFailedError``. If a task failed.
+    :raises: ``nailgun.entity_mixins.TaskTimedOutError``. If the tasks did not
+            finish until timeout.
     """
     assert isinstance(host_id, int), 'Param host_id have to be int'
     assert isinstance(from_when, int), 'Param from_when have to be int'
     now = int(time.time())
     assert from_when <= now, 'Param from_when have to be timestamp in the past'
-    for _ in range(max_tries):
-        now = int(time.time())
-        max_age = now - from_when + 1
-        search_query = (
+
+    def search_query():
+        max_age = int(time.time()) - from_when + 1
+        return (
             '( label = Actions::Katello::Host::GenerateApplicability OR label = '
             'Actions::Katello::Host::UploadPackageProfile ) AND started_at > "%s seconds ago"'
             % max_age
         )
-        tasks = entities.ForemanTask().search(query={'search': search_query})
-        tasks_finished = 0
-        for task in tasks:
-            if (
-                task.label == 'Actions::Katello::Host::GenerateApplicability'
-                and host_id in task.input['host_ids']
-            ):
-                task.poll(poll_rate=poll_rate, timeout=poll_timeout)
-                tasks_finished += 1
-            elif (
-                task.label == 'Actions::Katello::Host::UploadPackageProfile'
-                and host_id == task.input['host']['id']
-            ):
-                task.poll(poll_rate=poll_rate, timeout=poll_timeout)
-                tasks_finished += 1
-        if tasks_finished > 0:
-            break
-        time.sleep(search_rate)
-    else:
+
+    def is_host_task(task):
+        if task.label == 'Actions::Katello::Host::GenerateApplicability':
+            return host_id in task.input['host_ids']
+        if task.label == 'Actions::Katello::Host::UploadPackageProfile':
+            return host_id == task.input['host']['id']
+        return False
+
+    waiter = TaskWaiter(
+        api_search_tasks, timeout=poll_timeout + max_tries * search_rate, max_interval=poll_rate
+    )
+    waiter.add_search(
+        search_query, match=is_host_task, max_tries=max_tries, search_rate=search_rate
+    )
+    try:
+        waiter.wait()
+    except AssertionError:
         raise AssertionError(
-            "No task was found using query '{}' for host '{}'".format(search_query, host_id)
+            "No task was found using query '{}' for host '{}'".format(search_query(), host_id)
         )
 
 
@@ -1,14 +1,17 @@
 """Define and instantiate the configuration class for Robottelo."""
+import hashlib
 import importlib
 import logging.config
 import os
+import pickle
+import sys
+import tempfile
 from configparser import ConfigParser
 from configparser import NoOptionError
 from configparser import NoSectionError
 from urllib.parse import urljoin
 from urllib.parse import urlunsplit
 
-import airgun.settings
 import yaml
 from nailgun import entities
 from nailgun import entity_mixins
@@ -20,6 +23,25 @@ from robottelo.constants import VALID_GCE_ZONES
 
 LOGGER = logging.getLogger(__name__)
 SETTINGS_FILE_NAME = 'robottelo.properties'
+# The environment variable of the settings snapshots directory, when set the
+# settings are loaded from the snapshot of the same settings file and environment
+SETTINGS_SNAPSHOT_DIR_ENV = 'SETTINGS_SNAPSHOT_DIR'
+# change it when the snapshot format changes, to not load stale snapshots
+SETTINGS_SNAPSHOT_VERSION = 1
+# The Settings attributes that are not part of the snapshot general settings
+_SNAPSHOT_EXCLUDED_ATTRS = (
+    'reader',
+    'server',
+    '_all_features',
+    '_airgun_configured',
+    '_configured',
+    '_feature_classes',
+    '_features',
+    '_loaded_features',
+    '_settings_path',
+    '_snapshot',
+    '_validation_errors',
+)
 
 
 class ImproperlyConfigured(Exception):
@@ -259,10 +281,12 @@ class CapsuleSettings(FeatureSettings):
         self.instance_name = None
         self.hash = None
         self.ddns_package_url = None
+        self.image_cache = None
 
     def read(self, reader):
         """Read clients settings."""
         self.instance_name = reader.get('capsule', 'instance_name')
+        self.image_cache = reader.get('capsule', 'image_cache', False, bool)
 
     @property
     def hostname(self):
@@ -318,12 +342,16 @@ class ClientsSettings(FeatureSettings):
         self.image_dir = None
         self.provisioning_server = None
         self.distros = None
+        self.vm_pool_size = None
+        self.vm_pool_max_vms = None
 
     def read(self, reader):
         """Read clients settings."""
         self.image_dir = reader.get('clients', 'image_dir')
         self.provisioning_server = reader.get('clients', 'provisioning_server')
         self.distros = [x.strip() for x in reader.get('clients', 'distros', "rhel7").split(",")]
+        self.vm_pool_size = reader.get('clients', 'vm_pool_size', 2, int)
+        self.vm_pool_max_vms = reader.get('clients', 'vm_pool_max_vms', 10, int)
 
     def validate(self):
         """Validate clients settings."""
@@ -1174,6 +1202,9 @@ class SharedFunctionSettings(FeatureSettings):
         self.redis_port = None
         self.redis_db = None
         self.redis_password = None
+        self.redis_max_connections = None
+        self.redis_compress_threshold = None
+        self.sqlite_db_path = None
         self.call_retries = None
 
     def read(self, reader):
@@ -1189,12 +1220,19 @@ class SharedFunctionSettings(FeatureSettings):
         self.redis_port = reader.get('shared_function', 'redis_port', 6379, int)
         self.redis_db = reader.get('shared_function', 'redis_db', 0, int)
         self.redis_password = reader.get('shared_function', 'redis_password', None)
+        self.redis_max_connections = reader.get(
+            'shared_function', 'redis_max_connections', 10, int
+        )
+        self.redis_compress_threshold = reader.get(
+            'shared_function', 'redis_compress_threshold', 0, int
+        )
+        self.sqlite_db_path = reader.get('shared_function', 'sqlite_db_path', None)
         self.call_retries = reader.get('shared_function', 'call_retries', 2, int)
 
     def validate(self):
         """Validate the shared settings"""
         validation_errors = []
-        supported_storage_handlers = ['file', 'redis']
+        supported_storage_handlers = ['file', 'redis', 'sqlite']
         if self.storage not in supported_storage_handlers:
             validation_errors.append(
                 '[shared] storage must be one of {}'.format(supported_storage_handlers)
@@ -1298,12 +1336,16 @@ class ReportPortalSettings(FeatureSettings):
         self.rp_url = None
         self.rp_project = None
         self.rp_key = None
+        self.page_size = None
+        self.max_workers = None
 
     def read(self, reader):
         """Read Report portal settings."""
         self.rp_url = reader.get('report_portal', 'portal_url')
         self.rp_project = reader.get('report_portal', 'project')
         self.rp_key = reader.get('report_portal', 'api_key')
+        self.page_size = reader.get('report_portal', 'page_size', 300, int)
+        self.max_workers = reader.get('report_portal', 'max_workers', 4, int)
 
     def validate(self):
         """Validate Report portal settings."""
@@ -1321,6 +1363,9 @@ class Settings(object):
     def __init__(self):
         self._all_features = None
         self._configured = False
+        self._airgun_configured = False
+        self._settings_path = None
+        self._snapshot = None
         self._validation_errors = []
         self.browser = None
         self.cdn = None
@@ -1353,38 +1398,42 @@ class Settings(object):
         self.webdriver_desired_capabilities = None
         self.command_executor = None
 
-        self.bugzilla = BugzillaSettings()
-        # Features
-        self.azurerm = AzureRMSettings()
-        self.capsule = CapsuleSettings()
-        self.certs = CertsSettings()
-        self.clients = ClientsSettings()
-        self.compute_resources = LibvirtHostSettings()
-        self.container_repo = ContainerRepositorySettings()
-        self.discovery = DiscoveryISOSettings()
-        self.distro = DistroSettings()
-        self.docker = DockerSettings()
-        self.ec2 = EC2Settings()
-        self.fake_capsules = FakeCapsuleSettings()
-        self.fake_manifest = FakeManifestSettings()
-        self.gce = GCESettings()
-        self.ldap = LDAPSettings()
-        self.ipa = LDAPIPASettings()
-        self.oscap = OscapSettings()
-        self.ostree = OstreeSettings()
-        self.osp = OSPSettings()
-        self.performance = PerformanceSettings()
-        self.rhai = RHAISettings()
-        self.rhev = RHEVSettings()
-        self.rhsso = RHSSOSettings()
-        self.ssh_client = SSHClientSettings()
-        self.shared_function = SharedFunctionSettings()
-        self.vlan_networking = VlanNetworkSettings()
-        self.upgrade = UpgradeSettings()
-        self.vmware = VmWareSettings()
-        self.virtwho = VirtWhoSettings()
-        self.report_portal = ReportPortalSettings()
-        self.http_proxy = HttpProxySettings()
+        # Features, read and validated on first access
+        self._feature_classes = {
+            'bugzilla': BugzillaSettings,
+            'azurerm': AzureRMSettings,
+            'capsule': CapsuleSettings,
+            'certs': CertsSettings,
+            'clients': ClientsSettings,
+            'compute_resources': LibvirtHostSettings,
+            'container_repo': ContainerRepositorySettings,
+            'discovery': DiscoveryISOSettings,
+            'distro': DistroSettings,
+            'docker': DockerSettings,
+            'ec2': EC2Settings,
+            'fake_capsules': FakeCapsuleSettings,
+            'fake_manifest': FakeManifestSettings,
+            'gce': GCESettings,
+            'ldap': LDAPSettings,
+            'ipa': LDAPIPASettings,
+            'oscap': OscapSettings,
+            'ostree': OstreeSettings,
+            'osp': OSPSettings,
+            'performance': PerformanceSettings,
+            'rhai': RHAISettings,
+            'rhev': RHEVSettings,
+            'rhsso': RHSSOSettings,
+            'ssh_client': SSHClientSettings,
+            'shared_function': SharedFunctionSettings,
+            'vlan_networking': VlanNetworkSettings,
+            'upgrade': UpgradeSettings,
+            'vmware': VmWareSettings,
+            'virtwho': VirtWhoSettings,
+            'report_portal': ReportPortalSettings,
+            'http_proxy': HttpProxySettings,
+        }
+        self._features = {}
+        self._loaded_features = set()
 
     def configure(self, settings_path=None):
         """Read the settings file and parse the configuration.
@@ -1407,29 +1456,159 @@ class Settings(object):
             raise ImproperlyConfigured(
                 'Not able to find settings file at {}'.format(settings_path)
             )
+        self._settings_path = settings_path
 
-        self.reader = INIReader(settings_path)
-        self._read_robottelo_settings()
-        self._validation_errors.extend(self._validate_robottelo_settings())
-
-        attrs = map(lambda attr_name: (attr_name, getattr(self, attr_name)), dir(self))
-        feature_settings = filter(lambda tpl: isinstance(tpl[1], FeatureSettings), attrs)
-        for name, settings in feature_settings:
-            if self.reader.has_section(name) or name == 'server':
-                settings.read(self.reader)
-                self._validation_errors.extend(settings.validate())
-
-        if self._validation_errors:
-            raise ImproperlyConfigured(
-                'Failed to validate the configuration, check the message(s):\n'
-                '{}'.format('\n'.join(self._validation_errors))
-            )
+        snapshot_dir = os.environ.get(SETTINGS_SNAPSHOT_DIR_ENV)
+        snapshot = self._read_snapshot(snapshot_dir) if snapshot_dir else None
+        if snapshot is not None:
+            self._apply_snapshot(snapshot)
+        else:
+            self.reader = INIReader(settings_path)
+            self._read_robottelo_settings()
+            self._validation_errors.extend(self._validate_robottelo_settings())
+
+            # The other features are read and validated on first access, see __getattr__
+            self.server.read(self.reader)
+            self._validation_errors.extend(self.server.validate())
+
+            if self._validation_errors:
+                raise ImproperlyConfigured(
+                    'Failed to validate the configuration, check the message(s):\n'
+                    '{}'.format('\n'.join(self._validation_errors))
+                )
 
         self._configure_logging()
         self._configure_third_party_logging()
         self._configure_entities()
-        self._configure_airgun()
         self._configured = True
+        if 'airgun' in sys.modules:
+            # AirGun is already imported, configure it now
+            self.configure_airgun()
+
+    def __getattr__(self, name):
+        """Return the feature settings of section name.
+
+        Once the settings are configured, the feature section is read and
+        validated on first access.
+
+        :raises: ImproperlyConfigured if the feature section is not valid.
+        """
+        feature_classes = self.__dict__.get('_feature_classes', {})
+        if name not in feature_classes:
+            raise AttributeError(
+                '{0!r} object has no attribute {1!r}'.format(type(self).__name__, name)
+            )
+        feature = self._features.get(name)
+        if feature is None:
+            feature = self._features[name] = feature_classes[name]()
+        if self._configured and name not in self._loaded_features:
+            self._load_feature(name, feature)
+        return feature
+
+    def __dir__(self):
+        # list the features, for the introspection and the mocks specs
+        return sorted(set(super(Settings, self).__dir__()) | set(self._feature_classes))
+
+    def _load_feature(self, name, feature):
+        """Read and validate the feature settings of section name, if the section
+        exists, or take them from the loaded snapshot."""
+        if self._snapshot is not None:
+            error = self._snapshot['feature_errors'].get(name)
+            if error:
+                raise ImproperlyConfigured(error)
+            vars(feature).update(self._snapshot['features'].get(name, {}))
+        elif self.reader.has_section(name):
+            feature.read(self.reader)
+            validation_errors = feature.validate()
+            if validation_errors:
+                raise ImproperlyConfigured(
+                    'Failed to validate the [{0}] configuration, check the message(s):\n'
+                    '{1}'.format(name, '\n'.join(validation_errors))
+                )
+        self._loaded_features.add(name)
+
+    def get_snapshot_path(self, snapshot_dir):
+        """Return the snapshot file path of the settings.
+
+        The snapshot is keyed by the settings file content, the ``ROBOTTELO_*``
+        environment variables that override it and the settings definitions
+        module, any change of them invalidates the snapshot.
+        """
+        digest = hashlib.sha1(str(SETTINGS_SNAPSHOT_VERSION).encode())
+        for path in (self._settings_path, __file__):
+            with open(path, 'rb') as handler:
+                digest.update(handler.read())
+        for name, value in sorted(os.environ.items()):
+            if name.startswith('ROBOTTELO_'):
+                digest.update('{0}={1}\n'.format(name, value).encode())
+        return os.path.join(snapshot_dir, 'settings-{}.pickle'.format(digest.hexdigest()))
+
+    def write_snapshot(self, snapshot_dir):
+        """Write the snapshot of the resolved and validated settings, to be
+        loaded by the other processes configuring the same settings.
+
+        All the feature sections are read and validated, the validation errors
+        are stored to be raised on the feature access.
+
+        :returns: The snapshot file path.
+        """
+        if not self.configured:
+            self.configure()
+        snapshot_path = self.get_snapshot_path(snapshot_dir)
+        if self._snapshot is not None:
+            # the settings were loaded from this snapshot
+            return snapshot_path
+        features = {}
+        feature_errors = {}
+        for name in self._feature_classes:
+            try:
+                feature = getattr(self, name)
+            except ImproperlyConfigured as err:
+                feature_errors[name] = str(err)
+                continue
+            if self.reader.has_section(name):
+                features[name] = vars(feature)
+        snapshot = {
+            'settings': {
+                name: value
+                for name, value in vars(self).items()
+                if name not in _SNAPSHOT_EXCLUDED_ATTRS
+            },
+            'server': vars(self.server),
+            'features': features,
+            'feature_errors': feature_errors,
+        }
+        # write to a temporary file then rename it, as an other process may
+        # write the same snapshot at the same time
+        handle, tmp_path = tempfile.mkstemp(dir=snapshot_dir, suffix='.tmp')
+        with os.fdopen(handle, 'wb') as handler:
+            pickle.dump(snapshot, handler, protocol=pickle.HIGHEST_PROTOCOL)
+        os.rename(tmp_path, snapshot_path)
+        return snapshot_path
+
+    def _read_snapshot(self, snapshot_dir):
+        """Return the snapshot of the settings or None if not available.
+
+        The snapshot is loaded only from a directory owned by the current user
+        and not writable by the others, as loading a pickle can execute code.
+        """
+        try:
+            dir_stat = os.stat(snapshot_dir)
+            if dir_stat.st_uid != os.getuid() or dir_stat.st_mode & 0o022:
+                LOGGER.warning(
+                    'Ignoring the unsafe settings snapshot directory {}'.format(snapshot_dir)
+                )
+                return None
+            with open(self.get_snapshot_path(snapshot_dir), 'rb') as handler:
+                return pickle.load(handler)
+        except (OSError, EOFError, pickle.UnpicklingError):
+            return None
+
+    def _apply_snapshot(self, snapshot):
+        """Set the settings from a snapshot"""
+        vars(self).update(snapshot['settings'])
+        vars(self.server).update(snapshot['server'])
+        self._snapshot = snapshot
 
     def _read_robottelo_settings(self):
         """Read Robottelo's general settings."""
@@ -1524,9 +1703,7 @@ class Settings(object):
     def all_features(self):
         """List all expected feature settings sections."""
         if self._all_features is None:
-            self._all_features = [
-                name for name, value in vars(self).items() if isinstance(value, FeatureSettings)
-            ]
+            self._all_features = ['server'] + list(self._feature_classes)
         return self._all_features
 
     def _configure_entities(self):
@@ -1559,8 +1736,19 @@ class Settings(object):
 
         entities.GPGKey.__init__ = patched_gpgkey_init
 
-    def _configure_airgun(self):
-        """Pass required settings to AirGun"""
+    def configure_airgun(self):
+        """Pass required settings to AirGun
+
+        AirGun is not configured by :meth:`configure` unless already imported,
+        as importing it loads the whole UI stack. This is called once the tests
+        using AirGun are collected.
+        """
+        if self._airgun_configured:
+            return
+        if not self.configured:
+            self.configure()
+        import airgun.settings
+
         airgun.settings.configure(
             {
                 'airgun': {
@@ -1585,6 +1773,7 @@ class Settings(object):
                 'webdriver_desired_capabilities': (self.webdriver_desired_capabilities or {}),
             }
         )
+        self._airgun_configured = True
 
     def _configure_logging(self):
         """Configure logging for the entire framework.
@@ -1,4 +1,4 @@
-"""Implements test function locking, using pytest_services file locking
+"""Implements test function locking, using flock file locking
 
 Usage::
 
@@ -38,17 +38,34 @@ Usage::
        def test_that_conflict_with_test_to_lock(self)
             with locking_function(self.test_to_lock):
                 # do some operations that conflict with test_to_lock
+
+    # some operations tolerate a limited parallelism, at most 3 workers can
+    # run this function at the same time
+    @lock_function(max_holders=3)
+    def upload_manifest():
+        pass
+
+    # many readers can run at the same time, but not with a writer
+    @lock_function
+    def write_setting():
+        pass
+
+    def read_setting():
+        with locking_function(write_setting, mode='shared'):
+            # read the setting
 """
+import fcntl
 import functools
 import inspect
 import logging
 import os
 import tempfile
+import time
+from collections import Counter
 from contextlib import contextmanager
 
-from pytest_services.locks import file_lock
-
 from robottelo.config import settings
+from robottelo.decorators import lock_stats
 
 logger = logging.getLogger(__name__)
 
@@ -58,9 +75,16 @@ LOCK_DIR = None
 LOCK_DEFAULT_TIMEOUT = 1800  # 30 minutes
 LOCK_FILE_NAME_EXT = 'lock'
 LOCK_DEFAULT_SCOPE = None
+LOCK_MODE_EXCLUSIVE = 'exclusive'
+LOCK_MODE_SHARED = 'shared'
+# the time in seconds between two tries of a held lock
+LOCK_POLL_INTERVAL = 0.05
 
 _DEFAULT_CLASS_NAME_DEPTH = 3
 
+# the shared locks held by this process, {(process_id, lock_file_path): count}
+_shared_holds = Counter()
+
 
 class FunctionLockerError(Exception):
     """the default function locker error"""
@@ -195,12 +219,150 @@ def _write_content(handler, content):
     handler.flush()
 
 
+def _get_lock_mode(mode, max_holders):
+    """Return the lock mode, shared by default when more than one holder"""
+    if max_holders < 1:
+        raise FunctionLockerError('max_holders must be a positive integer')
+    if mode is None:
+        mode = LOCK_MODE_SHARED if max_holders > 1 else LOCK_MODE_EXCLUSIVE
+    if mode not in (LOCK_MODE_EXCLUSIVE, LOCK_MODE_SHARED):
+        raise FunctionLockerError('Unknown lock mode: {}'.format(mode))
+    if mode == LOCK_MODE_EXCLUSIVE and max_holders > 1:
+        raise FunctionLockerError('An exclusive lock cannot have more than one holder')
+    return mode
+
+
+@contextmanager
+def flock_any(file_paths, operation, timeout):
+    """Acquire the flock operation on any of the file paths, the first
+    acquired file wins.
+
+    Without timeout, a single lock file is acquired with a blocking flock
+    call, the kernel wakes up the waiting process when the lock is released.
+    Otherwise the lock files are polled every ``LOCK_POLL_INTERVAL`` seconds
+    with non blocking flock calls, with no fairness between the waiting
+    processes: a blocking flock call can not be interrupted at timeout.
+
+    The lock files are opened only once, the waiting processes do not notify
+    the watchers of the lock files, and no file stays open once the timeout
+    is reached.
+
+    Yield the acquired file handler.
+    """
+    handlers = [open(file_path, 'a+') for file_path in file_paths]
+    acquired_handler = None
+    deadline = None if timeout is None else time.time() + timeout
+    try:
+        if timeout is None and len(handlers) == 1:
+            fcntl.flock(handlers[0], operation)
+            acquired_handler = handlers[0]
+        while acquired_handler is None:
+            for handler in handlers:
+                try:
+                    fcntl.flock(handler, operation | fcntl.LOCK_NB)
+                    acquired_handler = handler
+                    break
+                except (OSError, IOError):
+                    pass
+            if acquired_handler is None:
+                if deadline is not None and time.time() >= deadline:
+                    raise FunctionLockerError(
+                        'timeout while waiting lock of: {}'.format(', '.join(file_paths))
+                    )
+                time.sleep(LOCK_POLL_INTERVAL)
+    finally:
+        for handler in handlers:
+            if handler is not acquired_handler:
+                handler.close()
+    try:
+        yield acquired_handler
+    finally:
+        fcntl.flock(acquired_handler, fcntl.LOCK_UN)
+        acquired_handler.close()
+
+
+@contextmanager
+def _exclusive_lock(lock_file_path, timeout):
+    """Exclusive lock of the function lock file, the process id is written to
+    the lock file while locked"""
+    process_id = str(os.getpid())
+    # to prevent dead lock when recursively calling this function
+    # check if the same process is trying to acquire the lock
+    _check_deadlock(lock_file_path, process_id)
+    if _shared_holds[(process_id, lock_file_path)]:
+        raise FunctionLockerError(
+            'recursion detected: the function file already locked by the same process'
+        )
+
+    with lock_stats.recorded_lock(
+        flock_any([lock_file_path], fcntl.LOCK_EX, timeout), 'lock_function', lock_file_path
+    ) as handler:
+        # write the process id that locked this function
+        _write_content(handler, process_id)
+        try:
+            yield handler
+        finally:
+            # clear the file
+            _write_content(handler, None)
+
+
+@contextmanager
+def _shared_lock(lock_file_path, max_holders, timeout):
+    """Shared lock of the function lock file, any number of processes can
+    hold it, but not at the same time as an exclusive lock holder.
+
+    When max_holders is more than one, the holders are limited by holding one
+    of the max_holders slot files, the process id is written to the slot file
+    while locked.
+    """
+    process_id = str(os.getpid())
+    # check if the same process hold the exclusive lock
+    _check_deadlock(lock_file_path, process_id)
+    hold_key = (process_id, lock_file_path)
+    if max_holders > 1 and _shared_holds[hold_key]:
+        raise FunctionLockerError(
+            'recursion detected: the function slot already locked by the same process'
+        )
+
+    _shared_holds[hold_key] += 1
+    try:
+        if max_holders > 1:
+            slot_paths = ['{0}.{1}'.format(lock_file_path, index) for index in range(max_holders)]
+            with lock_stats.recorded_lock(
+                flock_any(slot_paths, fcntl.LOCK_EX, timeout), 'lock_function', lock_file_path
+            ) as slot_handler:
+                with flock_any([lock_file_path], fcntl.LOCK_SH, timeout):
+                    _write_content(slot_handler, process_id)
+                    try:
+                        yield slot_handler
+                    finally:
+                        _write_content(slot_handler, None)
+        else:
+            with lock_stats.recorded_lock(
+                flock_any([lock_file_path], fcntl.LOCK_SH, timeout),
+                'lock_function',
+                lock_file_path,
+            ) as handler:
+                yield handler
+    finally:
+        _shared_holds[hold_key] -= 1
+
+
+def _lock(lock_file_path, mode, max_holders, timeout):
+    """Return the lock context manager of the function lock file"""
+    if mode == LOCK_MODE_SHARED:
+        return _shared_lock(lock_file_path, max_holders, timeout)
+    return _exclusive_lock(lock_file_path, timeout)
+
+
 def lock_function(
     function=None,
     scope=_get_default_scope,
     scope_context=None,
     scope_kwargs=None,
     timeout=LOCK_DEFAULT_TIMEOUT,
+    mode=None,
+    max_holders=1,
 ):
     """Generic function locker, lock any decorated function. Any parallel
      pytest xdist worker will wait for this function to finish
@@ -210,14 +372,22 @@ def lock_function(
     :type scope_kwargs: dict
     :type scope_context: str
     :type timeout: int
+    :type mode: str
+    :type max_holders: int
 
     :param function: the function that is intended to be locked
     :param scope: this parameter will define the namespace of locking
     :param scope_context: an added context string if applicable, of a concrete
            lock in combination with scope and function.
     :param scope_kwargs: kwargs to be passed to scope if is a callable
-    :param timeout: the time in seconds to wait for acquiring the lock
+    :param timeout: the time in seconds to wait for acquiring the lock, None
+        to wait without timeout, see :func:`flock_any`
+    :param mode: the lock mode, exclusive or shared, by default exclusive when
+        max_holders is 1 else shared
+    :param max_holders: the max number of workers that can run the function
+        at the same time, only for shared lock mode
     """
+    mode = _get_lock_mode(mode, max_holders)
     class_names = []
     class_name = None
     index = 1
@@ -241,27 +411,14 @@ def lock_function(
             lock_file_path = _get_function_name_lock_path(
                 function_name, scope=scope, scope_kwargs=scope_kwargs, scope_context=scope_context
             )
-            process_id = str(os.getpid())
-            # to prevent dead lock when recursively calling this function
-            # check if the same process is trying to acquire the lock
-            _check_deadlock(lock_file_path, process_id)
-
-            with file_lock(lock_file_path, remove=False, timeout=timeout) as handler:
+            with _lock(lock_file_path, mode, max_holders, timeout):
                 logger.info(
-                    'process id: {0} lock function using file path: {1}'.format(
-                        process_id, lock_file_path
+                    'process id: {0} {1} lock function using file path: {2}'.format(
+                        os.getpid(), mode, lock_file_path
                     )
                 )
-                # write the process id that locked this function
-                _write_content(handler, process_id)
                 # call the locked function
-                try:
-                    res = func(*args, **kwargs)
-                finally:
-                    # clear the file
-                    _write_content(handler, None)
-
-            return res
+                return func(*args, **kwargs)
 
         return function_wrapper
 
@@ -281,6 +438,8 @@ def locking_function(
     scope_context=None,
     scope_kwargs=None,
     timeout=LOCK_DEFAULT_TIMEOUT,
+    mode=None,
+    max_holders=1,
 ):
     """Lock a function in combination with a scope and scope_context.
     Any parallel pytest xdist worker will wait for this function to finish.
@@ -290,14 +449,22 @@ def locking_function(
     :type scope_kwargs: dict
     :type scope_context: str
     :type timeout: int
+    :type mode: str
+    :type max_holders: int
 
     :param function: the function that is intended to be locked
     :param scope: this parameter will define the namespace of locking
     :param scope_context: an added context string if applicable, of a concrete
            lock in combination with scope and function.
     :param scope_kwargs: kwargs to be passed to scope if is a callable
-    :param timeout: the time in seconds to wait for acquiring the lock
+    :param timeout: the time in seconds to wait for acquiring the lock, None
+        to wait without timeout, see :func:`flock_any`
+    :param mode: the lock mode, exclusive or shared, by default exclusive when
+        max_holders is 1 else shared
+    :param max_holders: the max number of workers that can hold the lock at
+        the same time, only for shared lock mode
     """
+    mode = _get_lock_mode(mode, max_holders)
     if not getattr(function, '__function_locked__', False):
         raise FunctionLockerError('Cannot ensure locking when using a non locked function')
     class_name = getattr(function, '__class_name__', None)
@@ -305,22 +472,11 @@ def locking_function(
     lock_file_path = _get_function_name_lock_path(
         function_name, scope=scope, scope_kwargs=scope_kwargs, scope_context=scope_context
     )
-    process_id = str(os.getpid())
-    # to prevent dead lock when recursively calling this function
-    # check if the same process is trying to acquire the lock
-    _check_deadlock(lock_file_path, process_id)
-
-    with file_lock(lock_file_path, remove=False, timeout=timeout) as handler:
+    with _lock(lock_file_path, mode, max_holders, timeout) as handler:
         logger.info(
-            'process id: {0} - lock function name:{1}  - using file path: {2}'.format(
-                process_id, function_name, lock_file_path
+            'process id: {0} - {1} lock function name:{2}  - using file path: {3}'.format(
+                os.getpid(), mode, function_name, lock_file_path
             )
         )
-        # write the process id that locked this function
-        _write_content(handler, process_id)
         # let the locked code run
-        try:
-            yield handler
-        finally:
-            # clear the file
-            _write_content(handler, None)
+        yield handler
@@ -1,5 +1,26 @@
 # -*- encoding: utf-8 -*-
 import json
+import time
+from contextlib import contextmanager
+
+# the sleep time in seconds of watchers that are not notified
+WATCH_POLL_INTERVAL = 0.1
+
+
+class KeyWatcher(object):
+    """Default key watcher, that is never notified and simply sleep"""
+
+    def __init__(self, interval=WATCH_POLL_INTERVAL):
+        self._interval = interval
+
+    def wait(self, timeout):
+        """Block until the key is written or timeout seconds elapsed, return
+        whether notified"""
+        time.sleep(min(timeout, self._interval))
+        return False
+
+    def close(self):
+        """Release the watcher resources"""
 
 
 class BaseStorageHandler(object):
@@ -15,6 +36,28 @@ class BaseStorageHandler(object):
         """Return the storage locker context manager"""
         raise NotImplementedError
 
+    def is_locked(self, key):
+        """Return whether an other process hold the key lock
+
+        note: the default implementation return False, the waiting processes
+            will fall back to the exclusive storage lock.
+        """
+        return False
+
+    @contextmanager
+    def watch(self, key):
+        """Return a context manager of a key watcher, the watcher wait method
+        is woken up as soon as the key value is written.
+
+        note: the watcher must be created before checking the key value, to
+            not miss a value written in between.
+        """
+        watcher = KeyWatcher()
+        try:
+            yield watcher
+        finally:
+            watcher.close()
+
     def when_lock_acquired(self, data):
         """called when the lock is acquired to do some added action"""
         raise NotImplementedError
@@ -23,6 +66,11 @@ class BaseStorageHandler(object):
         """Return the key value"""
         raise NotImplementedError
 
-    def set(self, key, value):
-        """Write the value of key to storage"""
+    def set(self, key, value, timeout=None):
+        """Write the value of key to storage
+
+        :param timeout: the time in seconds after which the value expire, the
+            storage handlers may ignore it, the shared function check the
+            value expiration anyway
+        """
         raise NotImplementedError
@@ -1,12 +1,19 @@
 # -*- encoding: utf-8 -*-
+import copy
+import ctypes.util
+import fcntl
 import logging
 import os
+import select
+import struct
 import tempfile
-
-from pytest_services.locks import file_lock
+import time
+from contextlib import contextmanager
 
 from robottelo.config import settings
+from robottelo.decorators.func_locker import flock_any
 from robottelo.decorators.func_shared.base import BaseStorageHandler
+from robottelo.decorators.func_shared.base import KeyWatcher
 
 TEMP_ROOT_DIR = 'robottelo'
 TEMP_FUNC_SHARED_DIR = 'shared_functions'
@@ -14,8 +21,28 @@ SHARED_DIR = None
 
 logger = logging.getLogger(__name__)
 
+# inotify is used to notify the watchers, when not available (not linux) the
+# watchers fall back to polling
+try:
+    _libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+    _inotify_init1 = _libc.inotify_init1
+    _inotify_add_watch = _libc.inotify_add_watch
+except (OSError, AttributeError):
+    _inotify_init1 = _inotify_add_watch = None
+
+_IN_CLOSE_WRITE = 0x00000008
+_IN_MOVED_TO = 0x00000080
+# the key file is replaced by a rename, the lock file is closed on release
+_INOTIFY_MASK = _IN_CLOSE_WRITE | _IN_MOVED_TO
+# struct inotify_event {int wd; uint32_t mask; uint32_t cookie; uint32_t len; char name[];}
+_INOTIFY_EVENT = struct.Struct('iIII')
+
 LOCK_TIMEOUT = 7200
 
+# per process read cache of decoded values,
+# {key_file_path: (st_ino, st_mtime_ns, st_size, value)}
+_read_cache = {}
+
 
 def get_temp_dir():
     tmp_dir = settings.tmp_dir
@@ -44,6 +71,50 @@ def _get_root_dir(create=True):
     return SHARED_DIR
 
 
+class InotifyKeyWatcher(KeyWatcher):
+    """Key watcher notified by the inotify events of the storage directory"""
+
+    def __init__(self, dir_path, names):
+        super(InotifyKeyWatcher, self).__init__()
+        self._names = {name.encode() for name in names}
+        self._fd = _inotify_init1(os.O_NONBLOCK | os.O_CLOEXEC)
+        if self._fd < 0:
+            raise OSError(ctypes.get_errno(), 'inotify_init1 failed')
+        if _inotify_add_watch(self._fd, dir_path.encode(), _INOTIFY_MASK) < 0:
+            errno = ctypes.get_errno()
+            os.close(self._fd)
+            raise OSError(errno, 'inotify_add_watch failed for {}'.format(dir_path))
+
+    def _read_events(self):
+        """Return whether one of the read events concern the watched names"""
+        try:
+            data = os.read(self._fd, 65536)
+        except BlockingIOError:
+            return False
+        notified = False
+        offset = 0
+        while offset < len(data):
+            _, _, _, name_length = _INOTIFY_EVENT.unpack_from(data, offset)
+            name_start = offset + _INOTIFY_EVENT.size
+            offset = name_start + name_length
+            if data[name_start:offset].rstrip(b'\0') in self._names:
+                notified = True
+        return notified
+
+    def wait(self, timeout):
+        deadline = time.time() + timeout
+        remaining = timeout
+        while remaining > 0:
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if readable and self._read_events():
+                return True
+            remaining = deadline - time.time()
+        return False
+
+    def close(self):
+        os.close(self._fd)
+
+
 class FileStorageHandler(BaseStorageHandler):
     """Key value file storage handler."""
 
@@ -68,10 +139,43 @@ class FileStorageHandler(BaseStorageHandler):
     def lock(self, key):
         """Return the storage locker context manager"""
         lock_key = '{}.lock'.format(key)
-        return file_lock(
-            self.get_key_file_path(lock_key), remove=False, timeout=self._lock_timeout
+        # the lock file is opened once, closing it notify the watchers
+        return flock_any(
+            [self.get_key_file_path(lock_key)], fcntl.LOCK_EX, timeout=self._lock_timeout
         )
 
+    def is_locked(self, key):
+        """Return whether an other process hold the key file lock"""
+        lock_file_path = self.get_key_file_path('{}.lock'.format(key))
+        if not os.path.exists(lock_file_path):
+            return False
+        # open in read mode, closing the file must not notify the watchers
+        with open(lock_file_path, 'r') as handler:
+            try:
+                fcntl.flock(handler, fcntl.LOCK_SH | fcntl.LOCK_NB)
+            except (OSError, IOError):
+                return True
+            fcntl.flock(handler, fcntl.LOCK_UN)
+        return False
+
+    @contextmanager
+    def watch(self, key):
+        """Return a context manager of a key watcher notified by inotify when
+        the key file is replaced or the key lock file released
+        """
+        watcher = None
+        if _inotify_init1 is not None:
+            try:
+                watcher = InotifyKeyWatcher(self._root_dir, [key, '{}.lock'.format(key)])
+            except OSError as err:
+                logger.warning('inotify not usable, falling back to polling: {}'.format(err))
+        if watcher is None:
+            watcher = KeyWatcher()
+        try:
+            yield watcher
+        finally:
+            watcher.close()
+
     def when_lock_acquired(self, handler):
         """Write the process id to file handler"""
         handler.seek(0)
@@ -81,25 +185,54 @@ class FileStorageHandler(BaseStorageHandler):
 
     def get(self, key):
         """Return the key value
+
+        The decoded value is cached per process and is reused as long as the
+        key file inode, modification time and size did not change, as the
+        file is always replaced atomically this is safe to be called without
+        holding any lock.
+
         :type key: str
         """
-        value = None
         key_file_path = self.get_key_file_path(key)
-        if os.path.exists(key_file_path):
+        try:
             with open(key_file_path, 'r') as file_handler:
+                stat = os.fstat(file_handler.fileno())
+                stat_id = (stat.st_ino, stat.st_mtime_ns, stat.st_size)
+                cached = _read_cache.get(key_file_path)
+                if cached is not None and cached[:3] == stat_id:
+                    return copy.deepcopy(cached[3])
                 value = file_handler.read()
+        except (OSError, IOError):
+            _read_cache.pop(key_file_path, None)
+            return None
 
-        if value is not None:
-            value = self.decode(value)
+        value = self.decode(value)
+        _read_cache[key_file_path] = stat_id + (copy.deepcopy(value),)
         return value
 
-    def set(self, key, value):
+    def set(self, key, value, timeout=None):
         """Write the value of key
 
+        The value is written to a temporary file in the same directory that
+        replace the key file when complete, that way the readers never see a
+        partially written value.
+
         :type key: str
         :type value: object
+        :type timeout: int
         """
         value = self.encode(value)
         key_file_path = self.get_key_file_path(key)
-        with open(key_file_path, 'w') as file_handler:
-            file_handler.write(value)
+        handle, temp_file_path = tempfile.mkstemp(
+            prefix='.{}.'.format(key), suffix='.tmp', dir=self._root_dir
+        )
+        try:
+            with os.fdopen(handle, 'w') as file_handler:
+                file_handler.write(value)
+                file_handler.flush()
+                os.fsync(file_handler.fileno())
+            os.rename(temp_file_path, key_file_path)
+        except Exception:
+            if os.path.exists(temp_file_path):
+                os.remove(temp_file_path)
+            raise
@@ -1,45 +1,233 @@
 # -*- encoding: utf-8 -*-
+import json
+import logging
+import os
+import time
+import uuid
+import zlib
+from contextlib import contextmanager
+
 try:
     import redis
 except ImportError:
     redis = None
 
 from robottelo.decorators.func_shared.base import BaseStorageHandler
+from robottelo.decorators.func_shared.base import KeyWatcher
+
+logger = logging.getLogger(__name__)
 
 REDIS_HOST = 'localhost'
 REDIS_PORT = 6379
 REDIS_DB = 0
 REDIS_PASSWORD = None
+# the max number of connections of the process connection pool
+REDIS_MAX_CONNECTIONS = 10
+# the encoded values of this size or more are compressed, 0 to disable
+REDIS_COMPRESS_THRESHOLD = 0
 LOCK_TIMEOUT = 7200
+# the max time in seconds to wait the lock release notification before
+# trying again to acquire the lock
+LOCK_WATCH_TIMEOUT = 1
+
+_COMPRESSED_PREFIX = b'zlib:'
+_COMPRESSED_PREFIX_LENGTH = len(_COMPRESSED_PREFIX)
+
+# the connection pools of this process, {(pid, host, port, db): pool}
+_connection_pools = {}
+
+# set the lock key if not set and return the key value, in one round trip
+# KEYS: lock_key, key - ARGV: token
+# return {1 if acquired else 0, value}
+_ACQUIRE_SCRIPT = """
+local acquired = 0
+if redis.call('set', KEYS[1], ARGV[1], 'NX') then
+    acquired = 1
+end
+return {acquired, redis.call('get', KEYS[2])}
+"""
+
+# write the pending value, delete the lock key if still the lock owner and
+# notify the watchers, in one round trip. The value is written even when the
+# lock was lost, e.g. its key was deleted, to not leave the waiters without it
+# KEYS: lock_key, key - ARGV: token, channel, value, expire seconds
+# return 1 if was the lock owner else 0
+_RELEASE_SCRIPT = """
+if ARGV[3] ~= '' then
+    if tonumber(ARGV[4]) > 0 then
+        redis.call('set', KEYS[2], ARGV[3], 'EX', ARGV[4])
+    else
+        redis.call('set', KEYS[2], ARGV[3])
+    end
+end
+local owner = 0
+if redis.call('get', KEYS[1]) == ARGV[1] then
+    redis.call('del', KEYS[1])
+    owner = 1
+end
+redis.call('publish', ARGV[2], 'released')
+return owner
+"""
+
+
+def _get_connection_pool(host, port, db, password, max_connections):
+    """Return the process connection pool of the redis server"""
+    pool_key = (os.getpid(), host, port, db)
+    pool = _connection_pools.get(pool_key)
+    if pool is None:
+        pool = redis.ConnectionPool(
+            host=host, port=port, db=db, password=password, max_connections=max_connections
+        )
+        _connection_pools[pool_key] = pool
+    return pool
+
+
+class RedisKeyWatcher(KeyWatcher):
+    """Key watcher notified by the messages published on the key channel"""
+
+    def __init__(self, client, channel):
+        super(RedisKeyWatcher, self).__init__()
+        self._pubsub = client.pubsub(ignore_subscribe_messages=True)
+        self._pubsub.subscribe(channel)
+
+    def wait(self, timeout):
+        deadline = time.time() + timeout
+        remaining = timeout
+        while remaining > 0:
+            if self._pubsub.get_message(timeout=remaining) is not None:
+                return True
+            remaining = deadline - time.time()
+        return False
+
+    def close(self):
+        self._pubsub.close()
 
 
 class RedisStorageHandler(BaseStorageHandler):
-    """Redis Key value storage handler"""
+    """Redis Key value storage handler
+
+    The lock acquisition return the key value in the same round trip, and the
+    value written while holding the lock is written at lock release, that way
+    the lock, get, set sequence cost only two round trips.
+    """
 
     def __init__(
         self,
-        host=REDIS_HOST,
-        port=REDIS_PORT,
-        db=REDIS_DB,
-        password=REDIS_PASSWORD,
-        lock_timeout=LOCK_TIMEOUT,
+        host=None,
+        port=None,
+        db=None,
+        password=None,
+        lock_timeout=None,
+        max_connections=None,
+        compress_threshold=None,
     ):
 
+        if host is None:
+            host = REDIS_HOST
+        if port is None:
+            port = REDIS_PORT
+        if db is None:
+            db = REDIS_DB
+        if password is None:
+            password = REDIS_PASSWORD
+        if lock_timeout is None:
+            lock_timeout = LOCK_TIMEOUT
+        if max_connections is None:
+            max_connections = REDIS_MAX_CONNECTIONS
+        if compress_threshold is None:
+            compress_threshold = REDIS_COMPRESS_THRESHOLD
+
         self._lock_timeout = lock_timeout
-        self._client = redis.StrictRedis(host=host, port=port, db=db, password=password)
+        self._compress_threshold = compress_threshold
+        self._client = redis.StrictRedis(
+            connection_pool=_get_connection_pool(host, port, db, password, max_connections)
+        )
+        self._acquire_script = self._client.register_script(_ACQUIRE_SCRIPT)
+        self._release_script = self._client.register_script(_RELEASE_SCRIPT)
+        # the locks held by this handler, {key: {'token', 'value', 'pending'}}
+        self._locks = {}
 
     @property
     def client(self):
         return self._client
 
+    def encode(self, data):
+        """Encode data as compact json, compressed if large enough"""
+        data = json.dumps(data, separators=(',', ':')).encode()
+        if self._compress_threshold and len(data) >= self._compress_threshold:
+            data = _COMPRESSED_PREFIX + zlib.compress(data)
+        return data
+
+    @staticmethod
+    def decode(data):
+        if data.startswith(_COMPRESSED_PREFIX):
+            data = zlib.decompress(data[_COMPRESSED_PREFIX_LENGTH:])
+        return json.loads(data)
+
+    @staticmethod
+    def _get_lock_key(key):
+        return '{}.lock'.format(key)
+
+    @staticmethod
+    def _get_channel(key):
+        return '{}.channel'.format(key)
+
+    def _try_acquire(self, key, token):
+        """Try to acquire the key lock, return whether acquired and the key
+        value"""
+        acquired, value = self._acquire_script(keys=[self._get_lock_key(key), key], args=[token])
+        return bool(acquired), value
+
+    @contextmanager
     def lock(self, key, timeout=None):
         """Return the storage locker context manager"""
         if timeout is None:
             timeout = self._lock_timeout
 
-        lock_key = '{}.lock'.format(key)
+        token = uuid.uuid4().hex
+        start_time = time.time()
         # If acquired the lock will be acquired until release
-        return self.client.lock(lock_key, timeout=None, blocking_timeout=timeout)
+        with self.watch(key) as watcher:
+            acquired, value = self._try_acquire(key, token)
+            while not acquired:
+                if time.time() - start_time > timeout:
+                    raise TimeoutError('timeout while waiting lock of key: {}'.format(key))
+                watcher.wait(LOCK_WATCH_TIMEOUT)
+                acquired, value = self._try_acquire(key, token)
+
+        self._locks[key] = dict(token=token, value=value, pending=None)
+        try:
+            yield token
+        finally:
+            lock = self._locks.pop(key)
+            pending_value, expire = lock['pending'] or ('', 0)
+            owner = self._release_script(
+                keys=[self._get_lock_key(key), key],
+                args=[token, self._get_channel(key), pending_value, expire],
+            )
+            if not owner:
+                logger.warning(
+                    'The lock of key {} was lost while held, its value was written '
+                    'without it'.format(key)
+                )
+
+    def is_locked(self, key):
+        """Return whether an other process hold the key lock"""
+        if key in self._locks:
+            # held by this handler
+            return False
+        return bool(self.client.exists(self._get_lock_key(key)))
+
+    @contextmanager
+    def watch(self, key):
+        """Return a context manager of a key watcher subscribed to the key
+        channel, notified when the key is written or the key lock released
+        """
+        watcher = RedisKeyWatcher(self.client, self._get_channel(key))
+        try:
+            yield watcher
+        finally:
+            watcher.close()
 
     def when_lock_acquired(self, lock_object):
         # do nothing
@@ -50,16 +238,31 @@ class RedisStorageHandler(BaseStorageHandler):
 
         :type key: str
         """
-        value = self.client.get(key)
+        lock = self._locks.get(key)
+        if lock is not None:
+            # the value was fetched at lock acquisition, or written while
+            # holding the lock
+            value = lock['pending'][0] if lock['pending'] else lock['value']
+        else:
+            value = self.client.get(key)
         if value is not None:
             value = self.decode(value)
         return value
 
-    def set(self, key, value):
-        """Write the value of key
+    def set(self, key, value, timeout=None):
+        """Write the value of key, if the lock of key is held the value is
+        written at lock release
 
         :type key: str
         :type value: object
+        :type timeout: int
+        :param timeout: the time in seconds after which the value expire
         """
         value = self.encode(value)
-        self.client.set(key, value)
+        if key in self._locks:
+            self._locks[key]['pending'] = (value, timeout or 0)
+            return
+        pipeline = self.client.pipeline()
+        pipeline.set(key, value, ex=timeout or None)
+        pipeline.publish(self._get_channel(key), 'set')
+        pipeline.execute()
@@ -92,6 +92,7 @@ import inspect
 import logging
 import os
 import sys
+import time
 import traceback
 import uuid
 from importlib import import_module
@@ -99,15 +100,23 @@ from importlib import import_module
 from nailgun.entities import Entity
 
 from robottelo.config import settings
+from robottelo.decorators import lock_stats
 from robottelo.decorators import setting_is_set
+from robottelo.decorators.func_locker import FunctionLockerError
 from robottelo.decorators.func_shared import file_storage
 from robottelo.decorators.func_shared import redis_storage
+from robottelo.decorators.func_shared import sqlite_storage
 from robottelo.decorators.func_shared.file_storage import FileStorageHandler
 from robottelo.decorators.func_shared.redis_storage import RedisStorageHandler
+from robottelo.decorators.func_shared.sqlite_storage import SQLiteStorageHandler
 
 logger = logging.getLogger(__name__)
 
-_storage_handlers = {'file': FileStorageHandler, 'redis': RedisStorageHandler}
+_storage_handlers = {
+    'file': FileStorageHandler,
+    'redis': RedisStorageHandler,
+    'sqlite': SQLiteStorageHandler,
+}
 
 DEFAULT_STORAGE_HANDLER = 'file'
 # by default using the shared data is disabled
@@ -116,6 +125,9 @@ NAMESPACE_SCOPE = None
 # after 24 hours the shared function data will became not valid
 SHARE_DEFAULT_TIMEOUT = 86400
 DEFAULT_CALL_RETRIES = 2
+# the max time in seconds a waiter sleep before checking again the storage,
+# in case of a missed notification
+WATCH_TIMEOUT = 1
 
 _configured = False
 
@@ -154,6 +166,10 @@ def _check_config():
         redis_storage.REDIS_PORT = settings.shared_function.redis_port
         redis_storage.REDIS_DB = settings.shared_function.redis_db
         redis_storage.REDIS_PASSWORD = settings.shared_function.redis_password
+        redis_storage.REDIS_MAX_CONNECTIONS = settings.shared_function.redis_max_connections
+        redis_storage.REDIS_COMPRESS_THRESHOLD = settings.shared_function.redis_compress_threshold
+        sqlite_storage.LOCK_TIMEOUT = settings.shared_function.lock_timeout
+        sqlite_storage.SQLITE_DB_PATH = settings.shared_function.sqlite_db_path
         _set_configured(True)
 
 
@@ -301,71 +317,118 @@ class _SharedFunction(object):
 
         return False
 
-    def __call__(self):
-        # this lock prevent any other process to run the function,
-        # and if an other process is running the function, I should wait it
-        # to finish
-        # note: when results are ready this lock has a very short time
-        with self.storage.lock(self.key) as data:
-            self.storage.when_lock_acquired(data)
-            # first must investigate, call the function or use the results
-            result = None
-            error = None
-            traceback_text = ''
-            error_class_name = None
-            exp = None
-            pid = None
-            value = self.storage.get(self.key)
-            if value is None:
-                call_function = True
-            else:
-                state = value['state']
-                result = value['result']
-                error = value['error']
-                traceback_text = value.get('traceback', '')
-                error_class_name = value.get('error_class_name')
-                pid = value['pid']
-                creation_datetime = datetime.datetime.strptime(
-                    value['creation_datetime'], _DATETIME_FORMAT
-                )
+    def _is_value_usable(self, value):
+        """Return whether the stored value is a final and not expired one"""
+        if value is None or value['state'] not in [_STATE_READY, _STATE_FAILED]:
+            return False
+        creation_datetime = datetime.datetime.strptime(
+            value['creation_datetime'], _DATETIME_FORMAT
+        )
+        return not self._has_result_expired(creation_datetime)
+
+    def _get_ready_value(self):
+        """Return the stored value if usable without taking the exclusive
+        storage lock, if a process is running the function wait to be notified
+        that the value is written, until the storage lock timeout
+        """
+        # the storage write is atomic, reading without any lock is safe
+        value = self.storage.get(self.key)
+        if self._is_value_usable(value):
+            return value
+        requested = time.time()
+        lock_timeout = getattr(self.storage, '_lock_timeout', None) or self._share_timeout
+        waited = False
+        value = None
+        with self.storage.watch(self.key) as watcher:
+            while True:
+                value = self.storage.get(self.key)
+                if self._is_value_usable(value):
+                    break
+                value = None
+                if not self.storage.is_locked(self.key):
+                    # nobody is running the function
+                    break
+                waited = True
+                remaining = lock_timeout - (time.time() - requested)
+                if remaining <= 0:
+                    if lock_stats.ENABLED:
+                        lock_stats.record(
+                            'shared_function',
+                            self.key,
+                            requested,
+                            time.time() - requested,
+                            0,
+                            failed=True,
+                        )
+                    raise FunctionLockerError(
+                        'timeout while waiting the shared function result of key: {}'.format(
+                            self.key
+                        )
+                    )
+                watcher.wait(min(WATCH_TIMEOUT, remaining))
+        if waited and lock_stats.ENABLED:
+            lock_stats.record('shared_function', self.key, requested, time.time() - requested, 0)
+        return value
 
-                if state in [_STATE_READY, _STATE_FAILED] and not self._has_result_expired(
-                    creation_datetime
-                ):
-                    call_function = False
-                else:
+    def __call__(self):
+        result = None
+        error = None
+        traceback_text = ''
+        error_class_name = None
+        exp = None
+        pid = None
+        call_function = False
+        # when the results are ready, no exclusive lock is needed
+        value = self._get_ready_value()
+        if value is None:
+            # this lock prevent any other process to run the function,
+            # and if an other process is running the function, I should wait
+            # it to finish
+            with lock_stats.recorded_lock(
+                self.storage.lock(self.key), 'shared_function', self.key
+            ) as data:
+                self.storage.when_lock_acquired(data)
+                # an other process may have finished the function call while
+                # waiting the lock
+                value = self.storage.get(self.key)
+                if not self._is_value_usable(value):
                     call_function = True
-
-            if call_function is True:
-                result, exp, traceback_text = self._call_function()
-                creation_datetime = datetime.datetime.utcnow().strftime(_DATETIME_FORMAT)
-                if exp:
-                    error = str(exp) or 'error occurred'
-                    error_class_name = '{0}.{1}'.format(
-                        exp.__class__.__module__, exp.__class__.__name__
-                    )
-                    value = dict(
-                        state=_STATE_FAILED,
-                        id=self.transaction,
-                        result=None,
-                        error=error,
-                        error_class_name=error_class_name,
-                        traceback=traceback_text,
-                        pid=os.getpid(),
-                        creation_datetime=creation_datetime,
-                    )
-                else:
-                    error = None
-                    result = self._encode_result_kwargs(result)
-                    value = dict(
-                        state=_STATE_READY,
-                        id=self.transaction,
-                        result=result,
-                        error=error,
-                        pid=os.getpid(),
-                        creation_datetime=creation_datetime,
-                    )
-                self.storage.set(self.key, value)
+                    result, exp, traceback_text = self._call_function()
+                    creation_datetime = datetime.datetime.utcnow().strftime(_DATETIME_FORMAT)
+                    if exp:
+                        error = str(exp) or 'error occurred'
+                        error_class_name = '{0}.{1}'.format(
+                            exp.__class__.__module__, exp.__class__.__name__
+                        )
+                        value = dict(
+                            state=_STATE_FAILED,
+                            id=self.transaction,
+                            result=None,
+                            error=error,
+                            error_class_name=error_class_name,
+                            traceback=traceback_text,
+                            pid=os.getpid(),
+                            creation_datetime=creation_datetime,
+                        )
+                    else:
+                        error = None
+                        result = self._encode_result_kwargs(result)
+                        value = dict(
+                            state=_STATE_READY,
+                            id=self.transaction,
+                            result=result,
+                            error=error,
+                            pid=os.getpid(),
+                            creation_datetime=creation_datetime,
+                        )
+                    self.storage.set(self.key, value, timeout=self._share_timeout)
+
+        if not call_function:
+            result = value['result']
+            error = value['error']
+            traceback_text = value.get('traceback', '')
+            error_class_name = value.get('error_class_name')
+            pid = value['pid']
 
         if call_function and exp:
             # i'am in the first launched process
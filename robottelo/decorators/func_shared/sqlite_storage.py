@@ -0,0 +1,272 @@
+# -*- encoding: utf-8 -*-
+"""SQLite key value storage handler, usable by all the xdist workers of the
+same host without any added service.
+
+The lock ownership is stored in the key row itself::
+
+    FREE --(lock acquired)--> PENDING (lock_pid, heartbeat) --(release)--> FREE
+
+A PENDING row whose owner process is dead, or that did not update its
+heartbeat since HEARTBEAT_TIMEOUT seconds is considered FREE.
+"""
+import logging
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+from robottelo.decorators.func_shared.base import BaseStorageHandler
+from robottelo.decorators.func_shared.file_storage import _get_root_dir
+
+logger = logging.getLogger(__name__)
+
+SQLITE_DB_FILE_NAME = 'shared_functions.sqlite'
+SQLITE_DB_PATH = None
+LOCK_TIMEOUT = 7200
+# the sleep time in seconds between lock acquiring attempts
+LOCK_SLEEP = 0.1
+# the lock owner update its heartbeat each HEARTBEAT_INTERVAL seconds
+HEARTBEAT_INTERVAL = 10
+# the lock of an owner that did not update the heartbeat since this time in
+# seconds is considered free
+HEARTBEAT_TIMEOUT = 60
+
+_STATE_FREE = 'FREE'
+_STATE_PENDING = 'PENDING'
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS shared_values ('
+    ' key TEXT PRIMARY KEY,'
+    ' value TEXT,'
+    ' expire_at REAL,'
+    ' lock_state TEXT NOT NULL DEFAULT \'{0}\','
+    ' lock_pid INTEGER,'
+    ' heartbeat REAL'
+    ')'.format(_STATE_FREE),
+    'CREATE INDEX IF NOT EXISTS shared_values_expire_at ON shared_values (expire_at)',
+)
+
+
+def _get_db_path():
+    if SQLITE_DB_PATH:
+        return SQLITE_DB_PATH
+    return os.path.join(_get_root_dir(), SQLITE_DB_FILE_NAME)
+
+
+def _is_process_alive(pid):
+    """Return whether the process with pid is running on this host"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        # the process exist but is owned by an other user
+        return True
+    return True
+
+
+class SQLiteStorageHandler(BaseStorageHandler):
+    """SQLite Key value storage handler"""
+
+    def __init__(self, db_path=None, lock_timeout=None):
+
+        if db_path is None:
+            db_path = _get_db_path()
+        if lock_timeout is None:
+            lock_timeout = LOCK_TIMEOUT
+
+        self._db_path = db_path
+        self._lock_timeout = lock_timeout
+        self._connection = None
+        self._connection_pid = None
+
+    @property
+    def db_path(self):
+        return self._db_path
+
+    def _connect(self):
+        connection = sqlite3.connect(
+            self._db_path, timeout=self._lock_timeout, isolation_level=None
+        )
+        # WAL mode allow readers to not be blocked by the writer
+        connection.execute('PRAGMA journal_mode=WAL')
+        connection.execute('PRAGMA synchronous=NORMAL')
+        for statement in _SCHEMA:
+            connection.execute(statement)
+        return connection
+
+    @property
+    def connection(self):
+        # a connection must not be shared with a forked process
+        if self._connection is None or self._connection_pid != os.getpid():
+            self._connection = self._connect()
+            self._connection_pid = os.getpid()
+        return self._connection
+
+    @contextmanager
+    def _transaction(self, connection=None):
+        """Immediate write transaction context manager"""
+        if connection is None:
+            connection = self.connection
+        connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield connection
+        except Exception:
+            connection.execute('ROLLBACK')
+            raise
+        else:
+            connection.execute('COMMIT')
+
+    @staticmethod
+    def _is_locked(row, now):
+        """Return whether the row lock state is owned by a live process"""
+        if row is None:
+            return False
+        lock_state, lock_pid, heartbeat = row
+        if lock_state != _STATE_PENDING:
+            return False
+        if lock_pid is None or not _is_process_alive(lock_pid):
+            return False
+        if heartbeat is None or now - heartbeat > HEARTBEAT_TIMEOUT:
+            return False
+        return True
+
+    def _get_lock_row(self, key):
+        return self.connection.execute(
+            'SELECT lock_state, lock_pid, heartbeat FROM shared_values WHERE key = ?', (key,)
+        ).fetchone()
+
+    def _try_acquire(self, key):
+        """Try to move the key row to PENDING state owned by this process"""
+        now = time.time()
+        with self._transaction() as connection:
+            row = connection.execute(
+                'SELECT lock_state, lock_pid, heartbeat FROM shared_values WHERE key = ?', (key,)
+            ).fetchone()
+            if self._is_locked(row, now):
+                return False
+            if row is None:
+                connection.execute(
+                    'INSERT INTO shared_values (key, lock_state, lock_pid, heartbeat)'
+                    ' VALUES (?, ?, ?, ?)',
+                    (key, _STATE_PENDING, os.getpid(), now),
+                )
+            else:
+                if row[0] == _STATE_PENDING:
+                    logger.warning(
+                        'shared function key: {0} - releasing stale lock of PID: {1}'.format(
+                            key, row[1]
+                        )
+                    )
+                connection.execute(
+                    'UPDATE shared_values SET lock_state = ?, lock_pid = ?, heartbeat = ?'
+                    ' WHERE key = ?',
+                    (_STATE_PENDING, os.getpid(), now, key),
+                )
+        return True
+
+    def _release(self, key):
+        with self._transaction() as connection:
+            connection.execute(
+                'UPDATE shared_values SET lock_state = ?, lock_pid = NULL, heartbeat = NULL'
+                ' WHERE key = ? AND lock_pid = ?',
+                (_STATE_FREE, key, os.getpid()),
+            )
+
+    def _heartbeat(self, key, stop_event):
+        """Update the lock heartbeat until stop_event is set"""
+        connection = self._connect()
+        try:
+            while not stop_event.wait(HEARTBEAT_INTERVAL):
+                with self._transaction(connection):
+                    connection.execute(
+                        'UPDATE shared_values SET heartbeat = ? WHERE key = ? AND lock_pid = ?',
+                        (time.time(), key, os.getpid()),
+                    )
+        finally:
+            connection.close()
+
+    def _wait(self, key, check):
+        """Wait until check return True, or raise after lock timeout"""
+        start_time = time.time()
+        while not check():
+            if time.time() - start_time > self._lock_timeout:
+                raise TimeoutError('timeout while waiting lock of key: {}'.format(key))
+            time.sleep(LOCK_SLEEP)
+
+    @contextmanager
+    def lock(self, key):
+        """Return the storage locker context manager"""
+        self._wait(key, lambda: self._try_acquire(key))
+        stop_event = threading.Event()
+        heartbeat_thread = threading.Thread(
+            target=self._heartbeat, args=(key, stop_event), daemon=True
+        )
+        heartbeat_thread.start()
+        try:
+            yield key
+        finally:
+            stop_event.set()
+            heartbeat_thread.join()
+            self._release(key)
+
+    def is_locked(self, key):
+        """Return whether the key row is in PENDING state of a live process"""
+        return self._is_locked(self._get_lock_row(key), time.time())
+
+    def when_lock_acquired(self, data):
+        # do nothing, the lock owner pid is already stored in the key row
+        pass
+
+    def get(self, key):
+        """Return the key value, expired values are not returned
+
+        :type key: str
+        """
+        row = self.connection.execute(
+            'SELECT value FROM shared_values'
+            ' WHERE key = ? AND value IS NOT NULL AND (expire_at IS NULL OR expire_at > ?)',
+            (key, time.time()),
+        ).fetchone()
+        if row is None:
+            return None
+        return self.decode(row[0])
+
+    def set(self, key, value, timeout=None):
+        """Write the value of key
+
+        :type key: str
+        :type value: object
+        :type timeout: int
+        :param timeout: the time in seconds after which the value expire
+        """
+        value = self.encode(value)
+        expire_at = None
+        if timeout:
+            expire_at = time.time() + timeout
+        with self._transaction() as connection:
+            connection.execute('INSERT OR IGNORE INTO shared_values (key) VALUES (?)', (key,))
+            connection.execute(
+                'UPDATE shared_values SET value = ?, expire_at = ? WHERE key = ?',
+                (value, expire_at, key),
+            )
+
+    def purge(self, expired_only=True):
+        """Delete the stored values and return the number of deleted rows
+
+        :type expired_only: bool
+        :param expired_only: whether to delete only the expired and not locked
+            values
+        """
+        with self._transaction() as connection:
+            if expired_only:
+                cursor = connection.execute(
+                    'DELETE FROM shared_values WHERE expire_at <= ? AND lock_state = ?',
+                    (time.time(), _STATE_FREE),
+                )
+            else:
+                cursor = connection.execute('DELETE FROM shared_values')
+        if not expired_only:
+            self.connection.execute('VACUUM')
+        return cursor.rowcount
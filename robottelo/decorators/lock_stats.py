@@ -0,0 +1,224 @@
+"""Lock contention statistics of locked and shared functions
+
+When enabled, each lock acquisition of :mod:`robottelo.decorators.func_locker`
+and :mod:`robottelo.decorators.func_shared` is recorded as a json line in an
+append only log file of the current worker process::
+
+    {"kind": "lock_function", "lock": "/path/to/func.lock", "pid": 1234,
+     "worker": "gw0", "requested": 1580000000.0, "wait": 1.2, "hold": 3.4,
+     "failed": false}
+
+The acquisitions that time out or fail are recorded with their wait time and
+``failed`` set, they are the most contended locks.
+
+The logs of a session are written in its own directory, created by the
+controller process and exported to the workers in the
+``ROBOTTELO_LOCK_STATS_DIR`` environment variable. At the end of the session
+the logs of all the workers are merged in a contention report, see
+:func:`contention_report`.
+"""
+import glob
+import json
+import os
+import shutil
+import tempfile
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+from contextlib import ExitStack
+
+from robottelo.config import settings
+
+TEMP_ROOT_DIR = 'robottelo'
+TEMP_LOCK_STATS_DIR = 'lock_stats'
+LOCK_STATS_FILE_EXT = 'jsonl'
+LOCK_STATS_DIR_PREFIX = 'session-'
+LOCK_STATS_DIR_ENV = 'ROBOTTELO_LOCK_STATS_DIR'
+ENABLED = False
+
+
+def enable_lock_stats(value):
+    """Enable or disable the lock acquisitions recording"""
+    global ENABLED
+    ENABLED = bool(value)
+
+
+def create_stats_dir():
+    """Create the lock stats directory of the current session, and export it
+    to the xdist workers through the environment
+
+    Each session records in its own directory, so that the concurrent sessions
+    running on the same host do not mix or remove each other records.
+    """
+    tmp_dir = settings.tmp_dir or tempfile.gettempdir()
+    root_dir = os.path.join(tmp_dir, TEMP_ROOT_DIR, TEMP_LOCK_STATS_DIR)
+    os.makedirs(root_dir, exist_ok=True)
+    stats_dir = tempfile.mkdtemp(prefix=LOCK_STATS_DIR_PREFIX, dir=root_dir)
+    os.environ[LOCK_STATS_DIR_ENV] = stats_dir
+    return stats_dir
+
+
+def get_stats_dir(create=True):
+    """Return the lock stats directory of the current session
+
+    :param bool create: whether to create the session directory when it does
+        not exist yet, otherwise None is returned
+    """
+    stats_dir = os.environ.get(LOCK_STATS_DIR_ENV)
+    if stats_dir is None and create:
+        stats_dir = create_stats_dir()
+    return stats_dir
+
+
+def remove_stats_dir(stats_dir=None):
+    """Remove the lock stats directory of the current session"""
+    if stats_dir is None:
+        stats_dir = get_stats_dir(create=False)
+    if stats_dir is None:
+        return
+    if os.environ.get(LOCK_STATS_DIR_ENV) == stats_dir:
+        del os.environ[LOCK_STATS_DIR_ENV]
+    shutil.rmtree(stats_dir, ignore_errors=True)
+
+
+def _get_worker_name():
+    return os.environ.get('PYTEST_XDIST_WORKER', 'master')
+
+
+def record(kind, lock_path, requested, wait, hold, stats_dir=None, failed=False):
+    """Append a lock acquisition record to the current process stats file
+
+    :param str kind: the locking kind, lock_function or shared_function
+    :param str lock_path: the lock file path or storage key
+    :param float requested: the time the lock was requested
+    :param float wait: the time in seconds waited to acquire the lock
+    :param float hold: the time in seconds the lock was held
+    :param bool failed: whether the lock acquisition timed out or failed
+    """
+    if stats_dir is None:
+        stats_dir = get_stats_dir()
+    worker = _get_worker_name()
+    pid = os.getpid()
+    line = json.dumps(
+        dict(
+            kind=kind,
+            lock=lock_path,
+            pid=pid,
+            worker=worker,
+            requested=requested,
+            wait=wait,
+            hold=hold,
+            failed=failed,
+        )
+    )
+    file_path = os.path.join(stats_dir, '{0}-{1}.{2}'.format(worker, pid, LOCK_STATS_FILE_EXT))
+    # a single write of a line in append mode is not interleaved
+    with open(file_path, 'a') as handler:
+        handler.write(line + '\n')
+
+
+@contextmanager
+def recorded_lock(lock_context, kind, lock_path):
+    """Enter lock_context and record the time waited to acquire it and the
+    time it was held, if the lock stats are enabled. A failed acquisition,
+    e.g. at timeout, is recorded as failed before re-raising its error.
+    """
+    if not ENABLED:
+        with lock_context as handler:
+            yield handler
+        return
+    requested = time.time()
+    try:
+        handler = lock_context.__enter__()
+    except Exception:
+        record(kind, lock_path, requested, time.time() - requested, 0, failed=True)
+        raise
+    acquired = time.time()
+    with ExitStack() as stack:
+        stack.push(lock_context)
+        try:
+            yield handler
+        finally:
+            record(kind, lock_path, requested, acquired - requested, time.time() - acquired)
+
+
+def load_records(stats_dir=None):
+    """Return the records of all the workers stats files sorted by time"""
+    if stats_dir is None:
+        stats_dir = get_stats_dir(create=False)
+    records = []
+    if stats_dir is None:
+        return records
+    for file_path in glob.glob(os.path.join(stats_dir, '*.{}'.format(LOCK_STATS_FILE_EXT))):
+        with open(file_path) as handler:
+            for line in handler:
+                line = line.strip()
+                if line:
+                    records.append(json.loads(line))
+    records.sort(key=lambda rec: rec['requested'])
+    return records
+
+
+def contention_report(records, top=20, timeline=True):
+    """Return the lines of the contention report of records
+
+    The report contains the top locks by total wait time, and when timeline is
+    True the lock acquisitions of each worker in time order.
+    """
+    locks = defaultdict(
+        lambda: dict(count=0, failed=0, wait=0.0, max_wait=0.0, hold=0.0, kind=None)
+    )
+    for rec in records:
+        lock = locks[rec['lock']]
+        lock['kind'] = rec['kind']
+        lock['count'] += 1
+        lock['failed'] += int(rec.get('failed', False))
+        lock['wait'] += rec['wait']
+        lock['max_wait'] = max(lock['max_wait'], rec['wait'])
+        lock['hold'] += rec['hold']
+
+    lines = ['Top {} locks by total wait time:'.format(top)]
+    lines.append(
+        '{0:>10} {1:>10} {2:>10} {3:>7} {4:>7}  {5:<15} {6}'.format(
+            'wait(s)', 'max(s)', 'hold(s)', 'count', 'failed', 'kind', 'lock'
+        )
+    )
+    by_wait = sorted(locks.items(), key=lambda item: item[1]['wait'], reverse=True)
+    for lock_path, lock in by_wait[:top]:
+        lines.append(
+            '{0:>10.2f} {1:>10.2f} {2:>10.2f} {3:>7} {4:>7}  {5:<15} {6}'.format(
+                lock['wait'],
+                lock['max_wait'],
+                lock['hold'],
+                lock['count'],
+                lock['failed'],
+                lock['kind'],
+                lock_path,
+            )
+        )
+
+    if timeline and records:
+        start_time = records[0]['requested']
+        workers = defaultdict(list)
+        for rec in records:
+            workers[rec['worker']].append(rec)
+        for worker in sorted(workers):
+            lines.append('')
+            lines.append('Worker {} timeline:'.format(worker))
+            lines.append(
+                '{0:>10} {1:>10} {2:>10} {3:>7}  {4}'.format(
+                    'start(s)', 'wait(s)', 'hold(s)', 'pid', 'lock'
+                )
+            )
+            for rec in workers[worker]:
+                lines.append(
+                    '{0:>10.2f} {1:>10.2f} {2:>10.2f} {3:>7}  {4}{5}'.format(
+                        rec['requested'] - start_time,
+                        rec['wait'],
+                        rec['hold'],
+                        rec['pid'],
+                        rec['lock'],
+                        ' (failed)' if rec.get('failed') else '',
+                    )
+                )
+    return lines
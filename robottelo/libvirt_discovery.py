@@ -15,6 +15,7 @@ from fauxfactory import gen_mac
 
 from robottelo import ssh
 from robottelo.config import settings
+from robottelo.vm_teardown import teardown_service
 
 logger = logging.getLogger(__name__)
 
@@ -160,11 +161,19 @@ class LibvirtGuest(object):
 
         self._created = True
 
-    def destroy(self):
-        """Destroys the virtual machine on the provisioning server"""
+    def destroy(self, async_=False):
+        """Destroys the virtual machine on the provisioning server
+
+        :param bool async_: whether to destroy the virtual machine and its
+            image in the background, see :mod:`robottelo.vm_teardown`
+        """
         if not self._created:
             return
 
+        if async_:
+            image_path = os.path.join(self.image_dir, '{0}.img'.format(self.hostname))
+            teardown_service.submit(self.libvirt_server, self.hostname, image_path)
+            return
         ssh.command('virsh destroy {0}'.format(self.hostname), hostname=self.libvirt_server)
         ssh.command('virsh undefine {0}'.format(self.hostname), hostname=self.libvirt_server)
         image_name = '{0}.img'.format(self.hostname)
@@ -203,4 +212,4 @@ class LibvirtGuest(object):
         return self
 
     def __exit__(self, *exc):
-        self.destroy()
+        self.destroy(async_=True)
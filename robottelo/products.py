@@ -182,6 +182,11 @@ return cdn repo data::
     # also test usage located at:
     # tests/foreman/cli/test_vm_install_products_package.py
 """
+import copy
+import hashlib
+import json
+import logging
+import time
 from typing import Any
 from typing import Dict
 from typing import List
@@ -191,10 +196,12 @@ from typing import TYPE_CHECKING
 
 from robottelo import manifests
 from robottelo.cli.activationkey import ActivationKey
+from robottelo.cli.base import CLIReturnCodeError
 from robottelo.cli.contentview import ContentView
 from robottelo.cli.factory import make_activation_key
 from robottelo.cli.factory import make_content_view
 from robottelo.cli.factory import make_lifecycle_environment
+from robottelo.cli.factory import make_org
 from robottelo.cli.factory import make_product_wait
 from robottelo.cli.factory import make_repository
 from robottelo.cli.factory import setup_virtual_machine
@@ -214,11 +221,20 @@ from robottelo.constants import ENVIRONMENT
 from robottelo.constants import MAJOR_VERSION_DISTRO
 from robottelo.constants import REPO_TYPE
 from robottelo.constants import REPOS
+from robottelo.decorators.func_shared.shared import shared
 from robottelo.helpers import get_host_info
+from robottelo.host_info import get_sat_version
+from robottelo.utils.task_waiter import cli_search_tasks
+from robottelo.utils.task_waiter import TaskFailedError
+from robottelo.utils.task_waiter import TaskTimeoutError
+from robottelo.utils.task_waiter import TaskWaiter
+from robottelo.vm_layers import content_host_layer
 
 if TYPE_CHECKING:
     from robottelo.vm import VirtualMachine  # noqa
 
+logger = logging.getLogger(__name__)
+
 REPO_TYPE_YUM = REPO_TYPE['yum']
 REPO_TYPE_DOCKER = REPO_TYPE['docker']
 REPO_TYPE_PUPPET = REPO_TYPE['puppet']
@@ -235,6 +251,13 @@ PRODUCT_KEY_VIRT_AGENTS = 'rhva6'
 PRODUCT_KEY_CLOUD_FORMS_TOOLS = 'rhct6'
 PRODUCT_KEY_ANSIBLE_ENGINE = 'rhae2'
 
+# the max number of repositories synchronized at once by RepositoryCollection
+REPOS_SYNC_CONCURRENCY = 4
+# the time in seconds to wait for the repositories synchronization
+REPOS_SYNC_TIMEOUT = 4800
+# the max time in seconds between two polls of the synchronization tasks
+REPOS_SYNC_POLL_INTERVAL = 5
+
 _server_distro = None  # type: str
 
 
@@ -264,6 +287,40 @@ class ReposContentSetupWasNotPerformed(Exception):
     setup"""
 
 
+class RepositorySyncError(Exception):
+    """Raised when a repository synchronization failed or timed out"""
+
+
+@shared(function_kw=['fingerprint', 'stale_org_id'])
+def _setup_shared_content(
+    repos_collection,
+    upload_manifest,
+    download_policy,
+    rh_subscriptions,
+    fingerprint=None,
+    stale_org_id=None,
+):
+    """Setup the content of a copy of repos_collection in a new organization
+
+    The result is shared by fingerprint, stale_org_id is the organization of
+    the shared content found removed, if any.
+    """
+    collection = RepositoryCollection(
+        distro=repos_collection.distro,
+        repositories=[copy.copy(repo) for repo in repos_collection],
+    )
+    org = make_org()
+    lce = make_lifecycle_environment({'organization-id': org['id']})
+    setup_content_data = collection.setup_content(
+        org['id'],
+        lce['id'],
+        upload_manifest=upload_manifest,
+        download_policy=download_policy,
+        rh_subscriptions=rh_subscriptions,
+    )
+    return dict(organization=collection.organization, setup_content_data=setup_content_data)
+
+
 def get_server_distro():  # type: () -> str
     global _server_distro
     if _server_distro is None:
@@ -353,6 +410,10 @@ class BaseRepository(object):
         """Synchronize the repository"""
         Repository.synchronize({'id': self.repo_info['id']}, timeout=4800)
 
+    def synchronize_async(self):  # type: () -> str
+        """Start the repository synchronization and return its task id"""
+        return Repository.synchronize({'id': self.repo_info['id'], 'async': True})[0]['id']
+
     def add_to_content_view(self, organization_id, content_view_id):
         # type: (int, int) -> None
         """Associate repository content to content-view"""
@@ -622,7 +683,10 @@ class GenericRHRepository(BaseRepository):
                 self.synchronize()
         else:
             repo_info = super(GenericRHRepository, self).create(
-                organization_id, product_id, download_policy=download_policy
+                organization_id,
+                product_id,
+                download_policy=download_policy,
+                synchronize=synchronize,
             )
         return repo_info
 
@@ -687,6 +751,7 @@ class RepositoryCollection(object):
     _custom_product_info = None  # type: Dict
     _os_repo = None  # type: RHELRepository
     _setup_content_data = None  # type: Dict[str, Dict]
+    _sync_durations = {}  # type: Dict[str, float]
 
     def __init__(self, distro=None, repositories=None):
 
@@ -810,13 +875,94 @@ class RepositoryCollection(object):
         custom_product_id = custom_product['id'] if custom_product else None
         for repo in self:
             repo_info = repo.create(
-                org_id, custom_product_id, download_policy=download_policy, synchronize=synchronize
+                org_id, custom_product_id, download_policy=download_policy, synchronize=False
             )
             repos_info.append(repo_info)
         self._custom_product_info = custom_product
         self._repos_info = repos_info
+        if synchronize:
+            self.synchronize()
         return custom_product, repos_info
 
+    @property
+    def sync_durations(self):  # type: () -> Dict[str, float]
+        """The synchronization durations in seconds by repository name"""
+        return self._sync_durations
+
+    def synchronize(self, concurrency=REPOS_SYNC_CONCURRENCY, timeout=REPOS_SYNC_TIMEOUT):
+        # type: (int, int) -> Dict[str, float]
+        """Synchronize the created repositories, with up to concurrency
+        synchronization tasks at once, all polled together.
+
+        :return: the synchronization durations in seconds by repository name
+        :raises RepositorySyncError: as soon as a synchronization task fails,
+            or at timeout, or once the started synchronizations are done when
+            a synchronization failed to start
+        """
+        pending = list(self)
+        # the synchronized repositories names, {task id: repository name}
+        repo_names = {}
+        self._sync_durations = {}
+        waiter = TaskWaiter(
+            cli_search_tasks,
+            timeout=timeout,
+            max_interval=REPOS_SYNC_POLL_INTERVAL,
+            ok_results=('success', 'warning'),
+        )
+
+        # the repositories whose synchronization failed to start, with the error
+        start_errors = []
+
+        def start_sync():
+            repo = pending.pop(0)
+            start = time.time()
+            repo_name = repo.repo_info['name']
+
+            def on_sync_done(future):
+                if future.exception() is not None:
+                    return
+                self._sync_durations[repo_name] = time.time() - start
+                logger.info(
+                    'Synchronized the repository {0} in {1:.0f}s'.format(
+                        repo_name, self._sync_durations[repo_name]
+                    )
+                )
+                if pending and not start_errors:
+                    start_sync()
+
+            try:
+                task_id = repo.synchronize_async()
+            except Exception as err:
+                # this is called from the tasks done callbacks, where the
+                # exceptions are only logged, re-raised once the started
+                # synchronizations are done
+                start_errors.append((repo_name, err))
+                return
+            repo_names[task_id] = repo_name
+            waiter.add(task_id).add_done_callback(on_sync_done)
+
+        for _ in range(min(concurrency, len(pending))):
+            if not start_errors:
+                start_sync()
+        try:
+            waiter.wait()
+        except TaskFailedError as err:
+            raise RepositorySyncError(
+                'Failed to synchronize the repository {0}: {1}'.format(
+                    repo_names.get(err.task['id']), err
+                )
+            )
+        except TaskTimeoutError as err:
+            raise RepositorySyncError(str(err))
+        if start_errors:
+            repo_name, err = start_errors[0]
+            raise RepositorySyncError(
+                'Failed to start the synchronization of the repository {0}: {1}'.format(
+                    repo_name, err
+                )
+            ) from err
+        return self._sync_durations
+
     def setup_content_view(self, org_id, lce_id=None):
         # type: (int, int) -> Tuple[Dict, Dict]
         """Setup organization content view by adding all the repositories, publishing and promoting
@@ -944,6 +1090,137 @@ class RepositoryCollection(object):
         self._setup_content_data = setup_content_data
         return setup_content_data
 
+    def get_content_fingerprint(
+        self,
+        upload_manifest=False,
+        download_policy=DOWNLOAD_POLICY_ON_DEMAND,
+        rh_subscriptions=None,
+    ):
+        # type: (bool, str, Optional[List[str]]) -> str
+        """Return the fingerprint of the content setup of the repositories
+        with the supplied options, against the satellite version"""
+        repos_definitions = []
+        for repo in self:
+            definition = dict(repo.data, type=type(repo).__name__, distro=repo.distro)
+            if isinstance(repo, PuppetRepository):
+                definition['modules'] = repo.puppet_modules
+            if isinstance(repo, DockerRepository):
+                definition['upstream-name'] = repo.upstream_name
+            repos_definitions.append(definition)
+        content_definition = dict(
+            repos=repos_definitions,
+            upload_manifest=upload_manifest,
+            download_policy=download_policy,
+            rh_subscriptions=sorted(rh_subscriptions or []),
+            satellite_version=str(get_sat_version()),
+        )
+        return hashlib.sha1(
+            json.dumps(content_definition, sort_keys=True, default=str).encode()
+        ).hexdigest()
+
+    def _content_exists(self, org_id, setup_content_data):
+        # type: (int, Dict[str, Dict]) -> bool
+        """Return whether the organization, content view and activation key of
+        a content setup still exist"""
+        try:
+            Org.info({'id': org_id})
+            ContentView.info({'id': setup_content_data['content_view']['id']})
+            ActivationKey.info(
+                {'id': setup_content_data['activation_key']['id'], 'organization-id': org_id}
+            )
+        except CLIReturnCodeError:
+            return False
+        return True
+
+    def setup_shared_content(
+        self,
+        upload_manifest=False,
+        download_policy=DOWNLOAD_POLICY_ON_DEMAND,
+        rh_subscriptions=None,
+    ):
+        # type: (bool, str, Optional[List[str]]) -> Dict[str, Any]
+        """Setup content view and activation key of all the repositories in a
+        new organization, like :meth:`setup_content`, shared with all the
+        collections of the same content fingerprint.
+
+        The content is set up by the first caller, the next callers, in other
+        modules or xdist workers, get its organization, content view and
+        activation key after checking they still exist. The content is shared
+        through the storage of :mod:`robottelo.decorators.func_shared.shared`,
+        and only when the shared functions are enabled.
+
+        :param upload_manifest: Whether to upload the manifest (The manifest is
+            uploaded only if needed)
+        :param download_policy: The repositories download policy
+        :param rh_subscriptions: The RH subscriptions to be added to activation
+            key
+        """
+        if self._repos_info:
+            raise RepositoryAlreadyCreated('Repositories already created can not setup content')
+        fingerprint = self.get_content_fingerprint(
+            upload_manifest=upload_manifest,
+            download_policy=download_policy,
+            rh_subscriptions=rh_subscriptions,
+        )
+        stale_org_id = None
+        # the organizations of the shared content found removed
+        stale_org_ids = set()
+        while True:
+            shared_content = _setup_shared_content(
+                self,
+                upload_manifest,
+                download_policy,
+                rh_subscriptions,
+                fingerprint=fingerprint,
+                stale_org_id=stale_org_id,
+            )
+            org = shared_content['organization']
+            setup_content_data = shared_content['setup_content_data']
+            if self._content_exists(org['id'], setup_content_data):
+                break
+            if org['id'] in stale_org_ids:
+                raise ReposContentSetupWasNotPerformed(
+                    'The shared content of organization {0} was removed'.format(org['id'])
+                )
+            logger.info(
+                'The shared content of organization {0} was removed, setting it up again'.format(
+                    org['id']
+                )
+            )
+            stale_org_id = org['id']
+            stale_org_ids.add(stale_org_id)
+        # the repositories were created in the collection order
+        for repo, repo_info in zip(self, setup_content_data['repos']):
+            repo._repo_info = repo_info
+        self._repos_info = setup_content_data['repos']
+        self._custom_product_info = setup_content_data['product']
+        self._org = org
+        self._setup_content_data = setup_content_data
+        return setup_content_data
+
+    def get_vm_layer(self, install_katello_agent=True, enable_rh_repos=True):
+        """Return the image layer of the virtual machines registered with the
+        content setup activation key, to create them pre-configured::
+
+            layer = repos_collection.get_vm_layer()
+            vm = VirtualMachine(distro=repos_collection.distro, layer=layer)
+
+        :param bool install_katello_agent: whether to install katello-agent
+        :param bool enable_rh_repos: whether to enable RH repositories
+        :rtype: robottelo.vm_layers.ImageLayer
+        """
+        if not self._setup_content_data:
+            raise ReposContentSetupWasNotPerformed('Repos content setup was not performed')
+        rh_repos_id = []  # type: List[str]
+        if enable_rh_repos:
+            rh_repos_id = [getattr(repo, 'rh_repository_id') for repo in self.rh_repos]
+        return content_host_layer(
+            self.organization['label'],
+            self._setup_content_data['activation_key']['name'],
+            rh_repos_id=rh_repos_id,
+            install_katello_agent=install_katello_agent,
+        )
+
     def setup_virtual_machine(
         self,
         vm,
@@ -1,5 +1,7 @@
 import logging
 import re
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import requests
 from tenacity import retry
@@ -40,6 +42,9 @@ class ReportPortal:
         self.rp_url = settings.report_portal.rp_url
         self.rp_project = settings.report_portal.rp_project
         self.rp_api_key = settings.report_portal.rp_key
+        self.page_size = settings.report_portal.page_size
+        self.max_workers = settings.report_portal.max_workers
+        self._session = None
 
     @property
     def api_url(self):
@@ -55,6 +60,20 @@ class ReportPortal:
         """
         return {'Authorization': f'Bearer {self.rp_api_key}'}
 
+    @property
+    def session(self):
+        """The keep-alive session shared by all Report Portal Requests.
+        :returns: requests session with the API request headers
+        """
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.headers.update(self.headers)
+            self._session.verify = False
+            adapter = requests.adapters.HTTPAdapter(pool_maxsize=self.max_workers)
+            self._session.mount('http://', adapter)
+            self._session.mount('https://', adapter)
+        return self._session
+
     def _format_launches(self, launches):
         """The pretty formatter function that formats launches in a structured way
 
@@ -81,9 +100,7 @@ class ReportPortal:
         :returns dict: The json of all RP launches
         """
         params = {'page.page': 1, 'page.size': 500, 'page.sort': 'start_time'}
-        resp = requests.get(
-            url=f'{self.api_url}/launch', headers=self.headers, params=params, verify=False
-        )
+        resp = self.session.get(url=f'{self.api_url}/launch', params=params)
         resp.raise_for_status()
         return resp.json()
 
@@ -183,22 +200,35 @@ class Launch:
     def _test_params(self, status, defect_type):
         """Customise parameters for Test items API request
 
+        :param str status: The tests status
+        :param defect_type: The tests defect type or a list of defect types
         :returns dict: The parameters dict for API test items request
         """
         params = [
             ('filter.eq.launch', self.info['id']),
             ('page.page', 1),
-            ('page.size', 50),
+            ('page.size', self.report_portal.page_size),
             ('page.sort', 'start_time'),
         ]
         rp_defect_types = ReportPortal.defect_types
         if defect_type:
-            if defect_type in rp_defect_types:
-                params.insert(0, ('filter.eq.issue$issue_type', rp_defect_types[defect_type]))
+            defect_types = [defect_type] if isinstance(defect_type, str) else defect_type
+            for dtype in defect_types:
+                if dtype not in rp_defect_types:
+                    raise ValueError(
+                        f'Invalid value \'{dtype}\' for defect type parameter, '
+                        f'should be one of {[*rp_defect_types.keys()]}'
+                    )
+            if len(defect_types) == 1:
+                params.insert(0, ('filter.eq.issue$issue_type', rp_defect_types[defect_types[0]]))
             else:
-                raise ValueError(
-                    f'Invalid value \'{defect_type}\' for defect type parameter, '
-                    f'should be one of {[*rp_defect_types.keys()]}'
+                # a single query for all the defect types
+                params.insert(
+                    0,
+                    (
+                        'filter.in.issue$issue_type',
+                        ','.join(rp_defect_types[dtype] for dtype in defect_types),
+                    ),
                 )
         rp_statuses = ReportPortal.statuses
         if status:
@@ -222,12 +252,10 @@ class Launch:
         :returns tuple (int, list): Total pages count and the list of tests along with
             each tests properties in a page
         """
-        params['page.page'] = page
-        resp = requests.get(
-            url=f'{self.report_portal.api_url}/item',
-            headers=self.report_portal.headers,
-            params=params,
-            verify=False,
+        # the params are shared by the concurrent page requests, do not update them
+        params = dict(params, **{'page.page': page})
+        resp = self.report_portal.session.get(
+            url=f'{self.report_portal.api_url}/item', params=params
         )
         resp.raise_for_status()
         total_pages = resp.json()['page']['totalPages']
@@ -240,19 +268,25 @@ class Launch:
         This is a main function that will be called to retrieve the tests data
         of a particular test status or/and defect_type
 
+        The first page is fetched to get the total pages count, then the other
+        pages are fetched concurrently.
+
         :param str status: Filter tests of a launch with tests `status`
-        :param str defect_type: Filter tests of a launch with tests `defect_type`
+        :param defect_type: Filter tests of a launch with tests `defect_type`, or
+            with any of a list of defect types
         :returns dict: All filtered tests dict based on params data keyed by test name and test
             properties as value, in format -
             ```{'test_name1':test1_properties_dict, 'test_name2':test2_properties_dict}```
         """
-        page = 1
         params = self._test_params(status, defect_type)
-        total_pages, data = self._test_requester(params=params, page=page)
-        while page < total_pages:
-            page += 1
-            _, pagedata = self._test_requester(params=params, page=page)
-            data.extend(pagedata)
+        total_pages, data = self._test_requester(params, 1)
+        if total_pages > 1:
+            with ThreadPoolExecutor(max_workers=self.report_portal.max_workers) as executor:
+                pages = executor.map(
+                    partial(self._test_requester, params), range(2, total_pages + 1)
+                )
+                for _, pagedata in pages:
+                    data.extend(pagedata)
         # formatting tests data to return tests data keyed by test name
         tests_ = {test['name']: test for test in data}
         return tests_
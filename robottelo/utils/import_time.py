@@ -0,0 +1,95 @@
+"""Import time profiling of the robottelo modules
+
+The modules are imported in a new interpreter with ``python -X importtime``,
+the import time report written on stderr is parsed in :class:`ImportTime`
+entries, one by imported module::
+
+    import time: self [us] | cumulative | imported package
+    import time:       312 |        312 |   _io
+    import time:      1024 |       2048 | robottelo.config
+
+Used by ``make import-time`` and by the import time budget tests.
+"""
+import re
+import subprocess
+import sys
+from collections import namedtuple
+
+# The heavy packages that should only be imported by the tests using them
+HEAVY_MODULES = ('airgun', 'selenium', 'widgetastic', 'wrapanapi', 'azure', 'googleapiclient')
+# The SSH packages, imported with robottelo.ssh by most of the modules, but
+# not by the settings
+SSH_MODULES = ('paramiko', 'cryptography')
+
+IMPORT_TIME_LINE = re.compile(
+    # To match `import time:       312 |        312 |   _io`
+    r'^import time:\s*(?P<self>\d+)\s*\|\s*(?P<cumulative>\d+)\s*\|(?P<indent>\s*)(?P<module>\S+)$'
+)
+
+ImportTime = namedtuple('ImportTime', ['module', 'self_us', 'cumulative_us', 'level'])
+
+
+def parse_importtime(output):
+    """Return the :class:`ImportTime` entries of a ``-X importtime`` report,
+    in import completion order"""
+    entries = []
+    for line in output.splitlines():
+        match = IMPORT_TIME_LINE.match(line.rstrip())
+        if match is None:
+            continue
+        entries.append(
+            ImportTime(
+                module=match.group('module'),
+                self_us=int(match.group('self')),
+                cumulative_us=int(match.group('cumulative')),
+                # the top level imports are indented by one space, then by
+                # two more spaces by nesting level
+                level=(len(match.group('indent')) - 1) // 2,
+            )
+        )
+    return entries
+
+
+def profile_imports(module, python=None):
+    """Import module in a new interpreter and return its import time entries
+
+    :param str module: the dotted name of the module to import
+    :param str python: the python interpreter, the current one by default
+    :raises ImportError: if the module import failed
+    """
+    if python is None:
+        python = sys.executable
+    process = subprocess.run(
+        [python, '-X', 'importtime', '-c', f'import {module}'],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+    if process.returncode != 0:
+        raise ImportError(f'Failed to import {module}:\n{process.stderr}')
+    return parse_importtime(process.stderr)
+
+
+def module_import_time(entries, module):
+    """Return the cumulative import time in seconds of module"""
+    for entry in entries:
+        if entry.module == module:
+            return entry.cumulative_us / 1e6
+    raise KeyError(module)
+
+
+def heavy_imports(entries, heavy_modules=HEAVY_MODULES):
+    """Return the names of the imported heavy_modules packages"""
+    return sorted({entry.module for entry in entries if entry.module in heavy_modules})
+
+
+def import_time_report(entries, top=20):
+    """Return the lines of the report of the top modules by self import time"""
+    lines = ['{0:>10} {1:>12}  {2}'.format('self(ms)', 'cumul.(ms)', 'module')]
+    for entry in sorted(entries, key=lambda entry: entry.self_us, reverse=True)[:top]:
+        lines.append(
+            '{0:>10.1f} {1:>12.1f}  {2}'.format(
+                entry.self_us / 1e3, entry.cumulative_us / 1e3, entry.module
+            )
+        )
+    return lines
@@ -1,13 +1,16 @@
 import logging
 import re
+import time
 from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 
 import pytest
 import requests
 from packaging.version import Version
 from tenacity import retry
 from tenacity import stop_after_attempt
-from tenacity import wait_fixed
+from tenacity import wait_exponential
 
 from robottelo.config import settings
 from robottelo.constants import CLOSED_STATUSES
@@ -124,59 +127,103 @@ def collect_data_bz(collected_data, cached_data):  # pragma: no cover
 
     Arguments:
         collected_data {dict} -- dict with BZs collected by pytest
-        cached_data {dict} -- Cached data previous loaded from API
+        cached_data {BugzillaCache} -- The persistent BZ cache or None
     """
-    bz_data = get_data_bz(
-        [item.partition(':')[-1] for item in collected_data if item.startswith('BZ:')],
-        cached_data=cached_data,
-    )
-    for data in bz_data:
+    bz_numbers = [item.partition(':')[-1] for item in collected_data if item.startswith('BZ:')]
+    bugs = crawl_bz(bz_numbers, cached_data=cached_data)
+    for number in bz_numbers:
+        data = bugs.get(number)
+        if data is None:
+            continue
         # If BZ is CLOSED/DUPLICATE collect the duplicate
-        collect_dupes(data, collected_data, cached_data=cached_data)
+        collect_dupes(data, collected_data, bugs)
 
         # Collect clones to feed the nagger script for notifications
-        collect_clones(data, collected_data, cached_data=cached_data)
+        collect_clones(data, collected_data, bugs)
 
         bz_key = f"BZ:{data['id']}"
         data["is_open"] = is_open_bz(bz_key, data)
         collected_data[bz_key]['data'] = data
 
 
-def collect_dupes(bz, collected_data, cached_data=None):  # pragma: no cover
-    """Recursivelly find for duplicates"""
-    cached_data = cached_data or {}
-    if bz["resolution"] == "DUPLICATE":
+def get_clone_numbers(bz):
+    """Return the numbers of the bz clones and of the bz it is cloned of"""
+    clones = list(bz.get('clone_ids') or [])
+    if bz.get('cf_clone_of'):
+        clones.append(bz['cf_clone_of'])
+    return [str(clone_num) for clone_num in clones]
+
+
+def crawl_bz(bz_numbers, cached_data=None):  # pragma: no cover
+    """Breadth first load of the BZs data, with their duplicates and clones.
+
+    The duplicates and clones found at each level are loaded in a single
+    bulk call, the duplicates are followed from the marked BZs and their
+    duplicates, the clones from the marked BZs and their clones.
+
+    Arguments:
+        bz_numbers {list of str} -- ['123456', ...]
+        cached_data {BugzillaCache} -- The persistent BZ cache or None
+
+    Returns:
+        [dict] -- {'123456': {'id':..., 'status':..., 'resolution': ...}}
+    """
+    bugs = {}
+    # the numbers to load at this level with the links to follow from them
+    level = {str(number): {'dupe', 'clone'} for number in bz_numbers}
+    while level:
+        for data in get_data_bz(list(level), cached_data=cached_data):
+            bugs[str(data['id'])] = data
+        next_level = defaultdict(set)
+        for number, links in level.items():
+            bz = bugs.get(number)
+            if bz is None:
+                continue
+            if 'dupe' in links and bz['resolution'] == 'DUPLICATE' and bz.get('dupe_of'):
+                next_level[str(bz['dupe_of'])].add('dupe')
+            if 'clone' in links:
+                for clone_num in get_clone_numbers(bz):
+                    next_level[clone_num].add('clone')
+        level = {number: links for number, links in next_level.items() if number not in bugs}
+    return bugs
+
+
+def copy_bz(bz):
+    """Return a copy of the bz data without its dupe and clone links, the
+    loaded bugs link each other both ways"""
+    return {key: value for key, value in bz.items() if key not in ('dupe_data', 'clones')}
+
+
+def collect_dupes(bz, collected_data, bugs, seen=None):  # pragma: no cover
+    """Recursivelly find for duplicates in the loaded bugs"""
+    seen = {str(bz['id'])} if seen is None else seen
+    if bz["resolution"] == "DUPLICATE" and str(bz["dupe_of"]) not in seen:
+        seen.add(str(bz["dupe_of"]))
         # Collect duplicates
-        bz["dupe_data"] = get_single_bz(bz["dupe_of"], cached_data=cached_data)
+        bz["dupe_data"] = copy_bz(bugs.get(str(bz["dupe_of"])) or get_default_bz(bz["dupe_of"]))
         dupe_key = f"BZ:{bz['dupe_of']}"
         # Store Duplicate also in the main collection for caching
         if dupe_key not in collected_data:
             collected_data[dupe_key]['data'] = bz["dupe_data"]
             collected_data[dupe_key]['is_dupe'] = True
-            collect_dupes(bz["dupe_data"], collected_data, cached_data)
+        collect_dupes(bz["dupe_data"], collected_data, bugs, seen)
 
 
-def collect_clones(bz, collected_data, cached_data=None):  # pragma: no cover
-    """Recursivelly find for clones.
+def collect_clones(bz, collected_data, bugs):  # pragma: no cover
+    """Recursivelly find for clones in the loaded bugs.
     This handler does not process clones as part of skipping logic.
     but the data is fetched here to feed nagger script later.
     """
-    cached_data = cached_data or {}
-    clones = bz['clone_ids']
-    if bz['cf_clone_of']:
-        clones.append(bz['cf_clone_of'])
-
+    clones = get_clone_numbers(bz)
     if clones:
-        bz["clones"] = get_data_bz(
-            [str(clone_num) for clone_num in clones], cached_data=cached_data
-        )
+        bz["clones"] = [copy_bz(bugs[clone_num]) for clone_num in clones if clone_num in bugs]
         for clone_data in bz["clones"]:
             # Store Clones also in the main collection for caching
             clone_key = f"BZ:{clone_data['id']}"
             if clone_key not in collected_data:
                 collected_data[clone_key]['data'] = clone_data
                 collected_data[clone_key]['is_clone'] = True
-                collect_clones(clone_data, collected_data, cached_data)
+                collect_clones(clone_data, collected_data, bugs)
 
 
 # --- API Calls ---
@@ -184,17 +231,83 @@ def collect_clones(bz, collected_data, cached_data=None):  # pragma: no cover
 # cannot use lru_cache in functions that has unhashable args
 CACHED_RESPONSES = defaultdict(dict)
 
+# the max number of BZ ids requested in a single API call
+BZ_CHUNK_SIZE = 100
+# the max number of concurrent API calls
+BZ_MAX_WORKERS = 4
+
+BZ_FIELDS = [
+    "id",
+    "summary",
+    "status",
+    "resolution",
+    "cf_last_closed",
+    "last_change_time",
+    "creation_time",
+    "flags",
+    "keywords",
+    "dupe_of",
+    "target_milestone",
+    "cf_clone_of",
+    "clone_ids",
+    "depends_on",
+]
+
+_session = None
+
+
+def get_session():
+    """Return the requests session, its connections are reused by the API calls"""
+    global _session
+    if _session is None:
+        _session = requests.Session()
+        adapter = requests.adapters.HTTPAdapter(pool_maxsize=BZ_MAX_WORKERS)
+        _session.mount('http://', adapter)
+        _session.mount('https://', adapter)
+    return _session
+
 
 @retry(
     stop=stop_after_attempt(4),  # Retry 3 times before raising
-    wait=wait_fixed(20),  # Wait seconds between retries
+    wait=wait_exponential(multiplier=1, max=20),  # Wait 1, 2, 4 seconds between retries
 )
+def get_chunk_data_bz(bz_numbers, fields=None):  # pragma: no cover
+    """Call Bugzilla REST API for a chunk of BZ numbers"""
+    response = get_session().get(
+        f"{settings.bugzilla.url}/rest/bug",
+        params={
+            "id": ",".join(bz_numbers),
+            "api_key": settings.bugzilla.api_key,
+            "include_fields": ",".join(fields or BZ_FIELDS),
+        },
+    )
+    response.raise_for_status()
+    return response.json().get('bugs') or []
+
+
+def fetch_data_bz(bz_numbers, fields=None):  # pragma: no cover
+    """Call Bugzilla REST API for the BZ numbers, in chunks of BZ_CHUNK_SIZE
+    requested concurrently"""
+    LOGGER.debug(f"Calling Bugzilla API for {set(bz_numbers)}")
+    numbers = sorted(set(str(number) for number in bz_numbers))
+    chunks = []
+    for start in range(0, len(numbers), BZ_CHUNK_SIZE):
+        end = start + BZ_CHUNK_SIZE
+        chunks.append(numbers[start:end])
+    with ThreadPoolExecutor(max_workers=BZ_MAX_WORKERS) as executor:
+        chunks_data = executor.map(partial(get_chunk_data_bz, fields=fields), chunks)
+        return [bz for chunk_data in chunks_data for bz in chunk_data]
+
+
 def get_data_bz(bz_numbers, cached_data=None):  # pragma: no cover
     """Get a list of marked BZ data and query Bugzilla REST API.
 
+    When a BZ cache is passed, the fresh cached BZs are taken from the cache,
+    the stale cached BZs are fetched only if changed since cached.
+
     Arguments:
         bz_numbers {list of str} -- ['123456', ...]
-        cached_data
+        cached_data {BugzillaCache} -- The persistent BZ cache or None
 
     Returns:
         [list of dicts] -- [{'id':..., 'status':..., 'resolution': ...}]
@@ -206,68 +319,66 @@ def get_data_bz(bz_numbers, cached_data=None):  # pragma: no cover
     if cached_by_call:
         return cached_by_call
 
-    if cached_data:
-        LOGGER.debug(f"Using cached data for {set(bz_numbers)}")
-        if not all([f'BZ:{number}' in cached_data for number in bz_numbers]):
+    numbers = sorted(set(str(number) for number in bz_numbers))
+    cached = {}
+    if cached_data is not None:
+        cached = cached_data.get(numbers)
+        LOGGER.debug(f"Using cached data for {set(cached)}")
+        if len(cached) < len(numbers):
             LOGGER.debug("There are BZs out of cache.")
-        return [item['data'] for _, item in cached_data.items() if 'data' in item]
 
     # Ensure API key is set
     if not settings.bugzilla.api_key:
         LOGGER.warning(
             "Config file is missing bugzilla api_key "
             "so all tests with skip_if_open mark is skipped. "
-            "Provide api_key or a bz_cache.json."
+            "Provide api_key or a bz_cache.sqlite."
         )
-        # Provide default data for collected BZs
-        return [get_default_bz(number) for number in bz_numbers]
+        # Provide cached or default data for collected BZs
+        return [
+            cached[number]['data'] if number in cached else get_default_bz(number)
+            for number in numbers
+        ]
 
-    # No cached data so Call Bugzilla API
-    LOGGER.debug(f"Calling Bugzilla API for {set(bz_numbers)}")
-    bz_fields = [
-        "id",
-        "summary",
-        "status",
-        "resolution",
-        "cf_last_closed",
-        "last_change_time",
-        "creation_time",
-        "flags",
-        "keywords",
-        "dupe_of",
-        "target_milestone",
-        "cf_clone_of",
-        "clone_ids",
-        "depends_on",
-    ]
     # Following fields are dynamically calculated/loaded
     for field in ('is_open', 'clones', 'version'):
-        assert field not in bz_fields
+        assert field not in BZ_FIELDS
 
-    response = requests.get(
-        f"{settings.bugzilla.url}/rest/bug",
-        params={
-            "id": ",".join(set(bz_numbers)),
-            "api_key": settings.bugzilla.api_key,
-            "include_fields": ",".join(bz_fields),
-        },
-    )
-    response.raise_for_status()
-    data = response.json().get('bugs')
+    now = time.time()
+    fresh = [
+        number
+        for number in numbers
+        if number in cached and cached_data.is_fresh(cached[number], now)
+    ]
+    stale = [number for number in numbers if number in cached and number not in fresh]
+    missing = [number for number in numbers if number not in cached]
+    if stale:
+        # Revalidate the stale BZs, only the changed BZs are fetched again
+        unchanged = [
+            str(bz['id'])
+            for bz in fetch_data_bz(stale, fields=['id', 'last_change_time'])
+            if bz.get('last_change_time') == cached[str(bz['id'])]['data'].get('last_change_time')
+        ]
+        cached_data.touch(unchanged)
+        fresh.extend(unchanged)
+        missing.extend(number for number in stale if number not in unchanged)
+
+    data = [cached[number]['data'] for number in fresh]
+    if missing:
+        fetched = fetch_data_bz(missing)
+        if cached_data is not None:
+            cached_data.update(fetched)
+        data.extend(fetched)
     CACHED_RESPONSES['get_data'][str(sorted(bz_numbers))] = data
     return data
 
 
 def get_single_bz(number, cached_data=None):  # pragma: no cover
     """Call BZ API to get a single BZ data and cache it"""
-    cached_data = cached_data or {}
     bz_data = CACHED_RESPONSES['get_single'].get(number)
     if not bz_data:
-        try:
-            bz_data = cached_data[f"BZ:{number}"]['data']
-        except (KeyError, TypeError):
-            bz_data = get_data_bz([str(number)], cached_data)
-            bz_data = bz_data and bz_data[0]
+        bz_data = get_data_bz([str(number)], cached_data)
+        bz_data = bz_data and bz_data[0]
         CACHED_RESPONSES['get_single'][number] = bz_data
     return bz_data or get_default_bz(number)
 
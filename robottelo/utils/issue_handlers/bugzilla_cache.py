@@ -0,0 +1,121 @@
+"""Persistent Bugzilla cache, one row per BZ with the time it was fetched
+
+Only the requested BZs are loaded from the cache file, using the primary key
+index, so the cache load cost does not depend on the cache size.
+"""
+import json
+import logging
+import sqlite3
+import time
+from contextlib import contextmanager
+
+LOGGER = logging.getLogger(__name__)
+
+# the time in seconds after which a cached BZ is revalidated
+BZ_CACHE_TTL = 86400
+# the max number of BZ ids by query, SQLite limit the query variables number
+QUERY_CHUNK_SIZE = 500
+
+_SCHEMA = (
+    'CREATE TABLE IF NOT EXISTS bugs ('
+    ' id TEXT PRIMARY KEY,'
+    ' data TEXT NOT NULL,'
+    ' last_change_time TEXT,'
+    ' fetched_at REAL NOT NULL'
+    ')'
+)
+
+
+class BugzillaCache:
+    """Bugzilla cache of the BZs data fetched from the REST API
+
+    Arguments:
+        db_path {str} -- The cache file path
+        ttl {int} -- The time in seconds a cached BZ is considered fresh
+    """
+
+    def __init__(self, db_path, ttl=None):
+        if ttl is None:
+            ttl = BZ_CACHE_TTL
+        self.db_path = db_path
+        self.ttl = ttl
+        self._connection = None
+
+    @property
+    def connection(self):
+        if self._connection is None:
+            # the xdist workers may write the cache at the same time
+            self._connection = sqlite3.connect(self.db_path, timeout=60, isolation_level=None)
+            self._connection.execute('PRAGMA journal_mode=WAL')
+            self._connection.execute(_SCHEMA)
+        return self._connection
+
+    def close(self):
+        if self._connection is not None:
+            self._connection.close()
+            self._connection = None
+
+    @contextmanager
+    def _transaction(self):
+        """Write transaction context manager"""
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.connection
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+        else:
+            self.connection.execute('COMMIT')
+
+    def get(self, bz_numbers):
+        """Return the cached entries of bz_numbers
+
+        Returns:
+            [dict] -- {'123456': {'data': {...}, 'fetched_at': 1580000000.0}}
+        """
+        bz_numbers = [str(number) for number in bz_numbers]
+        entries = {}
+        for start in range(0, len(bz_numbers), QUERY_CHUNK_SIZE):
+            end = start + QUERY_CHUNK_SIZE
+            chunk = bz_numbers[start:end]
+            rows = self.connection.execute(
+                'SELECT id, data, fetched_at FROM bugs WHERE id IN ({})'.format(
+                    ','.join('?' * len(chunk))
+                ),
+                chunk,
+            )
+            for number, data, fetched_at in rows:
+                entries[number] = {'data': json.loads(data), 'fetched_at': fetched_at}
+        return entries
+
+    def is_fresh(self, entry, now=None):
+        """Return whether the cached entry was fetched since less than ttl"""
+        if now is None:
+            now = time.time()
+        return now - entry['fetched_at'] < self.ttl
+
+    def update(self, bzs_data):
+        """Store the BZs data fetched from the REST API"""
+        now = time.time()
+        rows = [
+            (str(data['id']), json.dumps(data), data.get('last_change_time'), now)
+            for data in bzs_data
+        ]
+        if rows:
+            with self._transaction() as connection:
+                connection.executemany(
+                    'INSERT OR REPLACE INTO bugs (id, data, last_change_time, fetched_at)'
+                    ' VALUES (?, ?, ?, ?)',
+                    rows,
+                )
+            LOGGER.debug(f"Updated {len(rows)} BZs in cache {self.db_path}")
+
+    def touch(self, bz_numbers):
+        """Mark the cached BZs, that did not change since cached, as fresh"""
+        now = time.time()
+        if bz_numbers:
+            with self._transaction() as connection:
+                connection.executemany(
+                    'UPDATE bugs SET fetched_at = ? WHERE id = ?',
+                    [(now, str(number)) for number in bz_numbers],
+                )
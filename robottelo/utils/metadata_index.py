@@ -0,0 +1,186 @@
+"""Index of the test modules metadata
+
+The docstring tokens of the module, classes and functions (``:CaseComponent:``,
+``:BZ:``, ``:CaseImportance:``) and the ``is_open`` usages are extracted once
+per test module by parsing its source. When a cache directory is given, the
+index of each module is stored there in one file by module path, with the
+module content hash, so it is reused by the next runs and by the other xdist
+workers until the module changes, and then replaced.
+"""
+import ast
+import hashlib
+import json
+import logging
+import os
+import re
+import tempfile
+
+LOGGER = logging.getLogger(__name__)
+
+# change it when the index format changes, to not load stale cached indexes
+INDEX_VERSION = 1
+
+IS_OPEN = re.compile(
+    # To match `if is_open('BZ:123456'):`
+    r"\s*if\sis_open\(\S(?P<src>\D{2})\s*:\s*(?P<num>\d*)\S\)\d*"
+)
+
+NOT_IS_OPEN = re.compile(
+    # To match `if not is_open('BZ:123456'):`
+    r"\s*if\snot\sis_open\(\S(?P<src>\D{2})\s*:\s*(?P<num>\d*)\S\)\d*"
+)
+
+COMPONENT = re.compile(
+    # To match :CaseComponent: FooBar
+    r"\s*:CaseComponent:\s*(?P<component>\S*)",
+    re.IGNORECASE,
+)
+
+IMPORTANCE = re.compile(
+    # To match :CaseImportance: Critical
+    r"\s*:CaseImportance:\s*(?P<importance>\S*)",
+    re.IGNORECASE,
+)
+
+BZ = re.compile(
+    # To match :BZ: 123456, 456789
+    r"\s*:BZ:\s*(?P<bz>.*\S*)",
+    re.IGNORECASE,
+)
+
+
+def docstring_metadata(docstring):
+    """Return the last component, bz and importance tokens of docstring"""
+    metadata = {'docstring': docstring is not None}
+    for name, regex in (('component', COMPONENT), ('bz', BZ), ('importance', IMPORTANCE)):
+        matches = regex.findall(docstring) if docstring else []
+        metadata[name] = matches[-1] if matches else None
+    return metadata
+
+
+def is_open_usages(source):
+    """Return the issues of the `is_open` and `not is_open` usages of source"""
+    if 'is_open(' not in source:
+        return {'is_open': [], 'not_is_open': []}
+    return {'is_open': IS_OPEN.findall(source), 'not_is_open': NOT_IS_OPEN.findall(source)}
+
+
+def _first_lineno(node):
+    """Return the first line of node, including its decorators"""
+    return min([node.lineno] + [decorator.lineno for decorator in node.decorator_list])
+
+
+def _index_body(body, end_lineno, lines, prefix, index):
+    """Index the classes and functions defined in body, the last node of body
+    ending at end_lineno"""
+    for position, node in enumerate(body):
+        if not isinstance(node, (ast.ClassDef, ast.FunctionDef, ast.AsyncFunctionDef)):
+            continue
+        if position + 1 < len(body):
+            next_node = body[position + 1]
+            node_end_lineno = next_node.lineno - 1
+            if hasattr(next_node, 'decorator_list'):
+                node_end_lineno = _first_lineno(next_node) - 1
+        else:
+            node_end_lineno = end_lineno
+        qualname = prefix + node.name
+        metadata = docstring_metadata(ast.get_docstring(node))
+        if isinstance(node, ast.ClassDef):
+            index['classes'][qualname] = metadata
+            _index_body(node.body, node_end_lineno, lines, qualname + '.', index)
+        else:
+            start = _first_lineno(node) - 1
+            source = ''.join(lines[start:node_end_lineno])
+            metadata.update(is_open_usages(source))
+            index['functions'][qualname] = metadata
+
+
+def index_source(source):
+    """Return the metadata index of a test module source
+
+    Example of index::
+
+        {
+            "module": {"docstring": true, "component": "Repositories", "bz": null,
+                       "importance": "High", "source_component": "Repositories",
+                       "is_open": [["BZ", "123456"]], "not_is_open": []},
+            "classes": {"TestRepository": {...}},
+            "functions": {"TestRepository.test_positive_create": {
+                "docstring": true, "component": null, "bz": "123456, 456789",
+                "importance": null, "is_open": [], "not_is_open": []}}
+        }
+    """
+    tree = ast.parse(source)
+    lines = source.splitlines(True)
+    module = docstring_metadata(ast.get_docstring(tree))
+    component_matches = COMPONENT.findall(source)
+    module['source_component'] = component_matches[0] if component_matches else None
+    module.update(is_open_usages(source))
+    index = {'module': module, 'classes': {}, 'functions': {}}
+    _index_body(tree.body, len(lines), lines, '', index)
+    return index
+
+
+class MetadataIndex:
+    """The metadata indexes of the test modules, by module file path
+
+    Arguments:
+        cache_dir {str} -- The directory of the cached indexes or None to not
+            cache the indexes on disk
+    """
+
+    def __init__(self, cache_dir=None):
+        self.cache_dir = cache_dir
+        self._indexes = {}
+
+    def _get_cache_path(self, file_path):
+        digest = hashlib.sha1(os.path.abspath(file_path).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f'{digest}.json')
+
+    def _load(self, cache_path):
+        try:
+            with open(cache_path) as cache_file:
+                return json.load(cache_file)
+        except (OSError, ValueError):
+            return None
+
+    def _store(self, cache_path, index):
+        # write to a temporary file then rename it, as an other worker may
+        # read or write the same file at the same time
+        handle, tmp_path = tempfile.mkstemp(dir=self.cache_dir, suffix='.tmp')
+        try:
+            with os.fdopen(handle, 'w') as tmp_file:
+                json.dump(index, tmp_file)
+            os.rename(tmp_path, cache_path)
+        except OSError as err:
+            LOGGER.warning(f'Unable to cache the metadata index {cache_path}: {err}')
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+
+    def get(self, file_path):
+        """Return the metadata index of the test module file_path"""
+        index = self._indexes.get(file_path)
+        if index is not None:
+            return index
+        with open(file_path, 'rb') as module_file:
+            content = module_file.read()
+        content_digest = hashlib.sha1(content).hexdigest()
+        cache_path = None
+        if self.cache_dir:
+            cache_path = self._get_cache_path(file_path)
+            cached = self._load(cache_path)
+            if (
+                isinstance(cached, dict)
+                and cached.get('digest') == content_digest
+                and cached.get('version') == INDEX_VERSION
+            ):
+                index = cached.get('index')
+        if index is None:
+            index = index_source(content.decode('utf-8'))
+            if cache_path:
+                # replace the cached index of the previous module content
+                self._store(
+                    cache_path, dict(digest=content_digest, version=INDEX_VERSION, index=index)
+                )
+        self._indexes[file_path] = index
+        return index
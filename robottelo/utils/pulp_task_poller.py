@@ -0,0 +1,172 @@
+"""Wait for the Pulp tasks of many repositories at once
+
+A :class:`PulpTaskPoller` searches the Pulp sync tasks of all the waited
+repositories with one ``$in`` query by tick, through a keep-alive session::
+
+    poller = get_pulp_task_poller()
+    poller.wait([repo_backend_id, other_repo_backend_id])
+
+The Pulp credentials are fetched once by server, and the poll interval grows
+while no repository sync task finishes.
+"""
+import logging
+import time
+
+import requests
+from nailgun import entities
+
+from robottelo import ssh
+from robottelo.config import settings
+
+logger = logging.getLogger(__name__)
+
+# the poll interval bounds in seconds, and its growth factor while no task
+# finishes
+PULP_POLL_MIN_INTERVAL = 1
+PULP_POLL_MAX_INTERVAL = 15
+PULP_POLL_BACKOFF = 2
+PULP_SYNC_TASK_TYPE = 'pulp.server.managers.repo.sync.sync'
+PULP_REPO_TAG = 'pulp:repository:{0}'
+# the Pulp task states of a failed task
+PULP_FAILED_STATES = ('error', 'canceled')
+
+# the Pulp admin password by server hostname
+_pulp_passwords = {}
+# the pollers by server hostname
+_pulp_task_pollers = {}
+
+
+class PulpTaskError(entities.APIResponseError):
+    """Raised when the Pulp tasks of a repository can not be waited for"""
+
+
+def get_pulp_password(hostname=None):
+    """Return the Pulp admin password of the server, fetched once by server
+
+    :param str hostname: the server hostname, the configured server by default
+    """
+    hostname = hostname or settings.server.hostname
+    if hostname not in _pulp_passwords:
+        _pulp_passwords[hostname] = ssh.command(
+            'grep "^default_password" /etc/pulp/server.conf | awk \'{print $2}\'',
+            hostname=hostname,
+        ).stdout[0]
+    return _pulp_passwords[hostname]
+
+
+def get_pulp_task_poller(hostname=None):
+    """Return the Pulp task poller of the server, created once by server
+
+    :param str hostname: the server hostname, the configured server by default
+    """
+    hostname = hostname or settings.server.hostname
+    if hostname not in _pulp_task_pollers:
+        _pulp_task_pollers[hostname] = PulpTaskPoller(hostname)
+    return _pulp_task_pollers[hostname]
+
+
+class PulpTaskPoller(object):
+    """Polls the Pulp sync tasks of repositories, through one keep-alive
+    session
+
+    :param str hostname: the server hostname, the configured server by default
+    :param float max_interval: the max time in seconds between two polls
+    """
+
+    def __init__(self, hostname=None, max_interval=None):
+        self.hostname = hostname or settings.server.hostname
+        self.max_interval = max_interval or PULP_POLL_MAX_INTERVAL
+        if self.hostname == settings.server.hostname:
+            self.url = '{0}/pulp/api/v2/tasks/search/'.format(settings.server.get_url())
+        else:
+            self.url = 'https://{0}/pulp/api/v2/tasks/search/'.format(self.hostname)
+        self._session = None
+
+    @property
+    def session(self):
+        """The keep-alive session authenticated to the Pulp API"""
+        if self._session is None:
+            self._session = requests.Session()
+            self._session.verify = False
+            self._session.auth = ('admin', get_pulp_password(self.hostname))
+            self._session.headers['content-type'] = 'application/json'
+        return self._session
+
+    def search(self, repo_backend_ids):
+        """Search the Pulp sync tasks of the repositories with one query
+
+        :param list repo_backend_ids: the backend ids of the repositories
+        :return: the found tasks by repository backend id
+        :raises PulpTaskError: if the Pulp API request fails
+        """
+        tags = {PULP_REPO_TAG.format(backend_id): backend_id for backend_id in repo_backend_ids}
+        response = self.session.post(
+            self.url,
+            json={
+                'criteria': {
+                    'filters': {
+                        'tags': {'$in': list(tags)},
+                        'task_type': {'$in': [PULP_SYNC_TASK_TYPE]},
+                    }
+                }
+            },
+        )
+        if response.status_code != 200:
+            raise PulpTaskError(
+                'Pulp tasks search of repo_ids {0} failed with status {1}'.format(
+                    repo_backend_ids, response.status_code
+                )
+            )
+        tasks = {backend_id: [] for backend_id in repo_backend_ids}
+        for task in response.json():
+            for tag in task.get('tags', []):
+                if tag in tags:
+                    tasks[tags[tag]].append(task)
+        return tasks
+
+    @staticmethod
+    def _newest_task(tasks):
+        """Return the most recently started task of tasks, the not started
+        tasks being the most recent"""
+        return max(
+            tasks, key=lambda task: (task.get('start_time') is None, task.get('start_time') or '')
+        )
+
+    def wait(self, repo_backend_ids, timeout=600):
+        """Poll the Pulp sync tasks until the newest task of each repository
+        finished
+
+        :param list repo_backend_ids: the backend ids of the repositories
+        :param int timeout: the time in seconds to wait for the tasks
+        :raises PulpTaskError: if the tasks are not finished before the timeout
+        :raises AssertionError: if the newest task of a repository failed
+        """
+        pending = list(repo_backend_ids)
+        deadline = time.time() + timeout
+        interval = PULP_POLL_MIN_INTERVAL
+        while True:
+            finished = []
+            for backend_id, tasks in self.search(pending).items():
+                if not tasks:
+                    continue
+                # an older sync task does not tell the state of the last sync
+                task = self._newest_task(tasks)
+                if task.get('error') or task.get('state') in PULP_FAILED_STATES:
+                    raise AssertionError(
+                        "Pulp task with repo_id {0} errored or not found: '{1}'".format(
+                            backend_id, task.get('error') or task.get('state')
+                        )
+                    )
+                if task.get('state') == 'finished':
+                    finished.append(backend_id)
+            pending = [backend_id for backend_id in pending if backend_id not in finished]
+            if not pending:
+                return
+            logger.debug('Waiting for the Pulp sync tasks of repo_ids {0}'.format(pending))
+            if time.time() > deadline:
+                raise PulpTaskError('Pulp task with repo_id {0} not found'.format(pending))
+            if finished:
+                interval = PULP_POLL_MIN_INTERVAL
+            else:
+                interval = min(interval * PULP_POLL_BACKOFF, self.max_interval)
+            time.sleep(interval)
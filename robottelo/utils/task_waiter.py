@@ -0,0 +1,269 @@
+"""Wait for many foreman tasks at once
+
+A :class:`TaskWaiter` tracks task ids and task search queries, and polls all
+the tracked tasks with one task search by tick, through nailgun or hammer::
+
+    waiter = TaskWaiter(api_search_tasks)
+    sync_future = waiter.add(sync_task_id)
+    upload_future = waiter.add_search('label = Actions::Katello::Host::UploadPackageProfile')
+    waiter.wait()
+    sync_task = sync_future.result()
+
+Each task future completes as soon as its task is stopped, and the poll
+interval grows while no task finishes.
+"""
+import logging
+import time
+from concurrent.futures import Future
+
+from nailgun import entities
+from nailgun import entity_mixins
+
+from robottelo.cli.task import Task
+
+logger = logging.getLogger(__name__)
+
+# the time in seconds to wait for the tasks
+TASK_WAIT_TIMEOUT = 300
+# the poll interval bounds in seconds, and its growth factor while no task
+# finishes
+TASK_POLL_MIN_INTERVAL = 0.5
+TASK_POLL_MAX_INTERVAL = 10
+TASK_POLL_BACKOFF = 1.5
+# the states of the finished tasks
+TASK_DONE_STATES = ('stopped', 'paused')
+
+
+class TaskFailedError(entity_mixins.TaskFailedError):
+    """Raised when a task finished without a successful result, caught as the
+    nailgun ``TaskFailedError``"""
+
+    def __init__(self, message, task=None):
+        # the nailgun exception signature depends on its version
+        Exception.__init__(self, message)
+        self.task = task
+        self.task_id = None if task is None else _get_field(task, 'id')
+
+
+class TaskTimeoutError(entity_mixins.TaskTimedOutError):
+    """Raised when the tasks did not finish before the timeout, caught as the
+    nailgun ``TaskTimedOutError``"""
+
+    def __init__(self, message, task_ids=()):
+        Exception.__init__(self, message)
+        self.task_ids = list(task_ids)
+        self.task_id = self.task_ids[0] if self.task_ids else None
+
+
+def api_search_tasks(query):
+    """Search the foreman tasks with nailgun
+
+    :return: the ``nailgun.entities.ForemanTask`` entities found by id
+    """
+    return {
+        task.id: task
+        for task in entities.ForemanTask().search(query={'search': query, 'per_page': 1000})
+    }
+
+
+def cli_search_tasks(query):
+    """Search the foreman tasks with hammer
+
+    :return: the ``hammer task list`` tasks found by id
+    """
+    return {task['id']: task for task in Task.list_tasks({'search': query})}
+
+
+def _get_field(task, name):
+    """Return the field of a nailgun or a hammer task"""
+    if isinstance(task, dict):
+        return task.get(name)
+    return getattr(task, name, None)
+
+
+class _TaskSearch(object):
+    """A tracked task search query, searched until tasks are found"""
+
+    def __init__(self, query, match, max_tries, search_rate):
+        self.query = query
+        self.match = match
+        self.max_tries = max_tries
+        self.search_rate = search_rate
+        self.tries = 0
+        self.next_search = 0
+        self.future = Future()
+
+    def get_query(self):
+        return self.query() if callable(self.query) else self.query
+
+
+class TaskWaiter(object):
+    """Tracks foreman tasks and waits for them, polling all of them at once
+
+    :param search_tasks: the function searching the tasks by query, and
+        returning them by id, :func:`api_search_tasks` or
+        :func:`cli_search_tasks`
+    :param int timeout: the time in seconds to wait for the tasks
+    :param float max_interval: the max time in seconds between two polls
+    :param tuple ok_results: the results of the successful tasks
+    """
+
+    def __init__(
+        self, search_tasks=None, timeout=None, max_interval=None, ok_results=('success',)
+    ):
+        self.search_tasks = search_tasks or api_search_tasks
+        self.timeout = timeout or TASK_WAIT_TIMEOUT
+        self.max_interval = max_interval or TASK_POLL_MAX_INTERVAL
+        self.ok_results = ok_results
+        # the futures of the tracked task ids, {task id: future}
+        self._tasks = {}
+        # the searches until tasks are found, and the futures of all searches
+        self._searches = []
+        self._search_futures = []
+
+    def add(self, task_id):
+        """Track the task of task_id
+
+        :return: the future of the finished task
+        """
+        future = self._tasks.get(task_id)
+        if future is None:
+            future = self._tasks[task_id] = Future()
+        return future
+
+    def add_search(self, query, match=None, max_tries=10, search_rate=1):
+        """Track the tasks found by query
+
+        :param query: the task search query, or a callable returning it
+        :param match: a callable filtering the found tasks
+        :param int max_tries: the max number of searches until tasks are found
+        :param float search_rate: the time in seconds between two searches
+        :return: the future of the list of the finished tasks found
+        """
+        search = _TaskSearch(query, match, max_tries, search_rate)
+        self._searches.append(search)
+        self._search_futures.append(search.future)
+        return search.future
+
+    def _search(self, now):
+        """Run the due searches, and track the found tasks"""
+        for search in list(self._searches):
+            if search.next_search > now:
+                continue
+            query = search.get_query()
+            tasks = self.search_tasks(query)
+            if search.match is not None:
+                tasks = {task_id: task for task_id, task in tasks.items() if search.match(task)}
+            search.tries += 1
+            search.next_search = now + search.search_rate
+            if tasks:
+                self._searches.remove(search)
+                self._gather(search.future, [self.add(task_id) for task_id in tasks])
+            elif search.tries >= search.max_tries:
+                self._searches.remove(search)
+                search.future.set_exception(
+                    AssertionError("No task was found using query '{}'".format(query))
+                )
+
+    @staticmethod
+    def _gather(future, task_futures):
+        """Complete future with the tasks of task_futures once all are done"""
+
+        def on_task_done(_):
+            if future.done():
+                return
+            for task_future in task_futures:
+                if task_future.done() and task_future.exception() is not None:
+                    future.set_exception(task_future.exception())
+                    return
+            if all(task_future.done() for task_future in task_futures):
+                future.set_result([task_future.result() for task_future in task_futures])
+
+        for task_future in task_futures:
+            task_future.add_done_callback(on_task_done)
+
+    def _poll(self):
+        """Poll all the tracked tasks with one search
+
+        :return: the number of finished tasks
+        """
+        pending = [task_id for task_id, future in self._tasks.items() if not future.done()]
+        if not pending:
+            return 0
+        tasks = self.search_tasks(' or '.join('id = {0}'.format(task_id) for task_id in pending))
+        finished = 0
+        for task_id in pending:
+            task = tasks.get(task_id)
+            if task is None or _get_field(task, 'state') not in TASK_DONE_STATES:
+                continue
+            finished += 1
+            result = _get_field(task, 'result')
+            logger.debug('Task {0} finished with result {1}'.format(task_id, result))
+            if result in self.ok_results:
+                self._tasks[task_id].set_result(task)
+            else:
+                self._tasks[task_id].set_exception(
+                    TaskFailedError(
+                        'Task {0} finished with result {1}: {2}'.format(
+                            task_id, result, _get_field(task, 'humanized') or task
+                        ),
+                        task=task,
+                    )
+                )
+        return finished
+
+    def _futures(self):
+        return list(self._tasks.values()) + self._search_futures
+
+    def wait(self, fail_fast=True):
+        """Poll the tracked tasks until all their futures are done
+
+        :param bool fail_fast: whether to raise as soon as a task fails
+        :return: the results of the task futures
+        :raises TaskFailedError: if a task failed
+        :raises TaskTimeoutError: if the tasks did not finish before the timeout
+        """
+        deadline = time.time() + self.timeout
+        interval = TASK_POLL_MIN_INTERVAL
+        while True:
+            now = time.time()
+            self._search(now)
+            finished = self._poll()
+            futures = self._futures()
+            if fail_fast:
+                for future in futures:
+                    if future.done() and future.exception() is not None:
+                        raise future.exception()
+            if all(future.done() for future in futures):
+                break
+            if now > deadline:
+                pending = [task_id for task_id, future in self._tasks.items() if not future.done()]
+                raise TaskTimeoutError(
+                    'Timeout while waiting for the tasks {0}'.format(pending), task_ids=pending
+                )
+            if finished:
+                interval = TASK_POLL_MIN_INTERVAL
+            else:
+                interval = min(interval * TASK_POLL_BACKOFF, self.max_interval)
+            sleep = interval
+            if self._searches:
+                next_search = min(search.next_search for search in self._searches)
+                sleep = max(0, min(sleep, next_search - time.time()))
+            time.sleep(sleep)
+        return [future.result() for future in futures if future.exception() is None]
+
+
+def wait_for_cli_tasks(task_ids, timeout=None):
+    """Wait for the foreman tasks with hammer, polling all of them at once
+    instead of one blocking ``hammer task progress`` call by task
+
+    :param list task_ids: the ids of the tasks to wait for
+    :param int timeout: the time in seconds to wait for all the tasks
+    :return: the ``hammer task list`` finished tasks
+    :raises TaskFailedError: if a task failed
+    :raises TaskTimeoutError: if the tasks did not finish before the timeout
+    """
+    waiter = TaskWaiter(cli_search_tasks, timeout=timeout)
+    futures = [waiter.add(task_id) for task_id in task_ids]
+    waiter.wait()
+    return [future.result() for future in futures]
@@ -9,11 +9,14 @@ make sure that the server have in place: the base images for rhel66 and rhel71,
 snap-guest and its dependencies and the ``image_dir`` path created.
 
 """
-import json
+import hashlib
+import io
 import logging
 import os
 import sys
-from time import sleep
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from urllib.parse import urljoin
 from urllib.parse import urlunsplit
 
@@ -29,13 +32,96 @@ from robottelo.constants import DISTRO_RHEL8
 from robottelo.constants import DISTRO_SLES11
 from robottelo.constants import DISTRO_SLES12
 from robottelo.constants import REPOS
-from robottelo.helpers import install_katello_ca
-from robottelo.helpers import remove_katello_ca
 from robottelo.host_info import get_host_os_version
-
+from robottelo.vm_layers import image_layer_cache
+from robottelo.vm_teardown import teardown_service
 
 logger = logging.getLogger(__name__)
 
+# the max time in seconds to wait for the virtual machines IP and SSH port
+READINESS_PROBE_TIMEOUT = 180
+# The readiness probe of the virtual machines, run on the provisioning server.
+# For each domain it looks for the IP address of the MAC address with the
+# qemu-guest-agent, or with Avahi if the agent is not available, then waits
+# for the SSH port. The domains are probed together with an exponential
+# backoff, and a line is printed for each event:
+#     ip-known DOMAIN ELAPSED_SECONDS IP SOURCE
+#     ssh-ready DOMAIN ELAPSED_SECONDS
+#     timeout DOMAIN ELAPSED_SECONDS
+READINESS_PROBE_SCRIPT = r'''#!/bin/bash
+# usage: probe.sh TIMEOUT DOMAIN MAC NAME [DOMAIN MAC NAME...]
+timeout=$1
+shift
+start=$(date +%s.%N)
+elapsed() { awk -v start="$start" -v now="$(date +%s.%N)" 'BEGIN { printf "%.3f", now - start }'; }
+declare -A macs names ips agent
+pending=()
+while [ $# -ge 3 ]; do
+    macs[$1]=${2,,}; names[$1]=$3; agent[$1]=1; pending+=("$1")
+    shift 3
+done
+delay=0.1
+while true; do
+    left=()
+    for domain in "${pending[@]}"; do
+        if [ -z "${ips[$domain]}" ] && [ "${agent[$domain]}" = 1 ]; then
+            if output=$(virsh domifaddr --source agent "$domain" 2>&1); then
+                ip=$(awk -v mac="${macs[$domain]}" \
+                    'tolower($2) == mac && $3 == "ipv4" { split($4, a, "/"); print a[1]; exit }' \
+                    <<< "$output")
+                [ -n "$ip" ] && ips[$domain]=$ip && echo "ip-known $domain $(elapsed) $ip qemu-ga"
+            elif ! grep -q 'not connected\|not responding' <<< "$output"; then
+                # the agent is not available, e.g. not configured
+                agent[$domain]=0
+            fi
+        fi
+        if [ -z "${ips[$domain]}" ] && [ "${agent[$domain]}" = 0 ]; then
+            ip=$(ping -c1 -W1 "${names[$domain]}.local" 2>/dev/null \
+                | sed -n 's/^PING [^(]*(\([0-9.]*\)).*/\1/p')
+            [ -n "$ip" ] && ips[$domain]=$ip && echo "ip-known $domain $(elapsed) $ip avahi"
+        fi
+        if [ -n "${ips[$domain]}" ] && nc -vn "${ips[$domain]}" 22 <<< "" > /dev/null 2>&1; then
+            echo "ssh-ready $domain $(elapsed)"
+        else
+            left+=("$domain")
+        fi
+    done
+    pending=("${left[@]}")
+    [ ${#pending[@]} -eq 0 ] && exit 0
+    if awk -v elapsed="$(elapsed)" -v timeout="$timeout" 'BEGIN { exit !(elapsed > timeout) }'
+    then
+        for domain in "${pending[@]}"; do echo "timeout $domain $(elapsed)"; done
+        exit 1
+    fi
+    sleep "$delay"
+    delay=$(awk -v delay="$delay" 'BEGIN { print (delay * 2 < 2 ? delay * 2 : 2) }')
+done
+'''
+READINESS_PROBE_PATH = '/tmp/robottelo-vm-probe-{}.sh'.format(
+    hashlib.sha1(READINESS_PROBE_SCRIPT.encode()).hexdigest()[:12]
+)
+
+
+def upload_readiness_probe(hostname):
+    """Upload the readiness probe script to hostname, unless it is already
+    there
+
+    The script is uploaded to a unique temporary path and moved in place, so
+    that a concurrent process never runs a partially written script.
+
+    :return: the remote path of the readiness probe script
+    """
+    if ssh.command('test -f {0}'.format(READINESS_PROBE_PATH), hostname).return_code != 0:
+        upload_path = '{0}.{1}'.format(READINESS_PROBE_PATH, gen_string('alphanumeric', 8))
+        probe = io.BytesIO(READINESS_PROBE_SCRIPT.encode())
+        ssh.upload_file(probe, upload_path, hostname=hostname)
+        result = ssh.command('mv -f {0} {1}'.format(upload_path, READINESS_PROBE_PATH), hostname)
+        if result.return_code != 0:
+            raise VirtualMachineError(
+                'Failed to upload the readiness probe to {0}: {1}'.format(hostname, result.stderr)
+            )
+    return READINESS_PROBE_PATH
+
 
 class VirtualMachineError(Exception):
     """Exception raised for failed virtual machine management operations"""
@@ -61,6 +147,10 @@ class VirtualMachine(object):
     as per virtual machine basis. Just set the wanted values when
     instantiating.
 
+    A :class:`robottelo.vm_layers.ImageLayer` can be given as ``layer`` to boot
+    the virtual machine from a pre-configured image, see
+    :mod:`robottelo.vm_layers`.
+
     """
 
     def __init__(
@@ -77,6 +167,7 @@ class VirtualMachine(object):
         target_image=None,
         bridge=None,
         network=None,
+        layer=None,
     ):
         image_map = {
             DISTRO_RHEL6: settings.distro.image_el6,
@@ -138,6 +229,10 @@ class VirtualMachine(object):
 
         self._hostname = hostname
         self.ip_addr = None
+        self._ssh_client = None
+        # the boot phases times in seconds since the creation start
+        self.boot_timings = {}
+        self._create_start = None
         self._domain = domain
         self._created = False
         self._subscribed = False
@@ -147,6 +242,7 @@ class VirtualMachine(object):
             self._target_image = tag + self._target_image
         self.bridge = bridge
         self.network = network
+        self.layer = layer
         if len(self.hostname) > 59:
             raise VirtualMachineError(
                 'Max virtual machine name is 59 chars (see BZ1289363). Name '
@@ -195,17 +291,17 @@ class VirtualMachine(object):
         else:
             return self.hostname
 
-    def create(self):
-        """Creates a virtual machine on the provisioning server using
-        snap-guest
-
-        :raises robottelo.vm.VirtualMachineError: Whenever a virtual machine
-            could not be executed.
-
-        """
-        if self._created:
-            return
+    @property
+    def _ping_from_hostname(self):
+        """The host to ping the virtual machine from: outside of VLANs from the
+        hypervisor, in VLANs from the satellite"""
+        if self.bridge == 'br0':
+            return self.provisioning_server
+        return settings.server.hostname
 
+    def _run_snap_guest(self):
+        """Run snap-guest on the provisioning server to create the virtual
+        machine"""
         command_args = [
             'snap-guest',
             '-b {source_image}',
@@ -232,8 +328,12 @@ class VirtualMachine(object):
         if self.network is not None:
             self.nw_type = 'network'
 
+        source_image = self._source_image
+        if self.layer is not None:
+            source_image = image_layer_cache.get_image(self.layer, self)
+
         command = ' '.join(command_args).format(
-            source_image=self._source_image,
+            source_image=source_image,
             target_image=self.target_image,
             vm_ram=self.ram,
             vm_cpu=self.cpu,
@@ -244,83 +344,141 @@ class VirtualMachine(object):
             nw_type=self.nw_type,
         )
 
+        self._create_start = time.time()
         result = ssh.command(command, self.provisioning_server, connection_timeout=30)
         if result.return_code != 0:
             raise VirtualMachineError('Failed to run snap-guest: {0}'.format(result.stderr))
         else:
             self._created = True
             self.mac = [n.split('MAC:')[1].strip() for n in result.stdout if 'MAC:' in n][0]
-        # outside of VLANs ping from hypervisor, in VLANs ping from SAT
-        if self.bridge == 'br0':
-            ping_from_hostname = self.provisioning_server
-        else:
-            ping_from_hostname = settings.server.hostname
-
-        # Give some time to machine boot
-        for i in range(60):
-            qemu_ga_check = ssh.command(
-                'virsh qemu-agent-command {0} '
-                '\'{{"execute":"guest-network-get-interfaces"}}\''.format(self.hostname),
-                ping_from_hostname,
-                connection_timeout=30,
+            self.boot_timings['snap_guest'] = time.time() - self._create_start
+
+    def create(self):
+        """Creates a virtual machine on the provisioning server using
+        snap-guest
+
+        The boot phases timings are recorded in :attr:`boot_timings`.
+
+        :raises robottelo.vm.VirtualMachineError: Whenever a virtual machine
+            could not be executed.
+
+        """
+        if self._created:
+            return
+
+        self._run_snap_guest()
+        try:
+            self._probe_readiness([self])
+            self._apply_layer_identity()
+        except VirtualMachineError:
+            logger.error('Failed to reach the VM, reverting changes')
+            self.destroy()
+            raise
+
+    @classmethod
+    def create_many(cls, specs):
+        """Creates several virtual machines at once
+
+        All the snap-guest commands are run concurrently, then a single
+        readiness probe waits for the IP addresses and the SSH port of all the
+        virtual machines, so creating many virtual machines takes about as
+        long as creating one::
+
+            rhel7_vm, rhel8_vm = VirtualMachine.create_many(
+                [{'distro': DISTRO_RHEL7}, {'distro': DISTRO_RHEL8}]
             )
-            if qemu_ga_check.return_code != 0:
-                if 'guest agent is not connected' in qemu_ga_check.stderr:
-                    # this means the agent wasn't started yet (vm still booting)
-                    sleep(1)
-                else:
-                    # this means there's another error with agent, e.g. it is not configured
-                    break
-            else:
-                ifaces = json.loads(qemu_ga_check.stdout[0])
-                mgmt_if = next(
-                    (
-                        i
-                        for i in ifaces['return']
-                        if i['hardware-address'].lower() == self.mac.lower()
-                    ),
-                    {},
-                )
-                try:
-                    # get only the ipv4 addresses
-                    self.ip_addr = next(
-                        i['ip-address']
-                        for i in mgmt_if['ip-addresses']
-                        if i['ip-address-type'] == 'ipv4'
-                    )
-                    break
-                except (KeyError, StopIteration):
-                    sleep(1)
-                    continue
 
-        if not self.ip_addr:
-            # fallback to avahi in case of any issue with qemu-guest-agent
-            logger.warning('Failed to parse the mgmt IPv4 using qemu-guest-agent, trying Avahi')
+        :param list specs: the :class:`VirtualMachine` keyword arguments of
+            each virtual machine
+        :return: the created virtual machines, in the specs order
+        :raises robottelo.vm.VirtualMachineError: Whenever a virtual machine
+            could not be created, all the virtual machines are then destroyed.
+        """
+        vms = [cls(**spec) for spec in specs]
+        if not vms:
+            return vms
+        try:
+            with ThreadPoolExecutor(max_workers=len(vms)) as executor:
+                # iterate the results to raise the snap-guest errors
+                list(executor.map(lambda vm: vm._run_snap_guest(), vms))
+            cls._probe_readiness(vms)
+            with ThreadPoolExecutor(max_workers=len(vms)) as executor:
+                list(executor.map(lambda vm: vm._apply_layer_identity(), vms))
+        except Exception:
+            logger.error('Failed to create the virtual machines, reverting changes')
+            with ThreadPoolExecutor(max_workers=len(vms)) as executor:
+                list(executor.map(lambda vm: vm.destroy(), vms))
+            raise
+        return vms
+
+    def _apply_layer_identity(self):
+        """Run the identity steps of the virtual machine layer, if any"""
+        if self.layer is not None:
+            self.layer.apply_identity(self)
+            self.boot_timings['layer_identity'] = time.time() - self._create_start
+
+    @staticmethod
+    def _probe_readiness(vms):
+        """Wait for the IP address and the SSH port of vms, with one run of the
+        readiness probe by host, and record their boot phases timings.
+
+        :raises robottelo.vm.VirtualMachineError: if the IP address or the SSH
+            port of a virtual machine is not available before the timeout.
+        """
+        vms_by_host = defaultdict(list)
+        for vm in vms:
+            vms_by_host[vm._ping_from_hostname].append(vm)
+        for hostname, host_vms in vms_by_host.items():
+            probe_path = upload_readiness_probe(hostname)
+            probe_start = time.time()
             result = ssh.command(
-                'for i in {{1..60}}; do ping -c1 {0}.local && exit 0; sleep 1;'
-                ' done; exit 1'.format(self._target_image),
-                ping_from_hostname,
+                'bash {0} {1} {2}'.format(
+                    probe_path,
+                    READINESS_PROBE_TIMEOUT,
+                    ' '.join(
+                        '{0} {1} {2}'.format(vm.hostname, vm.mac, vm._target_image)
+                        for vm in host_vms
+                    ),
+                ),
+                hostname,
+                timeout=READINESS_PROBE_TIMEOUT + 60,
                 connection_timeout=30,
             )
-            if result.return_code != 0:
-                logger.error('Failed to obtain VM IP, reverting changes')
-                self.destroy()
-                raise VirtualMachineError('Failed to fetch virtual machine IP address information')
-            output = ''.join(result.stdout)
-            self.ip_addr = output.split('(')[1].split(')')[0]
-        ssh_check = ssh.command(
-            'for i in {{1..60}}; do nc -vn {0} 22 <<< "" && exit 0; sleep 1;'
-            ' done; exit 1'.format(self.ip_addr),
-            self.provisioning_server,
-            connection_timeout=30,
-        )
-        if ssh_check.return_code != 0:
-            logger.error('Failed to SSH to the VM, reverting changes')
-            self.destroy()
-            raise VirtualMachineError('Failed to connect to SSH port of the virtual machine')
+            vms_by_domain = {vm.hostname: vm for vm in host_vms}
+            for line in result.stdout:
+                event = line.split()
+                if len(event) < 3 or event[1] not in vms_by_domain:
+                    continue
+                vm = vms_by_domain[event[1]]
+                # the elapsed time since the snap-guest start
+                elapsed = probe_start - vm._create_start + float(event[2])
+                if event[0] == 'ip-known':
+                    vm.ip_addr = event[3]
+                    vm.boot_timings['ip_known'] = elapsed
+                    vm.boot_timings['ip_source'] = event[4]
+                elif event[0] == 'ssh-ready':
+                    vm.boot_timings['ssh_ready'] = elapsed
+            for vm in host_vms:
+                logger.info('VM {0} boot phases timings: {1}'.format(vm.hostname, vm.boot_timings))
+                if not vm.ip_addr:
+                    raise VirtualMachineError(
+                        'Failed to fetch virtual machine {0} IP address information'.format(
+                            vm.hostname
+                        )
+                    )
+                if 'ssh_ready' not in vm.boot_timings:
+                    raise VirtualMachineError(
+                        'Failed to connect to SSH port of the virtual machine {0}'.format(
+                            vm.hostname
+                        )
+                    )
+
+    def destroy(self, async_=False):
+        """Destroys the virtual machine on the provisioning server
 
-    def destroy(self):
-        """Destroys the virtual machine on the provisioning server"""
+        :param bool async_: whether to destroy the virtual machine and its
+            image in the background, see :mod:`robottelo.vm_teardown`
+        """
         logger.info('Destroying the VM')
         if not self._created:
             return
@@ -334,7 +492,17 @@ class VirtualMachine(object):
                 logger.error(
                     'Failed to unregister the host: {0}\n{1}'.format(self.hostname, exp.message)
                 )
+        self.close_ssh_client()
 
+        image_name = '{0}.img'.format(self.target_image)
+        if async_:
+            teardown_service.submit(
+                self.provisioning_server,
+                self.target_image,
+                os.path.join(self.image_dir, image_name),
+                connection_timeout=30,
+            )
+            return
         ssh.command(
             'virsh destroy {0}'.format(self.target_image),
             hostname=self.provisioning_server,
@@ -345,7 +513,6 @@ class VirtualMachine(object):
             hostname=self.provisioning_server,
             connection_timeout=30,
         )
-        image_name = '{0}.img'.format(self.target_image)
         ssh.command(
             'rm {0}'.format(os.path.join(self.image_dir, image_name)),
             hostname=self.provisioning_server,
@@ -451,25 +618,40 @@ gpgcheck=0'''.format(
         :raises robottelo.vm.VirtualMachineError: If katello-host-tools wasn't
             installed.
         """
-        self.run('yum install -y katello-host-tools')
-        result = self.run('rpm -q katello-host-tools')
+        result = self.run_batch(
+            ['yum install -y katello-host-tools', 'rpm -q katello-host-tools'],
+            stop_on_error=False,
+        )
         if result.return_code != 0:
             raise VirtualMachineError('Failed to install katello-host-tools')
 
+    def _install_katello_ca(self, cert_rpm_url, hostname):
+        """Install the katello-ca rpm of hostname from cert_rpm_url, in one
+        round trip
+
+        :return: whether the katello-ca rpm is installed
+        """
+        # Not checking the return code of the installation, as rpm could be
+        # installed before and installation may fail
+        result = self.run_batch(
+            [
+                'rpm -Uvh {0}'.format(cert_rpm_url),
+                'rpm -q katello-ca-consumer-{0}'.format(hostname),
+            ],
+            stop_on_error=False,
+        )
+        return result.return_code == 0
+
     def install_katello_ca(self):
         """Downloads and installs katello-ca rpm on the virtual machine.
 
-        Uses common helper `install_katello_ca(hostname=None)`, but passes
-        `self.ip_addr` instead of the hostname as we are using fake hostnames
-        for virtual machines.
-
         :return: None.
         :raises robottelo.vm.VirtualMachineError: If katello-ca wasn't
             installed.
         """
-        try:
-            install_katello_ca(hostname=self.ip_addr)
-        except AssertionError:
+        if not self._install_katello_ca(
+            settings.server.get_cert_rpm_url(), settings.server.hostname
+        ):
             raise VirtualMachineError('Failed to download and install the katello-ca rpm')
 
     def install_capsule_katello_ca(self, capsule=None):
@@ -481,9 +663,7 @@ gpgcheck=0'''.format(
         """
         url = urlunsplit(('http', capsule, 'pub/', '', ''))
         ca_url = urljoin(url, 'katello-ca-consumer-latest.noarch.rpm')
-        ssh.command('rpm -Uvh {0}'.format(ca_url), self.ip_addr)
-        result = ssh.command('rpm -q katello-ca-consumer-{0}'.format(capsule), self.ip_addr)
-        if result.return_code != 0:
+        if not self._install_katello_ca(ca_url, capsule):
             raise VirtualMachineError('Failed to install the katello-ca rpm')
 
     def register_contenthost(
@@ -560,17 +740,10 @@ gpgcheck=0'''.format(
     def remove_katello_ca(self):
         """Removes katello-ca rpm from the virtual machine.
 
-        Uses common helper `remove_katello_ca(hostname=None)`, but passes
-        `self.ip_addr` instead of the hostname as we are using fake hostnames
-        for virtual machines.
-
         :return: None.
         :raises robottelo.vm.VirtualMachineError: If katello-ca wasn't removed.
         """
-        try:
-            remove_katello_ca(hostname=self.ip_addr)
-        except AssertionError:
-            raise VirtualMachineError('Failed to remove the katello-ca rpm')
+        self.remove_capsule_katello_ca(settings.server.hostname)
 
     def remove_capsule_katello_ca(self, capsule=None):
         """Removes katello-ca rpm and reset rhsm.conf from the virtual machine.
@@ -578,8 +751,15 @@ gpgcheck=0'''.format(
         :param: str capsule: Capsule hostname
         :raises robottelo.vm.VirtualMachineError: If katello-ca wasn't removed.
         """
-        ssh.command('yum erase -y $(rpm -qa |grep katello-ca-consumer)', self.ip_addr)
-        result = ssh.command('rpm -q katello-ca-consumer-{0}'.format(capsule), self.ip_addr)
+        # Not checking the return code of the removal, as rpm can be not even
+        # installed and deleting may fail
+        result = self.run_batch(
+            [
+                'yum erase -y $(rpm -qa |grep katello-ca-consumer)',
+                'rpm -q katello-ca-consumer-{0}'.format(capsule),
+            ],
+            stop_on_error=False,
+        )
         if result.return_code == 0:
             raise VirtualMachineError('Failed to remove the katello-ca rpm')
         rhsm_updates = [
@@ -588,12 +768,11 @@ gpgcheck=0'''.format(
             's|^baseurl.*|baseurl=https://cdn.redhat.com|',
             's/^repo_ca_cert.*/repo_ca_cert=%(ca_cert_dir)sredhat-uep.pem/',
         ]
-        for command in rhsm_updates:
-            result = ssh.command(
-                'sed -i -e "{0}" /etc/rhsm/rhsm.conf'.format(command), self.ip_addr
-            )
-            if result.return_code != 0:
-                raise VirtualMachineError('Failed to reset the rhsm.conf')
+        result = self.run_batch(
+            ['sed -i -e "{0}" /etc/rhsm/rhsm.conf'.format(command) for command in rhsm_updates]
+        )
+        if result.return_code != 0:
+            raise VirtualMachineError('Failed to reset the rhsm.conf')
 
     def unregister(self):
         """Run subscription-manager unregister.
@@ -621,7 +800,42 @@ gpgcheck=0'''.format(
                 'The virtual machine should be created before running any ssh command'
             )
 
-        return ssh.command(cmd, hostname=self.ip_addr, timeout=timeout)
+        return self.ssh_client.run(cmd, timeout=timeout)
+
+    def run_batch(self, commands, timeout=None, stop_on_error=True):
+        """Runs several ssh commands on the virtual machine in one round trip
+
+        :param list commands: The commands to run on the virtual machine, in
+            order
+        :param int timeout: Time to wait for all the commands to finish
+        :param bool stop_on_error: Whether to stop at the first failed
+            command, otherwise all the commands are run
+        :return: A :class:`robottelo.ssh.SSHCommandResult` instance with the
+            output of all the commands, and the return code of the first
+            failed command if stop_on_error else of the last command
+        :rtype: robottelo.ssh.SSHCommandResult
+        :raises robottelo.vm.VirtualMachineError: If the virtual machine is not
+            created.
+        """
+        separator = ' && ' if stop_on_error else '; '
+        return self.run(
+            separator.join('{{ {0}; }}'.format(command) for command in commands), timeout=timeout
+        )
+
+    @property
+    def ssh_client(self):
+        """The SSH connection to the virtual machine, opened on first use and
+        kept open until :meth:`destroy`"""
+        transport = self._ssh_client.get_transport() if self._ssh_client else None
+        if transport is None or not transport.is_active():
+            self._ssh_client = ssh.get_client(hostname=self.ip_addr)
+        return self._ssh_client
+
+    def close_ssh_client(self):
+        """Close the SSH connection to the virtual machine, if opened"""
+        if self._ssh_client is not None:
+            self._ssh_client.close()
+            self._ssh_client = None
 
     def get(self, remote_path, local_path=None):
         """Get a remote file from the virtual machine."""
@@ -629,7 +843,13 @@ gpgcheck=0'''.format(
             raise VirtualMachineError(
                 'The virtual machine should be created before getting any file'
             )
-        ssh.download_file(remote_path, local_path, hostname=self.ip_addr)
+        if local_path is None:
+            local_path = remote_path
+        sftp = self.ssh_client.open_sftp()
+        try:
+            sftp.get(remote_path, local_path)
+        finally:
+            sftp.close()
 
     def put(self, local_path, remote_path=None):
         """Put a local file to the virtual machine."""
@@ -637,19 +857,34 @@ gpgcheck=0'''.format(
             raise VirtualMachineError(
                 'The virtual machine should be created before putting any file'
             )
-        ssh.upload_file(local_path, remote_path, hostname=self.ip_addr)
+        sftp = self.ssh_client.open_sftp()
+        try:
+            ssh._upload_file(sftp, local_path, remote_path)
+        finally:
+            sftp.close()
 
-    def configure_rhel_repo(self, rhel_repo):
-        """Configures specified Red Hat repository on the virtual machine.
+    @staticmethod
+    def rhel_repo_command(rhel_repo):
+        """Return the command configuring the specified Red Hat repository, to
+        run it in a :meth:`run_batch` with other commands.
 
         :param rhel_repo: Red Hat repository link from properties file.
-        :return: None.
+        :return: the command string.
 
         """
         # 'Access Insights', 'puppet' requires RHEL 6/7 repo and it is not
         # possible to sync the repo during the tests as they are huge(in GB's)
         # hence this adds a file in /etc/yum.repos.d/rhel6/7.repo
-        self.run('wget -O /etc/yum.repos.d/rhel.repo {0}'.format(rhel_repo))
+        return 'wget -O /etc/yum.repos.d/rhel.repo {0}'.format(rhel_repo)
+
+    def configure_rhel_repo(self, rhel_repo):
+        """Configures specified Red Hat repository on the virtual machine.
+
+        :param rhel_repo: Red Hat repository link from properties file.
+        :return: None.
+
+        """
+        self.run(self.rhel_repo_command(rhel_repo))
 
     def configure_puppet(self, rhel_repo=None, proxy_hostname=None):
         """Configures puppet on the virtual machine/Host.
@@ -660,7 +895,6 @@ gpgcheck=0'''.format(
         if proxy_hostname is None:
             proxy_hostname = settings.server.hostname
 
-        self.configure_rhel_repo(rhel_repo)
         puppet_conf = (
             '[main]\n'
             'vardir = /opt/puppetlabs/puppet/cache\n'
@@ -676,14 +910,18 @@ gpgcheck=0'''.format(
             'environment     = production\n'
             f'server          = {proxy_hostname}\n'
         )
-        result = self.run('yum install puppet -y')
+        result = self.run_batch(
+            [self.rhel_repo_command(rhel_repo), 'yum install puppet -y'], stop_on_error=False,
+        )
         if result.return_code != 0:
             raise VirtualMachineError('Failed to install the puppet rpm')
-        self.run(f'echo "{puppet_conf}" >> /etc/puppetlabs/puppet/puppet.conf')
         # This particular puppet run on client would populate a cert on
         # sat6 under the capsule --> certifcates or on capsule via cli "puppetserver
         # ca list", so that we sign it.
-        self.run('puppet agent -t')
+        self.run_batch(
+            [f'echo "{puppet_conf}" >> /etc/puppetlabs/puppet/puppet.conf', 'puppet agent -t'],
+            stop_on_error=False,
+        )
         ssh.command(cmd='puppetserver ca sign --all', hostname=proxy_hostname)
         # This particular puppet run would create the host entity under
         # 'All Hosts' and let's redirect stderr to /dev/null as errors at
@@ -743,18 +981,17 @@ gpgcheck=0'''.format(
                 )
             )
 
-        self.configure_rhel_repo(rhel_repo)
-
-        self.run('wget -O /etc/yum.repos.d/insights.repo {0}'.format(insights_repo))
-
-        # Install redhat-access-insights package
+        # Install redhat-access-insights package, and verify if package is
+        # installed by query it
         package_name = 'insights-client'
-        result = self.run('yum install -y {0}'.format(package_name))
-        if result.return_code != 0:
-            raise VirtualMachineError('Unable to install redhat-access-insights package')
-
-        # Verify if package is installed by query it
-        result = self.run('rpm -qi {0}'.format(package_name))
+        result = self.run_batch(
+            [
+                self.rhel_repo_command(rhel_repo),
+                'wget -O /etc/yum.repos.d/insights.repo {0}'.format(insights_repo),
+                'yum install -y {0} && rpm -qi {0}'.format(package_name),
+            ],
+            stop_on_error=False,
+        )
         logger.info('Insights client rpm version: {0}'.format(result.stdout))
         if result.return_code != 0:
             raise VirtualMachineError('Unable to install redhat-access-insights package')
@@ -773,13 +1010,18 @@ gpgcheck=0'''.format(
         :param str infrastructure_type: One of "physical", "virtual"
         """
         script_path = "/usr/sbin/virt-what"
-        self.run(f"cp -n {script_path} {script_path}.old")
 
         script_content = ["#!/bin/sh -"]
         if infrastructure_type == "virtual":
             script_content.append("echo kvm")
         script_content = "\n".join(script_content)
-        self.run(f"echo -e '{script_content}' > {script_path}")
+        self.run_batch(
+            [
+                f"cp -n {script_path} {script_path}.old",
+                f"echo -e '{script_content}' > {script_path}",
+            ],
+            stop_on_error=False,
+        )
 
     def patch_os_release_version(self, distro=DISTRO_RHEL7):
         """Patch VM OS release version.
@@ -808,4 +1050,4 @@ gpgcheck=0'''.format(
         return self
 
     def __exit__(self, *exc):
-        self.destroy()
+        self.destroy(async_=True)
@@ -1,7 +1,17 @@
-"""Virtual machine client provisioning with satellite capsule product setup"""
+"""Virtual machine client provisioning with satellite capsule product setup
+
+With the ``image_cache`` option of the capsule configuration section, the
+image of the first configured capsule is saved on the provisioning server, by
+satellite and satellite version. The next capsules boot from it with the same
+hostname, and only their certificates and name resolution are refreshed. A
+capsule is named after the saved image only when no other capsule uses or is
+claiming the name, otherwise it is set up from scratch with a unique name.
+"""
+import hashlib
 import logging
 import os
 import time
+from contextlib import ExitStack
 from tempfile import mkstemp
 
 from fauxfactory import gen_alphanumeric
@@ -12,7 +22,11 @@ from robottelo.cli.host import Host
 from robottelo.config import settings
 from robottelo.constants import SATELLITE_FIREWALL_SERVICE_NAME
 from robottelo.decorators import setting_is_set
+from robottelo.decorators.func_locker import FunctionLockerError
+from robottelo.decorators.func_locker import lock_function
+from robottelo.decorators.func_locker import locking_function
 from robottelo.helpers import extract_capsule_satellite_installer_command
+from robottelo.host_info import get_sat_version
 from robottelo.ssh import download_file
 from robottelo.ssh import upload_file
 from robottelo.utils.issue_handlers import is_open
@@ -20,11 +34,22 @@ from robottelo.vm import VirtualMachine
 
 logger = logging.getLogger(__name__)
 
+# bump to discard all the capsule images saved on the provisioning servers
+CAPSULE_IMAGE_CACHE_VERSION = 1
+# the time in seconds to wait for the capsule virtual machine shutdown
+CAPSULE_SHUTDOWN_TIMEOUT = 300
+
 
 class CapsuleVirtualMachineError(Exception):
     """Exception raised for failed capsule virtual machine operations"""
 
 
+@lock_function
+def _claim_image_cache_name():
+    """Locked by the capsule named after its saved image, from the check that
+    no other capsule uses the name until its virtual machine is created"""
+
+
 class CapsuleVirtualMachine(VirtualMachine):
     """Virtual machine client provisioning with satellite capsule product
     setup
@@ -41,6 +66,7 @@ class CapsuleVirtualMachine(VirtualMachine):
         lce_id=None,
         organization_ids=None,
         location_ids=None,
+        image_cache=None,
     ):
         """Manage a virtual machine with satellite capsule product setup for
         client provisioning.
@@ -62,6 +88,9 @@ class CapsuleVirtualMachine(VirtualMachine):
          organizations that will use the capsule.
         :param List[int] location_ids: the location ids for which the content
          will be synchronized.
+        :param bool image_cache: whether to boot from the saved image of a
+         configured capsule, or save it, default to the capsule ``image_cache``
+         setting.
         """
         # ensure that capsule configuration exist and validate
         if not setting_is_set('capsule'):
@@ -96,6 +125,12 @@ class CapsuleVirtualMachine(VirtualMachine):
         self._capsule = None
         self._capsule_org = None
         self._capsule_lce = None
+        if image_cache is None:
+            image_cache = settings.capsule.image_cache
+        self._image_cache = image_cache
+        # the name of the image of this capsule saved on the provisioning
+        # server, if cached
+        self._image_cache_name = None
 
     @property
     def hostname_local(self):
@@ -127,7 +162,7 @@ class CapsuleVirtualMachine(VirtualMachine):
         are resolvable
         """
         self.run(
-            'echo "{0} {1} {2}" >> /etc/hosts'.format(
+            'sed -i \'/{1}/d\' /etc/hosts && echo "{0} {1} {2}" >> /etc/hosts'.format(
                 self.ip_addr, self._capsule_hostname, self._capsule_instance_name
             )
         )
@@ -237,12 +272,34 @@ class CapsuleVirtualMachine(VirtualMachine):
             raise CapsuleVirtualMachineError(
                 'Failed to install satellite-capsule package\n{}'.format(result.stderr)
             )
+        self._capsule_install()
+
+        # manually start pulp_celerybeat service if BZ1446930 is open
+        result = self.run('systemctl status pulp_celerybeat.service')
+        if 'inactive (dead)' in '\n'.join(result.stdout):
+            if is_open('BZ:1446930'):
+                result = self.run('systemctl start pulp_celerybeat.service')
+                if result.return_code != 0:
+                    raise CapsuleVirtualMachineError(
+                        'Failed to start pulp_celerybeat service\n{}'.format(result.stderr)
+                    )
+            else:
+                raise CapsuleVirtualMachineError('pulp_celerybeat service not running')
+
+    def _capsule_install(self, certs_update=False):
+        """Generate the capsule certificates on the satellite and run the
+        capsule installer with them
+
+        :param bool certs_update: whether to update the certificates of an
+            installed capsule
+        """
         cert_file_path = '/root/{0}-certs.tar'.format(self.hostname)
-        certs_gen = ssh.command(
-            'capsule-certs-generate '
-            '--foreman-proxy-fqdn {0} '
-            '--certs-tar {1}'.format(self.hostname, cert_file_path)
+        certs_gen_cmd = 'capsule-certs-generate --foreman-proxy-fqdn {0} --certs-tar {1}'.format(
+            self.hostname, cert_file_path
         )
+        if certs_update:
+            certs_gen_cmd += ' --certs-update-all'
+        certs_gen = ssh.command(certs_gen_cmd)
         if certs_gen.return_code != 0:
             raise CapsuleVirtualMachineError(
                 'Unable to generate certificate\n{}'.format(certs_gen.stderr)
@@ -266,6 +323,8 @@ class CapsuleVirtualMachine(VirtualMachine):
         os.remove(temporary_local_cert_file_path)
 
         installer_cmd = extract_capsule_satellite_installer_command(certs_gen.stdout)
+        if certs_update and '--certs-update-all' not in installer_cmd:
+            installer_cmd += ' --certs-update-all'
         result = self.run(installer_cmd, timeout=1800)
         if result.return_code != 0:
             # before exit download the capsule log file
@@ -275,22 +334,121 @@ class CapsuleVirtualMachine(VirtualMachine):
                 result.return_code, result.stderr, 'foreman installer failed at capsule host'
             )
 
-        # manually start pulp_celerybeat service if BZ1446930 is open
-        result = self.run('systemctl status pulp_celerybeat.service')
-        if 'inactive (dead)' in '\n'.join(result.stdout):
-            if is_open('BZ:1446930'):
-                result = self.run('systemctl start pulp_celerybeat.service')
-                if result.return_code != 0:
-                    raise CapsuleVirtualMachineError(
-                        'Failed to start pulp_celerybeat service\n{}'.format(result.stderr)
-                    )
-            else:
-                raise CapsuleVirtualMachineError('pulp_celerybeat service not running')
+    def _get_image_cache_name(self):
+        """Return the name of the saved image of the capsules configured
+        against the satellite version, by distro"""
+        cache_key = '\n'.join(
+            [
+                str(CAPSULE_IMAGE_CACHE_VERSION),
+                settings.server.hostname,
+                str(get_sat_version()),
+                self._source_image,
+                str(settings.capsule_repo),
+            ]
+        )
+        cache_hash = hashlib.sha1(cache_key.encode()).hexdigest()
+        return '{0}-capsule-{1}'.format(self._source_image, cache_hash[:12])
+
+    def _use_image_cache(self):
+        """Name the capsule after its saved image, if not used by another
+        capsule
+
+        :return: whether the saved image exists and the capsule boots from it
+        """
+        cache_name = self._get_image_cache_name()
+        instance_name = '{0}-{1}'.format(cache_name[-4:], settings.capsule.instance_name)
+        result = ssh.command(
+            'virsh dominfo {0}'.format(instance_name),
+            hostname=self.provisioning_server,
+            connection_timeout=30,
+        )
+        if result.return_code == 0:
+            logger.info(
+                'The capsule {0} is already running, not using its saved image'.format(
+                    instance_name
+                )
+            )
+            return False
+        self._image_cache_name = cache_name
+        self._capsule_instance_name = self._target_image = instance_name
+        self._capsule_hostname = self._hostname = '{0}.{1}'.format(
+            instance_name, self._capsule_domain
+        )
+        cache_path = os.path.join(self.image_dir, '{0}.img'.format(cache_name))
+        result = ssh.command(
+            'test -f {0}'.format(cache_path),
+            hostname=self.provisioning_server,
+            connection_timeout=30,
+        )
+        if result.return_code != 0:
+            return False
+        self._source_image = cache_name
+        return True
+
+    def _save_image_cache(self):
+        """Shutdown the configured capsule, save its image and start it again"""
+        logger.info('Saving the capsule image {0}'.format(self._image_cache_name))
+        self.close_ssh_client()
+        image_path = os.path.join(self.image_dir, '{0}.img'.format(self._target_image))
+        cache_path = os.path.join(self.image_dir, '{0}.img'.format(self._image_cache_name))
+        result = ssh.command(
+            'virsh shutdown {0} && '
+            'timeout {1} sh -c \'until virsh domstate {0} | grep -q "shut off"; '
+            'do sleep 1; done\' && '
+            'cp {2} {3}.tmp && mv {3}.tmp {3}; saved=$?; '
+            'virsh start {0} && test $saved -eq 0'.format(
+                self._target_image, CAPSULE_SHUTDOWN_TIMEOUT, image_path, cache_path
+            ),
+            hostname=self.provisioning_server,
+            timeout=CAPSULE_SHUTDOWN_TIMEOUT + 600,
+            connection_timeout=30,
+        )
+        if result.return_code != 0:
+            raise CapsuleVirtualMachineError(
+                'Failed to save the capsule image\n{}'.format(result.stderr)
+            )
+        ip_addr = self.ip_addr
+        self._probe_readiness([self])
+        if self.ip_addr != ip_addr:
+            self._capsule_setup_name_resolution()
+
+    def _refresh_capsule(self):
+        """Refresh the name resolution and the certificates of a capsule booted
+        from its saved image"""
+        self._capsule_setup_name_resolution()
+        self._capsule_install(certs_update=True)
 
     def create(self):
-        super(CapsuleVirtualMachine, self).create()
+        if self._created:
+            return
+        cached = False
+        with ExitStack() as stack:
+            if self._image_cache:
+                cache_name = self._get_image_cache_name()
+                try:
+                    stack.enter_context(
+                        locking_function(
+                            _claim_image_cache_name,
+                            scope=self.provisioning_server,
+                            scope_context=cache_name,
+                            timeout=0,
+                        )
+                    )
+                except FunctionLockerError:
+                    logger.info(
+                        'The capsule of the saved image {0} is being created, '
+                        'not using its saved image'.format(cache_name)
+                    )
+                else:
+                    cached = self._use_image_cache()
+            super(CapsuleVirtualMachine, self).create()
         try:
-            self._setup_capsule()
+            if cached:
+                self._refresh_capsule()
+            else:
+                self._setup_capsule()
+                if self._image_cache_name:
+                    self._save_image_cache()
         except Exception:
             # handle exception as VirtualMachine has no exception handling
             # in __enter__ function
@@ -359,7 +517,7 @@ class CapsuleVirtualMachine(VirtualMachine):
 
         return resumed
 
-    def destroy(self):
+    def destroy(self, async_=False):
         """Destroys the virtual machine on the provisioning server"""
         self._capsule_cleanup()
-        super(CapsuleVirtualMachine, self).destroy()
+        super(CapsuleVirtualMachine, self).destroy(async_=async_)
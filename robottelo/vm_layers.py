@@ -0,0 +1,232 @@
+"""Cache of pre-configured virtual machine images
+
+Most content hosts run the same slow configuration after boot: install the
+katello-ca, register, enable the repositories and install the katello-agent.
+An :class:`ImageLayer` is the recipe of this configuration: its ``steps`` are
+baked once in a qcow2 overlay of the base image on the provisioning server,
+and its ``identity_steps``, that depend on the virtual machine identity, are
+re-run on every virtual machine booted from the layer::
+
+    layer = content_host_layer(org['label'], activation_key['name'])
+    with VirtualMachine(distro=DISTRO_RHEL7, layer=layer) as vm:
+        # vm has the katello-agent installed and is registered
+        ...
+
+The layer images are keyed by the base image and the hash of the recipe
+steps, and are rebuilt when the base image is updated. Their modification time
+is updated when they are used, and the images of the same base image and layer
+name that were not used for ``IMAGE_LAYER_MAX_AGE`` days are removed when a
+layer image is built, e.g. the images of the previous runs organizations.
+"""
+import hashlib
+import logging
+import os
+import threading
+from collections import defaultdict
+
+from robottelo import ssh
+from robottelo.config import settings
+
+logger = logging.getLogger(__name__)
+
+# bump to rebuild all the layer images
+IMAGE_LAYER_VERSION = 1
+# the time in seconds to wait for the layer steps to finish
+IMAGE_LAYER_BUILD_TIMEOUT = 1800
+# the time in seconds to wait for the layer build virtual machine shutdown
+IMAGE_LAYER_SHUTDOWN_TIMEOUT = 120
+# the days after which the unused layer images are removed
+IMAGE_LAYER_MAX_AGE = 7
+# run on the layer build virtual machine before its shutdown, to not bake its
+# identity in the layer image
+IMAGE_LAYER_CLEANUP_COMMANDS = [
+    'subscription-manager unregister',
+    'subscription-manager clean',
+    'yum clean all',
+    'truncate -s 0 /etc/machine-id',
+    'sync',
+]
+
+
+class ImageLayer(object):
+    """Recipe of a virtual machine image layer
+
+    :param str name: the layer name, used in the layer image name
+    :param list steps: the shell commands configuring the virtual machine,
+        baked in the layer image
+    :param list identity_steps: the shell commands or the callables taking the
+        virtual machine, run on every virtual machine booted from the layer
+    """
+
+    def __init__(self, name, steps, identity_steps=None):
+        self.name = name
+        self.steps = list(steps)
+        self.identity_steps = list(identity_steps or [])
+
+    def get_image_name(self, source_image):
+        """Return the name of the layer image of source_image, that changes
+        with the layer steps"""
+        recipe = '\n'.join([str(IMAGE_LAYER_VERSION), source_image, self.name] + self.steps)
+        recipe_hash = hashlib.sha1(recipe.encode()).hexdigest()[:12]
+        return '{0}-{1}-{2}'.format(source_image, self.name, recipe_hash)
+
+    def apply_identity(self, vm):
+        """Run the identity steps on vm"""
+        for step in self.identity_steps:
+            if callable(step):
+                step(vm)
+                continue
+            result = vm.run(step)
+            if result.return_code != 0:
+                # imported here as robottelo.vm uses this module
+                from robottelo.vm import VirtualMachineError
+
+                raise VirtualMachineError(
+                    'Failed to run the {0} layer identity step "{1}": {2}'.format(
+                        self.name, step, result.stderr
+                    )
+                )
+
+
+def content_host_layer(
+    org_label, activation_key, rh_repos_id=None, install_katello_agent=True, name='content-host'
+):
+    """Return the layer of a content host registered with activation_key,
+    like :func:`robottelo.cli.factory.setup_virtual_machine` does
+
+    The katello-ca, the enabled repositories and the katello-agent are baked in
+    the layer image, the registration and the repositories enablement are
+    re-run on every virtual machine.
+
+    :param str org_label: The Organization label.
+    :param str activation_key: Activation key name.
+    :param list rh_repos_id: a list of RH repositories ids to enable.
+    :param bool install_katello_agent: whether to install katello agent.
+    :param str name: the layer name.
+    """
+    register = 'subscription-manager register --org {0} --activationkey {1} --force'.format(
+        org_label, activation_key
+    )
+    steps = ['rpm -Uvh {0}'.format(settings.server.get_cert_rpm_url()), register]
+    identity_steps = [lambda vm: vm.register_contenthost(org_label, activation_key)]
+    if rh_repos_id:
+        enable_repos = 'subscription-manager repos {0}'.format(
+            ' '.join('--enable {0}'.format(repo_id) for repo_id in rh_repos_id)
+        )
+        steps.append(enable_repos)
+        identity_steps.append(enable_repos)
+    if install_katello_agent:
+        steps.append('yum install -y katello-agent')
+        # goferd reads the consumer certificate of the new registration
+        identity_steps.append('service goferd restart')
+    return ImageLayer(name, steps, identity_steps)
+
+
+class ImageLayerCache(object):
+    """Layer images built on the provisioning servers, by the first virtual
+    machine booted from them"""
+
+    def __init__(self):
+        # the layer images known to exist, {(provisioning_server, image_path)}
+        self._images = set()
+        self._locks = defaultdict(threading.Lock)
+        self._lock = threading.Lock()
+
+    def get_image(self, layer, vm):
+        """Return the name of the layer image of vm source image, built with a
+        new virtual machine if it does not exist or is older than the source
+        image.
+
+        :raises robottelo.vm.VirtualMachineError: if the layer image could not
+            be built.
+        """
+        image_name = layer.get_image_name(vm._source_image)
+        image_path = os.path.join(vm.image_dir, '{0}.img'.format(image_name))
+        key = vm.provisioning_server, image_path
+        with self._lock:
+            image_lock = self._locks[key]
+        # build each layer image once in this process
+        with image_lock:
+            if key in self._images:
+                return image_name
+            source_path = os.path.join(vm.image_dir, '{0}.img'.format(vm._source_image))
+            # the modification time of the used images is updated, to not
+            # remove them with the unused ones
+            result = ssh.command(
+                'test {0} -nt {1} && touch -c {0}'.format(image_path, source_path),
+                hostname=vm.provisioning_server,
+                connection_timeout=30,
+            )
+            if result.return_code != 0:
+                self._build(layer, vm, image_path)
+            self._images.add(key)
+        return image_name
+
+    @staticmethod
+    def _build(layer, vm, image_path):
+        """Boot a virtual machine from vm source image, run the layer steps and
+        move its image to image_path"""
+        # imported here as robottelo.vm uses this module
+        from robottelo.vm import VirtualMachine
+        from robottelo.vm import VirtualMachineError
+
+        logger.info('Building the {0} layer image {1}'.format(layer.name, image_path))
+        builder = VirtualMachine(
+            distro=vm.distro,
+            provisioning_server=vm.provisioning_server,
+            image_dir=vm.image_dir,
+            source_image=vm._source_image,
+            bridge=vm.bridge,
+            network=vm.network,
+        )
+        builder.create()
+        try:
+            result = builder.run_batch(layer.steps, timeout=IMAGE_LAYER_BUILD_TIMEOUT)
+            if result.return_code != 0:
+                raise VirtualMachineError(
+                    'Failed to build the {0} layer image: {1}'.format(layer.name, result.stderr)
+                )
+            builder.run_batch(IMAGE_LAYER_CLEANUP_COMMANDS, stop_on_error=False)
+            builder.close_ssh_client()
+            builder_path = os.path.join(vm.image_dir, '{0}.img'.format(builder.target_image))
+            # replace the image atomically, it is missing or older than the
+            # source image, or another process built the same one meanwhile
+            result = ssh.command(
+                'virsh shutdown {0}; '
+                'timeout {1} sh -c \'until virsh domstate {0} | grep -q "shut off"; '
+                'do sleep 1; done\'; '
+                'virsh destroy {0}; virsh undefine {0} && '
+                'mv -f {2} {3}'.format(
+                    builder.target_image, IMAGE_LAYER_SHUTDOWN_TIMEOUT, builder_path, image_path
+                ),
+                hostname=vm.provisioning_server,
+                timeout=IMAGE_LAYER_SHUTDOWN_TIMEOUT + 60,
+                connection_timeout=30,
+            )
+            if result.return_code != 0:
+                raise VirtualMachineError(
+                    'Failed to save the {0} layer image: {1}'.format(layer.name, result.stderr)
+                )
+        except Exception:
+            builder.destroy()
+            raise
+        ImageLayerCache._prune(layer, vm)
+
+    @staticmethod
+    def _prune(layer, vm):
+        """Remove the layer images of vm source image and of the layer name
+        that were not used for ``IMAGE_LAYER_MAX_AGE`` days"""
+        result = ssh.command(
+            'find {0} -maxdepth 1 -name \'{1}-{2}-*.img\' -mtime +{3} -print -delete'.format(
+                vm.image_dir, vm._source_image, layer.name, IMAGE_LAYER_MAX_AGE
+            ),
+            hostname=vm.provisioning_server,
+            connection_timeout=30,
+        )
+        if result.return_code != 0:
+            logger.warning('Failed to remove the unused layer images: {0}'.format(result.stderr))
+        elif result.stdout:
+            logger.info('Removed the unused layer images: {0}'.format(result.stdout))
+
+
+image_layer_cache = ImageLayerCache()
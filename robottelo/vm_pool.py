@@ -0,0 +1,248 @@
+"""Warm pool of pre-provisioned client virtual machines
+
+Provisioning a client with :class:`robottelo.vm.VirtualMachine` clones the
+base image, boots it and waits for its IP and SSH, which takes minutes. The
+pool keeps booted virtual machines by distro on the provisioning server, with
+a libvirt snapshot of their clean booted state, and lease them to the tests::
+
+    with vm_pool.lease(DISTRO_RHEL7) as vm:
+        vm.install_katello_ca()
+        ...
+
+When returned, the virtual machine is unregistered if needed and reverted to
+its clean snapshot with ``virsh snapshot-revert``, then leased again. The pool
+is refilled in the background up to its size by distro, and the number of
+virtual machines of the pool by provisioning server is limited.
+"""
+import logging
+import threading
+import time
+from collections import defaultdict
+from contextlib import contextmanager
+
+from robottelo import ssh
+from robottelo.config import settings
+from robottelo.vm import VirtualMachine
+from robottelo.vm import VirtualMachineError
+
+logger = logging.getLogger(__name__)
+
+# the name of the libvirt snapshot of the clean booted virtual machines
+CLEAN_SNAPSHOT_NAME = 'robottelo-clean'
+# the number of booted virtual machines kept by distro
+VM_POOL_SIZE = 2
+# the max number of virtual machines of the pool by provisioning server
+VM_POOL_MAX_VMS = 10
+# the max time in seconds to wait for a virtual machine to lease
+VM_POOL_LEASE_TIMEOUT = 1800
+
+
+class VirtualMachinePool(object):
+    """Pool of booted virtual machines leased to the tests
+
+    :param int size: the number of booted virtual machines kept by distro and
+        provisioning server
+    :param int max_vms: the max number of virtual machines of the pool by
+        provisioning server, idle, leased or being provisioned
+    :param int lease_timeout: the max time in seconds to wait for a virtual
+        machine to lease
+    :param vm_class: the class of the virtual machines to provision
+    """
+
+    def __init__(self, size=None, max_vms=None, lease_timeout=None, vm_class=None):
+        if size is None:
+            size = settings.clients.vm_pool_size or VM_POOL_SIZE
+        if max_vms is None:
+            max_vms = settings.clients.vm_pool_max_vms or VM_POOL_MAX_VMS
+        if lease_timeout is None:
+            lease_timeout = VM_POOL_LEASE_TIMEOUT
+        self.size = size
+        self.max_vms = max_vms
+        self.lease_timeout = lease_timeout
+        self.vm_class = vm_class or VirtualMachine
+        self._condition = threading.Condition()
+        # the clean booted virtual machines, {(provisioning_server, distro): [vm]}
+        self._idle = defaultdict(list)
+        # the virtual machines being provisioned, {(provisioning_server, distro): count}
+        self._filling = defaultdict(int)
+        # the virtual machines of the pool, {provisioning_server: count}
+        self._counts = defaultdict(int)
+        self._threads = []
+        self._closed = False
+
+    @staticmethod
+    def _get_key(distro, provisioning_server):
+        return provisioning_server or settings.clients.provisioning_server, distro
+
+    def _start(self, target, *args):
+        """Run target in a background thread"""
+        thread = threading.Thread(target=target, args=args, daemon=True)
+        self._threads = [thread for thread in self._threads if thread.is_alive()]
+        self._threads.append(thread)
+        thread.start()
+
+    def _snapshot_command(self, vm, command):
+        """Run a ``virsh snapshot-*`` command of vm on its provisioning server"""
+        result = ssh.command(
+            'virsh {0} {1} {2}'.format(command, vm.target_image, CLEAN_SNAPSHOT_NAME),
+            hostname=vm.provisioning_server,
+            connection_timeout=30,
+        )
+        if result.return_code != 0:
+            raise VirtualMachineError(
+                'Failed to run virsh {0} of {1}: {2}'.format(
+                    command, vm.target_image, result.stderr
+                )
+            )
+
+    def _provision(self, key):
+        """Create a virtual machine and its clean snapshot"""
+        provisioning_server, distro = key
+        vm = self.vm_class(distro=distro, provisioning_server=provisioning_server)
+        vm.create()
+        try:
+            self._snapshot_command(vm, 'snapshot-create-as')
+        except VirtualMachineError:
+            vm.destroy()
+            raise
+        return vm
+
+    def _release_slot(self, provisioning_server):
+        with self._condition:
+            self._counts[provisioning_server] -= 1
+            self._condition.notify_all()
+
+    def _fill_one(self, key):
+        """Provision a virtual machine and add it to the idle ones"""
+        try:
+            vm = self._provision(key)
+        except Exception as err:
+            logger.error('Failed to provision a {0} pool virtual machine: {1}'.format(key, err))
+            vm = None
+        with self._condition:
+            self._filling[key] -= 1
+            if vm is not None:
+                self._idle[key].append(vm)
+            else:
+                self._counts[key[0]] -= 1
+            self._condition.notify_all()
+
+    def _refill(self, key):
+        """Start the provisioning of the missing idle virtual machines of key,
+        within the provisioning server limit. Must be called holding the
+        condition lock.
+        """
+        if self._closed:
+            return
+        provisioning_server = key[0]
+        missing = self.size - len(self._idle[key]) - self._filling[key]
+        while missing > 0 and self._counts[provisioning_server] < self.max_vms:
+            self._counts[provisioning_server] += 1
+            self._filling[key] += 1
+            missing -= 1
+            self._start(self._fill_one, key)
+
+    def fill(self, distro, provisioning_server=None, wait=False):
+        """Start the provisioning of the pool virtual machines of distro
+
+        :param bool wait: whether to wait for the provisioning end
+        """
+        key = self._get_key(distro, provisioning_server)
+        with self._condition:
+            self._refill(key)
+            if wait:
+                self._condition.wait_for(lambda: not self._filling[key])
+
+    def _acquire(self, key):
+        """Return an idle virtual machine of key, or provision one if the
+        provisioning server limit allows it, else wait one to be returned.
+        """
+        provisioning_server = key[0]
+        deadline = time.time() + self.lease_timeout
+        with self._condition:
+            while not self._idle[key]:
+                if self._counts[provisioning_server] < self.max_vms and not self._filling[key]:
+                    self._counts[provisioning_server] += 1
+                    self._refill(key)
+                    break
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    raise VirtualMachineError(
+                        'Timeout while waiting a {0} virtual machine of the pool'.format(key)
+                    )
+                self._condition.wait(remaining)
+            else:
+                vm = self._idle[key].pop()
+                self._refill(key)
+                return vm
+        # provision it now as no virtual machine was available
+        try:
+            return self._provision(key)
+        except Exception:
+            self._release_slot(provisioning_server)
+            raise
+
+    def _recycle(self, vm, key):
+        """Revert vm to its clean snapshot and add it to the idle ones, or
+        destroy it if it could not be reverted"""
+        try:
+            if vm.subscribed:
+                vm.unregister()
+            self._snapshot_command(vm, 'snapshot-revert --running')
+            # the reverted virtual machine lost the connections opened since
+            # its snapshot
+            vm.close_ssh_client()
+            vm._subscribed = False
+        except Exception as err:
+            logger.error('Failed to revert the virtual machine {0}: {1}'.format(vm.hostname, err))
+            self._discard(vm, key)
+            return
+        with self._condition:
+            if not self._closed:
+                self._idle[key].append(vm)
+                self._condition.notify_all()
+                return
+        self._discard(vm, key)
+
+    def _discard(self, vm, key):
+        """Destroy vm and release its provisioning server slot"""
+        try:
+            vm.destroy()
+        finally:
+            with self._condition:
+                self._counts[key[0]] -= 1
+                self._refill(key)
+                self._condition.notify_all()
+
+    @contextmanager
+    def lease(self, distro, provisioning_server=None):
+        """Context manager of a clean booted virtual machine of distro, reverted
+        in the background when returned.
+
+        :raises robottelo.vm.VirtualMachineError: if no virtual machine could
+            be provisioned or returned before the lease timeout.
+        """
+        key = self._get_key(distro, provisioning_server)
+        vm = self._acquire(key)
+        try:
+            yield vm
+        finally:
+            self._start(self._recycle, vm, key)
+
+    def close(self):
+        """Wait for the background provisioning and reverts, then destroy the
+        idle virtual machines"""
+        with self._condition:
+            self._closed = True
+        for thread in self._threads:
+            thread.join()
+        with self._condition:
+            idle = [(vm, key) for key, vms in self._idle.items() for vm in vms]
+            self._idle.clear()
+        for vm, key in idle:
+            try:
+                self._discard(vm, key)
+            except Exception as err:
+                logger.error(
+                    'Failed to destroy the virtual machine {0}: {1}'.format(vm.hostname, err)
+                )
@@ -0,0 +1,192 @@
+"""Background teardown of the virtual machines
+
+Destroying a virtual machine stops it, undefines it and removes its image on
+its libvirt host. With ``destroy(async_=True)`` the virtual machine is queued
+to the :data:`teardown_service`, which runs all these steps in one SSH command
+on a background worker, so the tests do not wait for them::
+
+    with VirtualMachine() as vm:
+        ...
+    # the virtual machine is destroyed in the background
+
+A failed teardown is retried, then reported as leaked. The queue is flushed at
+the end of the test session, or at the process exit. Each process saves its
+teardown results in the results directory of the session, and the results of
+all the processes are merged in the leak report, see :func:`load_results`.
+"""
+import atexit
+import glob
+import json
+import logging
+import os
+import queue
+import threading
+import time
+from collections import namedtuple
+
+from robottelo import ssh
+
+logger = logging.getLogger(__name__)
+
+# the number of background teardown workers
+TEARDOWN_WORKERS = 4
+# the number of teardown attempts of a virtual machine
+TEARDOWN_RETRIES = 3
+# the time in seconds to wait between two teardown attempts
+TEARDOWN_RETRY_DELAY = 10
+# the environment variable of the session teardown results directory, shared
+# with the xdist workers
+TEARDOWN_RESULTS_DIR_ENV = 'ROBOTTELO_VM_TEARDOWN_DIR'
+TEARDOWN_RESULTS_FILE_EXT = 'json'
+
+TeardownJob = namedtuple('TeardownJob', ['hostname', 'domain', 'image_path', 'connection_timeout'])
+
+
+def teardown_command(domain, image_path):
+    """Return the command destroying the domain and its image, that fails if
+    the domain is still defined or the image still exists"""
+    return (
+        'virsh destroy {0}; virsh undefine {0}; rm -f {1}; '
+        '! virsh dominfo {0} > /dev/null 2>&1 && test ! -e {1}'.format(domain, image_path)
+    )
+
+
+class TeardownService(object):
+    """Queue of virtual machines destroyed by background workers
+
+    :param int workers: the number of background workers
+    :param int retries: the number of teardown attempts of a virtual machine
+    :param int retry_delay: the time in seconds to wait between two attempts
+    """
+
+    def __init__(self, workers=None, retries=None, retry_delay=None):
+        if workers is None:
+            workers = TEARDOWN_WORKERS
+        if retries is None:
+            retries = TEARDOWN_RETRIES
+        if retry_delay is None:
+            retry_delay = TEARDOWN_RETRY_DELAY
+        self.workers = workers
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self._queue = queue.Queue()
+        self._threads = []
+        self._lock = threading.Lock()
+        # the jobs that failed all their attempts, [(job, error)]
+        self.leaks = []
+        self.destroyed_count = 0
+
+    def _start_workers(self):
+        with self._lock:
+            if self._threads:
+                return
+            for _ in range(self.workers):
+                thread = threading.Thread(target=self._work, daemon=True)
+                thread.start()
+                self._threads.append(thread)
+            # do not leave virtual machines behind when used outside pytest
+            atexit.register(self.flush)
+
+    def _work(self):
+        while True:
+            job = self._queue.get()
+            try:
+                self.teardown(job)
+            except Exception as err:
+                logger.exception(f'Unexpected error while destroying {job.domain}: {err}')
+            finally:
+                self._queue.task_done()
+
+    def submit(self, hostname, domain, image_path, connection_timeout=None):
+        """Queue the teardown of domain and its image_path on hostname"""
+        self._start_workers()
+        self._queue.put(TeardownJob(hostname, domain, image_path, connection_timeout))
+        logger.info(f'Queued the teardown of {domain} on {hostname}')
+
+    def teardown(self, job):
+        """Destroy the domain and the image of job, retrying on failure
+
+        :return: whether the domain and its image were removed
+        """
+        for attempt in range(1, self.retries + 1):
+            try:
+                result = ssh.command(
+                    teardown_command(job.domain, job.image_path),
+                    hostname=job.hostname,
+                    connection_timeout=job.connection_timeout,
+                )
+            except Exception as err:
+                error = str(err)
+            else:
+                if result.return_code == 0:
+                    with self._lock:
+                        self.destroyed_count += 1
+                    return True
+                error = result.stderr
+            logger.warning(
+                f'Failed to destroy {job.domain} on {job.hostname}, '
+                f'attempt {attempt}/{self.retries}: {error}'
+            )
+            if attempt < self.retries:
+                time.sleep(self.retry_delay)
+        logger.error(f'Leaked {job.domain} and its image {job.image_path} on {job.hostname}')
+        with self._lock:
+            self.leaks.append((job, error))
+        return False
+
+    def flush(self):
+        """Wait for all the queued teardowns to end"""
+        self._queue.join()
+
+    def leak_report(self):
+        """Return the lines of the report of the leaked virtual machines"""
+        return leak_report(self.destroyed_count, self.leaks)
+
+    def save_results(self, results_dir):
+        """Write the teardown results of the current process in results_dir"""
+        worker = os.environ.get('PYTEST_XDIST_WORKER', 'master')
+        file_path = os.path.join(
+            results_dir, '{0}-{1}.{2}'.format(worker, os.getpid(), TEARDOWN_RESULTS_FILE_EXT)
+        )
+        with self._lock:
+            results = dict(
+                destroyed_count=self.destroyed_count,
+                leaks=[dict(job._asdict(), error=error) for job, error in self.leaks],
+            )
+        with open(file_path, 'w') as handler:
+            json.dump(results, handler)
+
+
+def load_results(results_dir):
+    """Return the teardown results of all the processes in results_dir
+
+    :return: the destroyed virtual machines count, and the list of the leaked
+        virtual machines jobs with their error
+    """
+    destroyed_count = 0
+    leaks = []
+    for file_path in sorted(
+        glob.glob(os.path.join(results_dir, '*.{}'.format(TEARDOWN_RESULTS_FILE_EXT)))
+    ):
+        with open(file_path) as handler:
+            results = json.load(handler)
+        destroyed_count += results['destroyed_count']
+        for leak in results['leaks']:
+            error = leak.pop('error')
+            leaks.append((TeardownJob(**leak), error))
+    return destroyed_count, leaks
+
+
+def leak_report(destroyed_count, leaks):
+    """Return the lines of the report of the leaked virtual machines"""
+    lines = [
+        '{0} virtual machines destroyed in the background, {1} leaked'.format(
+            destroyed_count, len(leaks)
+        )
+    ]
+    for job, error in leaks:
+        lines.append(f'{job.hostname}: {job.domain} {job.image_path} - {error}')
+    return lines
+
+
+teardown_service = TeardownService()
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""Modules import time report
+
+Imports the given modules in a new interpreter with ``python -X importtime``
+and reports their import time and the top modules by self import time.
+"""
+from __future__ import print_function
+
+import argparse
+
+from robottelo.utils.import_time import heavy_imports
+from robottelo.utils.import_time import import_time_report
+from robottelo.utils.import_time import module_import_time
+from robottelo.utils.import_time import profile_imports
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument(
+    'modules',
+    nargs='*',
+    default=['robottelo.config', 'robottelo.cli.factory', 'pytest_fixtures.api_fixtures'],
+    help='the dotted names of the modules to import',
+)
+parser.add_argument('--top', type=int, default=20, help='the number of modules to report')
+args = parser.parse_args()
+
+for module in args.modules:
+    entries = profile_imports(module)
+    print('{0}: {1:.3f}s'.format(module, module_import_time(entries, module)))
+    heavy = heavy_imports(entries)
+    if heavy:
+        print('heavy packages imported: {}'.format(', '.join(heavy)))
+    for line in import_time_report(entries, top=args.top):
+        print(line)
+    print()
@@ -0,0 +1,33 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""Shared functions SQLite storage purge
+
+Deletes the expired values of the shared functions SQLite storage, or all the
+stored values when called with ``--all``.
+"""
+from __future__ import print_function
+
+import argparse
+
+from robottelo.config import settings
+from robottelo.decorators import setting_is_set
+from robottelo.decorators.func_shared.sqlite_storage import SQLiteStorageHandler
+
+parser = argparse.ArgumentParser(description=__doc__)
+parser.add_argument(
+    '--db-path',
+    default=None,
+    help='the SQLite database file path, by default the shared_function sqlite_db_path setting',
+)
+parser.add_argument(
+    '--all', action='store_true', help='delete all the values and not only expired ones'
+)
+args = parser.parse_args()
+
+db_path = args.db_path
+if db_path is None and setting_is_set('shared_function'):
+    db_path = settings.shared_function.sqlite_db_path
+
+storage = SQLiteStorageHandler(db_path=db_path)
+deleted = storage.purge(expired_only=not args.all)
+print('{0} shared function values deleted from {1}'.format(deleted, storage.db_path))
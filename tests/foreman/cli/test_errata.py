@@ -47,7 +47,6 @@ from robottelo.cli.org import Org
 from robottelo.cli.repository import Repository
 from robottelo.cli.repository_set import RepositorySet
 from robottelo.cli.subscription import Subscription
-from robottelo.cli.task import Task
 from robottelo.cli.user import User
 from robottelo.constants import DISTRO_RHEL7
 from robottelo.constants import FAKE_0_ERRATA_ID
@@ -77,6 +76,7 @@ from robottelo.decorators import skip_if_not_set
 from robottelo.decorators import tier3
 from robottelo.decorators import upgrade
 from robottelo.test import CLITestCase
+from robottelo.utils.task_waiter import wait_for_cli_tasks
 from robottelo.vm import VirtualMachine
 
 ERRATUM_MAX_IDS_INFO = 10
@@ -204,7 +204,7 @@ class HostCollectionErrataInstallTestCase(CLITestCase):
                 'errata': [self.CUSTOM_ERRATA_ID],
             }
         )
-        Task.progress({'id': install_task[0]['id']})
+        wait_for_cli_tasks([install_task[0]['id']])
         for virtual_machine in self.virtual_machines:
             self.assertTrue(self._is_errata_package_installed(virtual_machine))
 
@@ -232,7 +232,7 @@ class HostCollectionErrataInstallTestCase(CLITestCase):
                 'errata': [self.CUSTOM_ERRATA_ID],
             }
         )
-        Task.progress({'id': install_task[0]['id']})
+        wait_for_cli_tasks([install_task[0]['id']])
         for virtual_machine in self.virtual_machines:
             self.assertTrue(self._is_errata_package_installed(virtual_machine))
 
@@ -260,7 +260,7 @@ class HostCollectionErrataInstallTestCase(CLITestCase):
                 'errata': [self.CUSTOM_ERRATA_ID],
             }
         )
-        Task.progress({'id': install_task[0]['id']})
+        wait_for_cli_tasks([install_task[0]['id']])
         for virtual_machine in self.virtual_machines:
             self.assertTrue(self._is_errata_package_installed(virtual_machine))
 
@@ -288,7 +288,7 @@ class HostCollectionErrataInstallTestCase(CLITestCase):
                 'errata': [self.CUSTOM_ERRATA_ID],
             }
         )
-        Task.progress({'id': install_task[0]['id']})
+        wait_for_cli_tasks([install_task[0]['id']])
         for virtual_machine in self.virtual_machines:
             self.assertTrue(self._is_errata_package_installed(virtual_machine))
 
@@ -316,7 +316,7 @@ class HostCollectionErrataInstallTestCase(CLITestCase):
                 'errata': [self.CUSTOM_ERRATA_ID],
             }
         )
-        Task.progress({'id': install_task[0]['id']})
+        wait_for_cli_tasks([install_task[0]['id']])
         for virtual_machine in self.virtual_machines:
             self.assertTrue(self._is_errata_package_installed(virtual_machine))
 
@@ -344,7 +344,7 @@ class HostCollectionErrataInstallTestCase(CLITestCase):
                 'errata': [self.CUSTOM_ERRATA_ID],
             }
         )
-        Task.progress({'id': install_task[0]['id']})
+        wait_for_cli_tasks([install_task[0]['id']])
         for virtual_machine in self.virtual_machines:
             self.assertTrue(self._is_errata_package_installed(virtual_machine))
 
@@ -529,7 +529,7 @@ class HostCollectionErrataInstallTestCase(CLITestCase):
                 'errata': [self.CUSTOM_ERRATA_ID],
             }
         )
-        Task.progress({'id': install_task[0]['id']})
+        wait_for_cli_tasks([install_task[0]['id']])
         # Assert first host does not have any FAKE_1_CUSTOM_PACKAGE_NAME packages
         result = self.virtual_machines[0].run(f'rpm -q {FAKE_1_CUSTOM_PACKAGE_NAME}')
         assert result.return_code == 1, "Unwanted custom package found."
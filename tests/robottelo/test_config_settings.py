@@ -1,12 +1,14 @@
 """Tests for module ``robottelo.config.settings``."""
+import os
 from unittest import mock
 
 import pytest
 
+from pytest_plugins import settings_snapshot
 from robottelo.config.base import ImproperlyConfigured
 from robottelo.config.base import INIReader
 from robottelo.config.base import Settings
-
+from robottelo.config.base import SETTINGS_SNAPSHOT_DIR_ENV
 
 builtin_open = 'builtins.open'
 
@@ -55,6 +57,79 @@ class TestSettings:
             assert settings.server.hostname == 'example.com'
             assert settings.server.ssh_password == '1234'
 
+    @mock.patch(builtin_open, new_callable=lambda: get_lazy_ini)
+    def test_configure_features_on_first_access(self, mock_open):
+        with mock.patch('os.path.isfile', return_value=True):
+            settings = Settings()
+            settings.configure()
+            assert settings.configured
+            # the features are read and validated on first access
+            assert 'bugzilla' not in settings._loaded_features
+            assert settings.bugzilla.api_key == '1234'
+            assert 'bugzilla' in settings._loaded_features
+            with pytest.raises(ImproperlyConfigured):
+                settings.ldap
+            # a feature without section is not read
+            assert settings.gce.project_id is None
+            assert 'ldap' in settings.all_features
+
+    @mock.patch.object(Settings, '_configure_entities')
+    @mock.patch.object(Settings, '_configure_third_party_logging')
+    @mock.patch.object(Settings, '_configure_logging')
+    def test_settings_snapshot(
+        self, logging_mock, third_party_mock, entities_mock, tmpdir, monkeypatch
+    ):
+        settings_path = tmpdir.join('robottelo.properties')
+        settings_path.write('\n'.join(SNAPSHOT_INI_LINES))
+        snapshot_dir = tmpdir.mkdir('snapshots')
+        monkeypatch.delenv(SETTINGS_SNAPSHOT_DIR_ENV, raising=False)
+        settings = Settings()
+        settings.configure(str(settings_path))
+        snapshot_path = settings.write_snapshot(str(snapshot_dir))
+        assert os.listdir(str(snapshot_dir)) == [os.path.basename(snapshot_path)]
+
+        # a worker loads the snapshot without parsing the settings file
+        monkeypatch.setenv(SETTINGS_SNAPSHOT_DIR_ENV, str(snapshot_dir))
+        with mock.patch('robottelo.config.base.INIReader', side_effect=AssertionError):
+            settings = Settings()
+            settings.configure(str(settings_path))
+            assert settings.server.hostname == 'example.com'
+            assert settings.bugzilla.api_key == '1234'
+            with pytest.raises(ImproperlyConfigured):
+                settings.ldap
+            assert settings.gce.project_id is None
+
+        # the settings file or the environment changed, the snapshot is stale
+        monkeypatch.setenv('ROBOTTELO_SERVER_HOSTNAME', 'other.example.com')
+        assert settings.get_snapshot_path(str(snapshot_dir)) != snapshot_path
+        monkeypatch.delenv('ROBOTTELO_SERVER_HOSTNAME')
+        settings_path.write('\n'.join(SNAPSHOT_INI_LINES).replace('1234', '5678'))
+        assert settings.get_snapshot_path(str(snapshot_dir)) != snapshot_path
+        settings = Settings()
+        settings.configure(str(settings_path))
+        assert settings.bugzilla.api_key == '5678'
+
+        # the snapshot of a directory writable by the others is not loaded
+        settings.write_snapshot(str(snapshot_dir))
+        assert settings._read_snapshot(str(snapshot_dir)) is not None
+        os.chmod(str(snapshot_dir), 0o777)
+        assert settings._read_snapshot(str(snapshot_dir)) is None
+
+    def test_settings_snapshot_dir(self, monkeypatch):
+        """Assert the controller writes the snapshot to a private directory of
+        the session, removed at the session end"""
+        monkeypatch.delenv(SETTINGS_SNAPSHOT_DIR_ENV, raising=False)
+        config = mock.Mock(spec=['option'])
+        config.option.numprocesses = 2
+        with mock.patch.object(settings_snapshot, 'settings') as settings:
+            settings_snapshot.pytest_configure(config)
+        snapshot_dir = os.environ[SETTINGS_SNAPSHOT_DIR_ENV]
+        settings.write_snapshot.assert_called_once_with(snapshot_dir)
+        assert os.stat(snapshot_dir).st_mode & 0o777 == 0o700
+        settings_snapshot.pytest_unconfigure(config)
+        assert not os.path.exists(snapshot_dir)
+        assert SETTINGS_SNAPSHOT_DIR_ENV not in os.environ
+
 
 class FakeOpen(object):
     def __init__(self, lines, *args, **kwargs):
@@ -118,3 +193,19 @@ def get_valid_ini(path, *args, **kwargs):
         'handlers=default',
     ]
     return FakeOpen(lines)
+
+
+def get_lazy_ini(path, *args, **kwargs):
+    lines = get_valid_ini(path).lines
+    return FakeOpen(list(lines) + ['[bugzilla]', 'api_key=1234', '[ldap]', 'hostname=ldap.com'])
+
+
+SNAPSHOT_INI_LINES = [
+    '[server]',
+    'hostname=example.com',
+    'ssh_password=1234',
+    '[bugzilla]',
+    'api_key=1234',
+    '[ldap]',
+    'hostname=ldap.com',
+]
@@ -1,7 +1,10 @@
+import fcntl
 import multiprocessing
 import os
 import tempfile
+import threading
 import time
+from unittest import mock
 
 import pytest
 
@@ -192,6 +195,60 @@ def simple_function_not_locked():
     return None
 
 
+@func_locker.lock_function(max_holders=2)
+def simple_semaphore_function(index=None):
+    """Return the process id and the time interval of the function run"""
+    start = time.time()
+    time.sleep(0.3)
+    return os.getpid(), start, time.time()
+
+
+@func_locker.lock_function
+def simple_writer_function():
+    """Return the time interval of the function run"""
+    start = time.time()
+    time.sleep(0.3)
+    return start, time.time()
+
+
+def simple_reader_function(index=None):
+    """Return the time interval of the function run, with shared lock of the
+    writer function"""
+    with func_locker.locking_function(simple_writer_function, mode=func_locker.LOCK_MODE_SHARED):
+        start = time.time()
+        time.sleep(0.3)
+        return start, time.time()
+
+
+def simple_writer_lock_holder(hold_time=1):
+    """Hold the exclusive lock of the writer function for hold_time seconds"""
+    with func_locker.locking_function(simple_writer_function):
+        time.sleep(hold_time)
+
+
+def simple_recursive_shared_function():
+    """Try to acquire the exclusive lock when holding the shared one from the
+    same process, an exception should be expected
+    """
+    with func_locker.locking_function(simple_writer_function, mode=func_locker.LOCK_MODE_SHARED):
+        with func_locker.locking_function(simple_writer_function):
+            pass
+    return 'I should not be reached'
+
+
+def _max_overlap(intervals):
+    """Return the max number of intervals running at the same time"""
+    events = sorted(
+        [(start, 1) for start, _ in intervals] + [(end, -1) for _, end in intervals],
+        key=lambda event: (event[0], event[1]),
+    )
+    running = max_running = 0
+    for _, step in events:
+        running += step
+        max_running = max(max_running, running)
+    return max_running
+
+
 class TestFuncLocker:
     @pytest.fixture(scope="function", autouse=True)
     def count_and_pool(self):
@@ -362,10 +419,78 @@ class TestFuncLocker:
         global counter_file
         assert int(counter_file.read()) == sum(indexes)
 
+    def test_semaphore_in_multiprocess(self, count_and_pool):
+        """Ensure that at most max_holders processes run the function at the
+        same time"""
+        results = count_and_pool.map(simple_semaphore_function, range(POOL_SIZE))
+        assert len(results) == POOL_SIZE
+        assert _max_overlap([(start, end) for _, start, end in results]) == 2
+
+    def test_shared_lock_in_multiprocess(self, count_and_pool):
+        """Ensure that the shared lock holders run at the same time, but not
+        with the exclusive lock holder"""
+        writer_result = count_and_pool.apply_async(simple_writer_function)
+        readers_results = count_and_pool.map(simple_reader_function, range(POOL_SIZE - 1))
+        writer_interval = writer_result.get(timeout=10)
+        assert _max_overlap(readers_results) > 1
+        for start, end in readers_results:
+            assert end <= writer_interval[0] or start >= writer_interval[1]
+
+    def test_locking_semaphore_mode(self):
+        """Ensure that locking_function uses the semaphore mode when more than
+        one holder, as lock_function"""
+        with func_locker.locking_function(simple_semaphore_function, max_holders=2) as handler:
+            assert handler.name.endswith('.lock.0')
+
+    def test_lock_timeout(self, count_and_pool):
+        """Ensure that a lock timeout raises and does not leave the lock file
+        open"""
+        holder = count_and_pool.apply_async(simple_writer_lock_holder)
+        time.sleep(0.5)
+        open_files = len(os.listdir('/proc/self/fd'))
+        with pytest.raises(func_locker.FunctionLockerError, match=r'.*timeout.*'):
+            with func_locker.locking_function(simple_writer_function, timeout=0.2):
+                pass
+        assert len(os.listdir('/proc/self/fd')) == open_files
+        holder.get(timeout=5)
+
+    def test_flock_any_blocking_without_timeout(self):
+        """Ensure that a lock without timeout waits in a blocking flock call,
+        not by polling the lock file"""
+        lock_file_path = TmpCountFile().file_name
+        acquired = threading.Event()
+
+        def wait_lock():
+            with func_locker.flock_any([lock_file_path], fcntl.LOCK_EX, None):
+                acquired.set()
+
+        with open(lock_file_path) as holder:
+            fcntl.flock(holder, fcntl.LOCK_EX)
+            with mock.patch.object(func_locker.time, 'sleep') as sleep:
+                waiter = threading.Thread(target=wait_lock)
+                waiter.start()
+                assert not acquired.wait(0.3)
+                fcntl.flock(holder, fcntl.LOCK_UN)
+                waiter.join(5)
+            assert acquired.is_set()
+            sleep.assert_not_called()
+
+    @pytest.mark.parametrize(
+        'mode, max_holders',
+        [('unknown', 1), (func_locker.LOCK_MODE_EXCLUSIVE, 2), (func_locker.LOCK_MODE_SHARED, 0)],
+    )
+    def test_negative_lock_mode(self, mode, max_holders):
+        """Ensure that invalid lock mode and max holders are refused"""
+        with pytest.raises(func_locker.FunctionLockerError):
+            func_locker.lock_function(
+                simple_function_not_locked, mode=mode, max_holders=max_holders
+            )
+
     recursive_functions = [
         simple_recursive_lock_function,
         simple_recursive_locking_function,
         simple_recursive_combined_function,
+        simple_recursive_shared_function,
     ]
 
     @pytest.mark.parametrize(
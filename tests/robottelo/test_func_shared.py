@@ -1,21 +1,38 @@
 # coding: utf-8
 import multiprocessing
 import os
+import tempfile
 import time
+from unittest import mock
 
 from fauxfactory import gen_integer
 from fauxfactory import gen_string
+from unittest2 import skipIf
 from unittest2 import TestCase
 
+from robottelo.decorators.func_locker import FunctionLockerError
+from robottelo.decorators.func_shared import redis_storage
+from robottelo.decorators.func_shared.file_storage import FileStorageHandler
 from robottelo.decorators.func_shared.file_storage import get_temp_dir
 from robottelo.decorators.func_shared.file_storage import TEMP_FUNC_SHARED_DIR
 from robottelo.decorators.func_shared.file_storage import TEMP_ROOT_DIR
+from robottelo.decorators.func_shared.redis_storage import RedisStorageHandler
 from robottelo.decorators.func_shared.shared import _NAMESPACE_SCOPE_KEY_TYPE
 from robottelo.decorators.func_shared.shared import _set_configured
+from robottelo.decorators.func_shared.shared import _SharedFunction
 from robottelo.decorators.func_shared.shared import enable_shared_function
 from robottelo.decorators.func_shared.shared import set_default_scope
 from robottelo.decorators.func_shared.shared import shared
 from robottelo.decorators.func_shared.shared import SharedFunctionException
+from robottelo.decorators.func_shared.sqlite_storage import SQLiteStorageHandler
+
+try:
+    # the redis server and its lua scripting are emulated by fakeredis and lupa
+    import fakeredis
+    import lupa  # noqa: F401
+    import redis
+except ImportError:
+    fakeredis = None
 
 DEFAULT_POOL_SIZE = 8
 SIMPLE_TIMEOUT_VALUE = 3
@@ -520,3 +537,223 @@ class FunctionSharedTestCase(TestCase):
                 suffix=suffix, prefix=prefix, counter=counter_value
             )
             self.assertEqual(inc_string, inc_string_2)
+
+
+def _hold_storage_lock(storage, key, hold_time=2):
+    """Hold the storage key lock and write the key value"""
+    with storage.lock(key):
+        time.sleep(hold_time)
+        storage.set(key, {'pid': os.getpid()})
+
+
+class FileStorageHandlerTestCase(TestCase):
+    """Tests for the file storage handler read cache and atomic writes"""
+
+    def setUp(self):
+        self.root_dir = tempfile.mkdtemp()
+        self.storage = FileStorageHandler(root_dir=self.root_dir)
+        self.key = gen_string('alpha', 10)
+
+    def test_get_not_existing_key(self):
+        """Getting a not existing key return None"""
+        self.assertIsNone(self.storage.get(self.key))
+
+    def test_set_is_atomic(self):
+        """Setting a value leave only the key file in storage directory"""
+        self.storage.set(self.key, {'state': 'READY'})
+        self.assertEqual(os.listdir(self.root_dir), [self.key])
+        self.assertEqual(self.storage.get(self.key), {'state': 'READY'})
+
+    def test_get_cache_invalidated_on_set(self):
+        """The cached value is not returned once the key file is replaced"""
+        self.storage.set(self.key, {'index': 1})
+        self.assertEqual(self.storage.get(self.key), {'index': 1})
+        self.storage.set(self.key, {'index': 2})
+        self.assertEqual(self.storage.get(self.key), {'index': 2})
+
+    def test_get_cache_return_copy(self):
+        """Modifying a returned value do not alter the cached one"""
+        self.storage.set(self.key, {'index': 1})
+        value = self.storage.get(self.key)
+        value['index'] = 100
+        self.assertEqual(self.storage.get(self.key), {'index': 1})
+
+    def test_is_locked(self):
+        """The key is locked only while an other process hold the lock"""
+        self.assertFalse(self.storage.is_locked(self.key))
+        process = multiprocessing.Process(target=_hold_storage_lock, args=(self.storage, self.key))
+        process.start()
+        time.sleep(1)
+        self.assertTrue(self.storage.is_locked(self.key))
+        process.join()
+        self.assertFalse(self.storage.is_locked(self.key))
+
+    def test_watch(self):
+        """The watcher is notified when the key is written"""
+        process = multiprocessing.Process(target=_hold_storage_lock, args=(self.storage, self.key))
+        with self.storage.watch(self.key) as watcher:
+            self.assertFalse(watcher.wait(0.2))
+            process.start()
+            self.assertTrue(watcher.wait(5))
+        process.join()
+
+    def test_watch_not_notified_by_lock_waiters(self):
+        """The processes waiting the lock do not notify the watcher"""
+        processes = [
+            multiprocessing.Process(target=_hold_storage_lock, args=(self.storage, self.key))
+            for _ in range(2)
+        ]
+        for process in processes:
+            process.start()
+        time.sleep(0.5)
+        with self.storage.watch(self.key) as watcher:
+            self.assertFalse(watcher.wait(1))
+        for process in processes:
+            process.join()
+
+    def test_wait_ready_value_timeout(self):
+        """Waiting the result of an other process is bounded by the lock
+        timeout"""
+        storage = FileStorageHandler(root_dir=self.root_dir, lock_timeout=1)
+        shared_function = _SharedFunction(self.key, lambda: None, storage_handler=storage)
+        process = multiprocessing.Process(
+            target=_hold_storage_lock, args=(self.storage, self.key, 4)
+        )
+        process.start()
+        time.sleep(0.5)
+        start = time.time()
+        with self.assertRaises(FunctionLockerError):
+            shared_function._get_ready_value()
+        self.assertLess(time.time() - start, 3)
+        process.join()
+
+
+class SQLiteStorageHandlerTestCase(TestCase):
+    """Tests for the SQLite storage handler"""
+
+    def setUp(self):
+        self.db_path = os.path.join(tempfile.mkdtemp(), 'shared.sqlite')
+        self.storage = SQLiteStorageHandler(db_path=self.db_path, lock_timeout=5)
+        self.key = gen_string('alpha', 10)
+
+    def test_set_get(self):
+        """The stored value is returned"""
+        self.assertIsNone(self.storage.get(self.key))
+        self.storage.set(self.key, {'index': 1})
+        self.assertEqual(self.storage.get(self.key), {'index': 1})
+        self.storage.set(self.key, {'index': 2})
+        self.assertEqual(self.storage.get(self.key), {'index': 2})
+
+    def test_get_expired(self):
+        """The expired value is not returned and is purged"""
+        self.storage.set(self.key, {'index': 1}, timeout=1)
+        self.assertEqual(self.storage.get(self.key), {'index': 1})
+        time.sleep(1.5)
+        self.assertIsNone(self.storage.get(self.key))
+        self.assertEqual(self.storage.purge(), 1)
+
+    def test_lock_state(self):
+        """The row is in PENDING state while the lock is held"""
+        with self.storage.lock(self.key):
+            self.assertEqual(self.storage._get_lock_row(self.key)[:2], ('PENDING', os.getpid()))
+            other_storage = SQLiteStorageHandler(db_path=self.db_path)
+            self.assertFalse(other_storage._try_acquire(self.key))
+        self.assertEqual(self.storage._get_lock_row(self.key)[0], 'FREE')
+        self.assertFalse(self.storage.is_locked(self.key))
+
+    def test_stale_lock(self):
+        """A PENDING row of a dead process do not block the lock"""
+        process = multiprocessing.Process(target=self.storage._try_acquire, args=(self.key,))
+        process.start()
+        process.join()
+        self.assertEqual(self.storage._get_lock_row(self.key)[:2], ('PENDING', process.pid))
+        with self.storage.lock(self.key):
+            self.assertEqual(self.storage._get_lock_row(self.key)[1], os.getpid())
+
+
+@skipIf(fakeredis is None, 'fakeredis and lupa are required')
+class RedisStorageHandlerTestCase(TestCase):
+    """Tests for the redis storage handler, against a fake redis server"""
+
+    def setUp(self):
+        self.get_connection_pool = redis_storage._get_connection_pool
+        server = fakeredis.FakeServer()
+        connection_class = getattr(fakeredis, 'FakeRedisConnection', fakeredis.FakeConnection)
+
+        def get_connection_pool(*args):
+            return redis.ConnectionPool(connection_class=connection_class, server=server)
+
+        patcher = mock.patch.object(redis_storage, '_get_connection_pool', get_connection_pool)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.storage = RedisStorageHandler(lock_timeout=5)
+        self.other_storage = RedisStorageHandler(lock_timeout=5)
+        self.key = gen_string('alpha', 10)
+
+    def test_connection_pool(self):
+        """The connection pool is created once by process and server"""
+        with mock.patch.dict(redis_storage._connection_pools, clear=True):
+            pool = self.get_connection_pool('localhost', 6379, 0, None, 10)
+            self.assertIs(self.get_connection_pool('localhost', 6379, 0, None, 10), pool)
+            self.assertIsNot(self.get_connection_pool('localhost', 6379, 1, None, 10), pool)
+            self.assertEqual(pool.max_connections, 10)
+
+    def test_lock_ownership(self):
+        """The lock is held by one handler, the value written while holding it
+        is written at release"""
+        with self.storage.lock(self.key):
+            self.assertFalse(self.storage.is_locked(self.key))
+            self.assertTrue(self.other_storage.is_locked(self.key))
+            with self.assertRaises(TimeoutError):
+                with self.other_storage.lock(self.key, timeout=0.1):
+                    pass
+            self.storage.set(self.key, {'index': 1})
+            self.assertEqual(self.storage.get(self.key), {'index': 1})
+            self.assertIsNone(self.other_storage.get(self.key))
+        self.assertFalse(self.other_storage.is_locked(self.key))
+        self.assertEqual(self.other_storage.get(self.key), {'index': 1})
+
+    @mock.patch.object(redis_storage, 'logger')
+    def test_unlock_not_owner(self, logger):
+        """A handler that lost the lock does not release the new owner lock,
+        but still writes its value for the waiters, with a warning"""
+        lock_key = self.storage._get_lock_key(self.key)
+        with self.storage.lock(self.key):
+            self.storage.set(self.key, {'index': 1})
+            # the lock was lost and acquired by an other process
+            self.storage.client.set(lock_key, 'other token')
+        self.assertEqual(self.storage.client.get(lock_key), b'other token')
+        self.assertEqual(self.other_storage.get(self.key), {'index': 1})
+        self.assertEqual(logger.warning.call_count, 1)
+        # the other process released the lock
+        self.storage.client.delete(lock_key)
+        with self.storage.lock(self.key):
+            self.storage.set(self.key, {'index': 2})
+            # the lock key was deleted
+            self.storage.client.delete(lock_key)
+        self.assertEqual(self.other_storage.get(self.key), {'index': 2})
+        self.assertEqual(logger.warning.call_count, 2)
+
+    def test_compressed_round_trip(self):
+        """The large values are stored compressed and decoded back"""
+        storage = RedisStorageHandler(compress_threshold=100)
+        value = {'data': 'x' * 1000}
+        storage.set(self.key, value)
+        self.assertTrue(storage.client.get(self.key).startswith(b'zlib:'))
+        self.assertEqual(storage.get(self.key), value)
+        # the other handlers read the compressed values
+        self.assertEqual(self.other_storage.get(self.key), value)
+        storage.set(self.key, {'index': 1})
+        self.assertEqual(storage.client.get(self.key), b'{"index":1}')
+
+    def test_expire(self):
+        """The values expire after their timeout, written with or without
+        holding the lock"""
+        self.storage.set(self.key, {'index': 1})
+        self.assertEqual(self.storage.client.ttl(self.key), -1)
+        self.storage.set(self.key, {'index': 1}, timeout=100)
+        self.assertTrue(0 < self.storage.client.ttl(self.key) <= 100)
+        with self.storage.lock(self.key):
+            self.storage.set(self.key, {'index': 2}, timeout=50)
+        self.assertTrue(0 < self.storage.client.ttl(self.key) <= 50)
+        self.assertEqual(self.storage.get(self.key), {'index': 2})
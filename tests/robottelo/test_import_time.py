@@ -0,0 +1,51 @@
+"""Tests for module ``robottelo.utils.import_time``."""
+import pytest
+
+from robottelo.utils.import_time import heavy_imports
+from robottelo.utils.import_time import HEAVY_MODULES
+from robottelo.utils.import_time import import_time_report
+from robottelo.utils.import_time import module_import_time
+from robottelo.utils.import_time import parse_importtime
+from robottelo.utils.import_time import profile_imports
+from robottelo.utils.import_time import SSH_MODULES
+
+IMPORT_TIME_OUTPUT = '''import time: self [us] | cumulative | imported package
+import time:       312 |        312 | _io
+import time:       150 |        150 |     wrapanapi.systems
+import time:       200 |        350 |   wrapanapi
+import time:      1024 |       1686 | robottelo.config
+Traceback (most recent call last):
+'''
+
+# The modules imported by every test run, with the packages they must not
+# import in a new interpreter
+FORBIDDEN_IMPORTS = {
+    'robottelo.config': HEAVY_MODULES + SSH_MODULES,
+    'robottelo.cli.factory': HEAVY_MODULES,
+}
+
+
+def test_parse_importtime():
+    """Assert the import time report lines are parsed"""
+    entries = parse_importtime(IMPORT_TIME_OUTPUT)
+    assert [entry.module for entry in entries] == [
+        '_io',
+        'wrapanapi.systems',
+        'wrapanapi',
+        'robottelo.config',
+    ]
+    assert [entry.level for entry in entries] == [0, 2, 1, 0]
+    assert entries[3].self_us == 1024
+    assert module_import_time(entries, 'robottelo.config') == pytest.approx(0.001686)
+    assert heavy_imports(entries) == ['wrapanapi']
+    report = import_time_report(entries, top=2)
+    assert len(report) == 3
+    assert report[1].endswith('robottelo.config')
+
+
+@pytest.mark.parametrize('module', sorted(FORBIDDEN_IMPORTS))
+def test_forbidden_imports(module):
+    """Assert the modules imported by every test run do not import the
+    cloud SDKs and UI packages, nor the SSH packages for the settings"""
+    entries = profile_imports(module)
+    assert heavy_imports(entries, FORBIDDEN_IMPORTS[module]) == []
@@ -1,17 +1,28 @@
+import json
 import os
 import subprocess
 import sys
+import threading
 from collections import defaultdict
+from http.server import BaseHTTPRequestHandler
+from http.server import HTTPServer
+from urllib.parse import parse_qs
+from urllib.parse import urlparse
 
 import pytest
 
+from pytest_plugins.issue_handlers import DEFAULT_BZ_CACHE_DB
 from pytest_plugins.issue_handlers import DEFAULT_BZ_CACHE_FILE
+from robottelo.config import settings
 from robottelo.constants import CLOSED_STATUSES
 from robottelo.constants import OPEN_STATUSES
 from robottelo.constants import WONTFIX_RESOLUTIONS
 from robottelo.utils.issue_handlers import add_workaround
+from robottelo.utils.issue_handlers import bugzilla
 from robottelo.utils.issue_handlers import is_open
 from robottelo.utils.issue_handlers import should_deselect
+from robottelo.utils.issue_handlers.bugzilla_cache import BugzillaCache
+from robottelo.utils.version import VersionEncoder
 
 
 class TestBugzillaIssueHandler:
@@ -358,8 +369,9 @@ class TestBugzillaIssueHandler:
 
         @request.addfinalizer
         def _remove_file():
-            if os.path.exists(DEFAULT_BZ_CACHE_FILE):
-                os.remove(DEFAULT_BZ_CACHE_FILE)
+            for file_path in (DEFAULT_BZ_CACHE_FILE, DEFAULT_BZ_CACHE_DB):
+                if os.path.exists(file_path):
+                    os.remove(file_path)
 
         try:
 
@@ -396,6 +408,140 @@ class TestBugzillaIssueHandler:
             )
         assert os.path.exists(DEFAULT_BZ_CACHE_FILE)
 
+    def test_bz_collect_data_breadth_first(self, bugzilla_server, monkeypatch):
+        """Assert the dupes and clones of each level are loaded in a single
+        chunked call to Bugzilla REST API"""
+        monkeypatch.setattr(bugzilla, 'BZ_CHUNK_SIZE', 2)
+        bugzilla_server.bugs.update(
+            {
+                '1': _bz_data(1, resolution='DUPLICATE', dupe_of=2),
+                '2': _bz_data(2, resolution='DUPLICATE', dupe_of=3),
+                '3': _bz_data(3, status='NEW'),
+                '4': _bz_data(4, status='NEW', clone_ids=[5, 6]),
+                '5': _bz_data(5, status='NEW', cf_clone_of=4, clone_ids=[7]),
+                '6': _bz_data(6, status='NEW', resolution='DUPLICATE', dupe_of=8),
+                '7': _bz_data(7, status='NEW'),
+                '8': _bz_data(8, status='NEW'),
+            }
+        )
+        collected_data = defaultdict(lambda: {"data": {}, "used_in": []})
+        collected_data['BZ:1']['used_in'].append({'usage': 'skip_if_open'})
+        collected_data['BZ:4']['used_in'].append({'usage': 'skip_if_open'})
+
+        bugzilla.collect_data_bz(collected_data, None)
+
+        # one level per call, in chunks of BZ_CHUNK_SIZE ids
+        assert sorted(bugzilla_server.requests) == [['1', '4'], ['2', '5'], ['3', '7'], ['6']]
+        assert collected_data['BZ:1']['data']['is_open']
+        assert collected_data['BZ:1']['data']['dupe_data']['id'] == 2
+        assert collected_data['BZ:2']['is_dupe']
+        assert collected_data['BZ:3']['is_dupe']
+        assert [clone['id'] for clone in collected_data['BZ:4']['data']['clones']] == [5, 6]
+        assert collected_data['BZ:5']['is_clone']
+        assert collected_data['BZ:7']['is_clone']
+        # the dupes of clones are not followed
+        assert 'BZ:8' not in collected_data
+        # the clones linked both ways are serialized without circular reference
+        dumped = json.loads(json.dumps(collected_data, cls=VersionEncoder))
+        assert [clone['id'] for clone in dumped['BZ:5']['data']['clones']] == [7, 4]
+
+    def test_bz_cache_revalidate_stale(self, bugzilla_server, tmpdir):
+        """Assert only the missing and the stale changed BZs are fetched when
+        using the persistent BZ cache"""
+        bugzilla_server.bugs.update(
+            {
+                '1': _bz_data(1, status='NEW', last_change_time='2020-01-01T00:00:00Z'),
+                '2': _bz_data(2, status='NEW', last_change_time='2020-01-01T00:00:00Z'),
+            }
+        )
+        cache = BugzillaCache(str(tmpdir.join('bz_cache.sqlite')))
+        assert [bz['id'] for bz in bugzilla.get_data_bz(['1', '2'], cache)] == [1, 2]
+        assert bugzilla_server.requests == [['1', '2']]
+
+        # fresh BZs are taken from cache, missing ones fetched
+        bugzilla_server.bugs['3'] = _bz_data(3, status='NEW')
+        bugzilla.CACHED_RESPONSES.clear()
+        assert [bz['id'] for bz in bugzilla.get_data_bz(['1', '2', '3'], cache)] == [1, 2, 3]
+        assert bugzilla_server.requests[1:] == [['3']]
+
+        # stale BZs are revalidated, only the changed ones are fetched
+        bugzilla_server.bugs['2'] = _bz_data(
+            2, status='CLOSED', last_change_time='2020-02-01T00:00:00Z'
+        )
+        cache.ttl = 0
+        bugzilla.CACHED_RESPONSES.clear()
+        data = {bz['id']: bz for bz in bugzilla.get_data_bz(['1', '2'], cache)}
+        assert bugzilla_server.requests[2:] == [['1', '2'], ['2']]
+        assert bugzilla_server.include_fields[2] == ['id', 'last_change_time']
+        assert data[1]['status'] == 'NEW'
+        assert data[2]['status'] == 'CLOSED'
+        cache.close()
+
+
+def _bz_data(
+    number,
+    status='CLOSED',
+    resolution='',
+    dupe_of=None,
+    clone_ids=(),
+    cf_clone_of='',
+    last_change_time='2020-01-01T00:00:00Z',
+):
+    return {
+        "id": number,
+        "status": status,
+        "resolution": resolution,
+        "dupe_of": dupe_of,
+        "clone_ids": list(clone_ids),
+        "cf_clone_of": cf_clone_of,
+        "last_change_time": last_change_time,
+        "target_milestone": "Unspecified",
+        "flags": [],
+    }
+
+
+@pytest.fixture
+def bugzilla_server(monkeypatch):
+    """Local HTTP stand-in of Bugzilla REST API, serving the bugs of its bugs
+    dict and recording the ids and fields of each request"""
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            url = urlparse(self.path)
+            query = parse_qs(url.query)
+            ids = query['id'][0].split(',')
+            fields = query['include_fields'][0].split(',')
+            server.requests.append(sorted(ids))
+            server.include_fields.append(fields)
+            bugs = [
+                {field: value for field, value in server.bugs[number].items() if field in fields}
+                for number in ids
+                if number in server.bugs
+            ]
+            body = json.dumps({'bugs': bugs}).encode()
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/json')
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    server = HTTPServer(('127.0.0.1', 0), Handler)
+    server.bugs = {}
+    server.requests = []
+    server.include_fields = []
+    thread = threading.Thread(target=server.serve_forever, daemon=True)
+    thread.start()
+    monkeypatch.setattr(settings.bugzilla, 'url', f'http://127.0.0.1:{server.server_port}')
+    monkeypatch.setattr(settings.bugzilla, 'api_key', 'api_key')
+    monkeypatch.setattr(bugzilla, '_session', None)
+    monkeypatch.setattr(bugzilla, 'CACHED_RESPONSES', defaultdict(dict))
+    yield server
+    server.shutdown()
+    server.server_close()
+
 
 def test_add_workaround():
     """Assert helper function adds corrent items to given data"""
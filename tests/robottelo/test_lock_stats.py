@@ -0,0 +1,116 @@
+import os
+import tempfile
+from contextlib import contextmanager
+
+import pytest
+
+from robottelo.decorators import lock_stats
+
+
+@contextmanager
+def _fake_lock():
+    yield 'handler'
+
+
+@pytest.fixture
+def stats_dir(monkeypatch):
+    stats_dir = tempfile.mkdtemp()
+    monkeypatch.setattr(lock_stats, 'get_stats_dir', lambda create=True: stats_dir)
+    lock_stats.enable_lock_stats(True)
+    yield stats_dir
+    lock_stats.enable_lock_stats(False)
+
+
+def test_recorded_lock_disabled(stats_dir):
+    """Nothing is recorded when the lock stats are disabled"""
+    lock_stats.enable_lock_stats(False)
+    with lock_stats.recorded_lock(_fake_lock(), 'lock_function', '/tmp/a.lock') as handler:
+        assert handler == 'handler'
+    assert lock_stats.load_records(stats_dir) == []
+
+
+def test_recorded_lock(stats_dir):
+    """The lock acquisition is recorded with the wait and hold times"""
+    with lock_stats.recorded_lock(_fake_lock(), 'lock_function', '/tmp/a.lock') as handler:
+        assert handler == 'handler'
+    records = lock_stats.load_records(stats_dir)
+    assert len(records) == 1
+    assert records[0]['kind'] == 'lock_function'
+    assert records[0]['lock'] == '/tmp/a.lock'
+    assert records[0]['wait'] >= 0
+    assert records[0]['hold'] >= 0
+
+
+@contextmanager
+def _timed_out_lock():
+    raise TimeoutError('timeout while waiting lock')
+    yield
+
+
+def test_recorded_lock_failed(stats_dir):
+    """A failed lock acquisition is recorded as failed, with its wait time,
+    and its error re-raised"""
+    with pytest.raises(TimeoutError):
+        with lock_stats.recorded_lock(_timed_out_lock(), 'lock_function', '/tmp/a.lock'):
+            pass
+    with lock_stats.recorded_lock(_fake_lock(), 'lock_function', '/tmp/a.lock'):
+        pass
+    records = lock_stats.load_records(stats_dir)
+    assert [record['failed'] for record in records] == [True, False]
+    assert records[0]['wait'] >= 0
+    assert records[0]['hold'] == 0
+    lines = lock_stats.contention_report(records)
+    assert lines[2].split()[3:5] == ['2', '1']
+    assert lines[-2].endswith('/tmp/a.lock (failed)')
+
+
+def test_recorded_lock_release_on_error(stats_dir):
+    """The lock is released when the locked block raises"""
+    released = []
+
+    @contextmanager
+    def lock():
+        try:
+            yield 'handler'
+        finally:
+            released.append(True)
+
+    with pytest.raises(ValueError):
+        with lock_stats.recorded_lock(lock(), 'lock_function', '/tmp/a.lock'):
+            raise ValueError()
+    assert released == [True]
+    assert lock_stats.load_records(stats_dir)[0]['failed'] is False
+
+
+def test_contention_report(stats_dir):
+    """The locks are reported by total wait time, and each worker timeline"""
+    lock_stats.record('lock_function', 'less_contended', 10.0, 1.0, 2.0)
+    lock_stats.record('shared_function', 'most_contended', 11.0, 5.0, 0)
+    lock_stats.record('shared_function', 'most_contended', 12.0, 4.0, 1.0)
+    lines = lock_stats.contention_report(lock_stats.load_records(stats_dir), top=1)
+    assert 'most_contended' in lines[2]
+    assert lines[2].split()[:4] == ['9.00', '5.00', '1.00', '2']
+    assert not any('less_contended' in line for line in lines[:3])
+    assert any(line.startswith('Worker master timeline') for line in lines)
+    assert lines[-1].split()[0] == '2.00'
+
+
+def test_session_stats_dir(monkeypatch, tmp_path):
+    """Each session records in its own directory, exported to the workers, and
+    removes only its own directory"""
+    monkeypatch.setattr(lock_stats.settings, 'tmp_dir', str(tmp_path))
+    monkeypatch.delenv(lock_stats.LOCK_STATS_DIR_ENV, raising=False)
+    assert lock_stats.get_stats_dir(create=False) is None
+    assert lock_stats.load_records() == []
+    other_session_dir = lock_stats.create_stats_dir()
+    lock_stats.record('lock_function', 'other', 10.0, 1.0, 2.0)
+    session_dir = lock_stats.create_stats_dir()
+    assert session_dir != other_session_dir
+    assert os.path.dirname(session_dir) == os.path.dirname(other_session_dir)
+    assert os.environ[lock_stats.LOCK_STATS_DIR_ENV] == session_dir
+    lock_stats.record('lock_function', 'current', 10.0, 1.0, 2.0)
+    assert [rec['lock'] for rec in lock_stats.load_records()] == ['current']
+    lock_stats.remove_stats_dir()
+    assert lock_stats.LOCK_STATS_DIR_ENV not in os.environ
+    assert not os.path.exists(session_dir)
+    assert [rec['lock'] for rec in lock_stats.load_records(other_session_dir)] == ['other']
@@ -0,0 +1,108 @@
+"""Tests for module ``robottelo.utils.metadata_index``."""
+import os
+
+from robottelo.utils import metadata_index
+from robottelo.utils.metadata_index import index_source
+from robottelo.utils.metadata_index import MetadataIndex
+
+TEST_MODULE_SOURCE = '''"""Test module
+
+:CaseComponent: Repositories
+
+:CaseImportance: High
+"""
+import pytest
+
+
+@pytest.fixture
+def repo():
+    if is_open('BZ:111'):
+        pass
+
+
+class TestRepository:
+    """Repository tests
+
+    :CaseImportance: Critical
+    """
+
+    @pytest.mark.tier1
+    def test_positive_create(self):
+        """Create a repository
+
+        :BZ: 123456, 456789
+        """
+        if not is_open('BZ:222'):
+            pass
+
+    def test_positive_update(self):
+        if is_open('BZ:333'):
+            pass
+
+
+def test_positive_delete():
+    pass
+'''
+
+
+def test_index_source():
+    """Assert the docstrings tokens and `is_open` usages are indexed"""
+    index = index_source(TEST_MODULE_SOURCE)
+    assert index['module']['component'] == 'Repositories'
+    assert index['module']['source_component'] == 'Repositories'
+    assert index['module']['importance'] == 'High'
+    assert index['module']['is_open'] == [('BZ', '111'), ('BZ', '333')]
+    assert index['module']['not_is_open'] == [('BZ', '222')]
+    assert index['classes']['TestRepository']['importance'] == 'Critical'
+
+    functions = index['functions']
+    assert sorted(functions) == [
+        'TestRepository.test_positive_create',
+        'TestRepository.test_positive_update',
+        'repo',
+        'test_positive_delete',
+    ]
+    assert functions['repo']['is_open'] == [('BZ', '111')]
+    create = functions['TestRepository.test_positive_create']
+    assert create['bz'] == '123456, 456789'
+    assert create['is_open'] == []
+    assert create['not_is_open'] == [('BZ', '222')]
+    assert functions['TestRepository.test_positive_update']['is_open'] == [('BZ', '333')]
+    assert functions['TestRepository.test_positive_update']['docstring'] is False
+    assert functions['test_positive_delete']['is_open'] == []
+
+
+def test_metadata_index_cache(tmpdir, monkeypatch):
+    """Assert the module index is cached on disk by module, and replaced when
+    the module content or the index version changed"""
+    module_path = tmpdir.join('test_module.py')
+    module_path.write(TEST_MODULE_SOURCE)
+    cache_dir = tmpdir.mkdir('cache')
+
+    index = MetadataIndex(str(cache_dir)).get(str(module_path))
+    assert len(os.listdir(str(cache_dir))) == 1
+
+    # an other run or worker load the cached index without parsing the module
+    def _index_source(source):
+        raise AssertionError('module source should not be parsed')
+
+    monkeypatch.setattr(metadata_index, 'index_source', _index_source)
+    cached_index = MetadataIndex(str(cache_dir)).get(str(module_path))
+    assert cached_index['functions'].keys() == index['functions'].keys()
+    assert cached_index['module']['component'] == 'Repositories'
+
+    # the module content changed, it is indexed again
+    module_path.write(TEST_MODULE_SOURCE + '\n\ndef test_positive_list():\n    pass\n')
+    monkeypatch.undo()
+    new_index = MetadataIndex(str(cache_dir)).get(str(module_path))
+    assert 'test_positive_list' in new_index['functions']
+    assert len(os.listdir(str(cache_dir))) == 1
+
+    # the index format changed, it is indexed again
+    monkeypatch.setattr(metadata_index, 'INDEX_VERSION', metadata_index.INDEX_VERSION + 1)
+    index_source = metadata_index.index_source
+    monkeypatch.setattr(
+        metadata_index, 'index_source', lambda source: dict(index_source(source), reindexed=True)
+    )
+    assert MetadataIndex(str(cache_dir)).get(str(module_path))['reindexed']
+    assert len(os.listdir(str(cache_dir))) == 1
@@ -0,0 +1,132 @@
+"""Tests for :mod:`robottelo.products`."""
+from unittest.mock import patch
+
+import pytest
+
+from robottelo.cli.base import CLIReturnCodeError
+from robottelo.products import RepositoryCollection
+from robottelo.products import RepositorySyncError
+from robottelo.products import YumRepository
+
+
+def get_collection(count):
+    """Return a collection of count created custom repositories"""
+    repos = [YumRepository(url=f'http://example.com/repo{index}') for index in range(count)]
+    for index, repo in enumerate(repos):
+        repo._repo_info = {'id': str(index), 'name': f'repo{index}'}
+    return RepositoryCollection(repositories=repos)
+
+
+def task(task_id, state='stopped', result='success'):
+    return {'id': task_id, 'state': state, 'result': result, 'task-errors': ''}
+
+
+@patch('robottelo.utils.task_waiter.TASK_POLL_MIN_INTERVAL', 0)
+@patch('robottelo.cli.task.Task.list_tasks')
+@patch('robottelo.products.Repository.synchronize')
+def test_synchronize_concurrently(synchronize, list_tasks):
+    """Assert the repositories are synchronized asynchronously, within the
+    concurrency, and their tasks polled together"""
+    synchronize.side_effect = lambda options: [{'id': 'task' + options['id']}]
+    list_tasks.side_effect = [
+        [task('task0', state='running', result='pending'), task('task1')],
+        [task('task0'), task('task2')],
+    ]
+    collection = get_collection(3)
+    durations = collection.synchronize(concurrency=2)
+    assert sorted(durations) == ['repo0', 'repo1', 'repo2']
+    assert [call[0][0] for call in synchronize.call_args_list] == [
+        {'id': '0', 'async': True},
+        {'id': '1', 'async': True},
+        {'id': '2', 'async': True},
+    ]
+    assert list_tasks.call_args_list[0][0][0] == {'search': 'id = task0 or id = task1'}
+    assert list_tasks.call_args_list[1][0][0] == {'search': 'id = task0 or id = task2'}
+
+
+@patch('robottelo.utils.task_waiter.TASK_POLL_MIN_INTERVAL', 0)
+@patch('robottelo.cli.task.Task.list_tasks')
+@patch('robottelo.products.Repository.synchronize')
+def test_synchronize_fail_fast(synchronize, list_tasks):
+    """Assert the synchronization fails as soon as a task fails"""
+    synchronize.side_effect = lambda options: [{'id': 'task' + options['id']}]
+    list_tasks.return_value = [
+        task('task0', state='running', result='pending'),
+        task('task1', result='error'),
+    ]
+    with pytest.raises(RepositorySyncError, match='repo1'):
+        get_collection(2).synchronize()
+    assert list_tasks.call_count == 1
+
+
+@patch('robottelo.utils.task_waiter.TASK_POLL_MIN_INTERVAL', 0)
+@patch('robottelo.cli.task.Task.list_tasks')
+@patch('robottelo.products.Repository.synchronize')
+def test_synchronize_chained_start_error(synchronize, list_tasks):
+    """Assert the synchronization fails when a synchronization started after
+    a finished one fails to start, and the next ones are not started"""
+
+    def start(options):
+        if options['id'] == '3':
+            raise CLIReturnCodeError(1, 'error', 'Failed to synchronize')
+        return [{'id': 'task' + options['id']}]
+
+    synchronize.side_effect = start
+    list_tasks.side_effect = lambda options: [
+        task(query.split(' = ')[1]) for query in options['search'].split(' or ')
+    ]
+    collection = get_collection(6)
+    with pytest.raises(RepositorySyncError, match='repo3'):
+        collection.synchronize(concurrency=2)
+    assert [call[0][0]['id'] for call in synchronize.call_args_list] == ['0', '1', '2', '3']
+
+
+@patch('robottelo.products.get_sat_version', return_value='6.8')
+def test_content_fingerprint(get_sat_version):
+    """Assert the content fingerprint changes with the repositories and the
+    setup options"""
+    fingerprint = get_collection(2).get_content_fingerprint()
+    assert fingerprint == get_collection(2).get_content_fingerprint()
+    assert fingerprint != get_collection(1).get_content_fingerprint()
+    assert fingerprint != get_collection(2).get_content_fingerprint(download_policy='immediate')
+    assert fingerprint != get_collection(2).get_content_fingerprint(rh_subscriptions=['RHEL'])
+    get_sat_version.return_value = '6.9'
+    assert fingerprint != get_collection(2).get_content_fingerprint()
+
+
+@patch('robottelo.products.get_sat_version', return_value='6.8')
+@patch('robottelo.products.ActivationKey.info')
+@patch('robottelo.products.ContentView.info')
+@patch('robottelo.products.Org.info')
+@patch('robottelo.products._setup_shared_content')
+def test_setup_shared_content(setup_shared_content, org_info, *_):
+    """Assert the shared content is used after checking it exists, and set up
+    again once removed"""
+
+    def shared_content(org_id):
+        repos = [{'id': f'{org_id}{index}', 'name': f'repo{index}'} for index in range(2)]
+        return dict(
+            organization={'id': org_id},
+            setup_content_data=dict(
+                activation_key={'id': '1'},
+                content_view={'id': '2'},
+                product={'id': '3'},
+                repos=repos,
+                lce={'id': '4'},
+            ),
+        )
+
+    setup_shared_content.side_effect = [shared_content('10'), shared_content('11')]
+    org_info.side_effect = [CLIReturnCodeError(70, '', 'not found'), {'id': '11'}]
+    collection = get_collection(2)
+    collection._items[0]._repo_info = collection._items[1]._repo_info = None
+    setup_content_data = collection.setup_shared_content()
+    assert collection.organization == {'id': '11'}
+    assert collection.setup_content_data == setup_content_data
+    assert [repo.repo_info['id'] for repo in collection] == ['110', '111']
+    assert [call[1]['stale_org_id'] for call in setup_shared_content.call_args_list] == [
+        None,
+        '10',
+    ]
+    fingerprints = {call[1]['fingerprint'] for call in setup_shared_content.call_args_list}
+    assert fingerprints == {collection.get_content_fingerprint()}
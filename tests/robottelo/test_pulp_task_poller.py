@@ -0,0 +1,109 @@
+"""Tests for module ``robottelo.utils.pulp_task_poller``."""
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from robottelo import ssh
+from robottelo.utils import pulp_task_poller
+from robottelo.utils.pulp_task_poller import PulpTaskError
+from robottelo.utils.pulp_task_poller import PulpTaskPoller
+
+
+def task(repo_backend_id, state='finished', error=None, start_time=None):
+    return {
+        'tags': [f'pulp:repository:{repo_backend_id}', 'pulp:action:sync'],
+        'state': state,
+        'error': error,
+        'start_time': start_time,
+    }
+
+
+def response(*tasks, status_code=200):
+    return Mock(status_code=status_code, json=Mock(return_value=list(tasks)))
+
+
+@pytest.fixture
+def poller():
+    """Return a poller with a mocked session"""
+    poller = PulpTaskPoller('satellite.example.com')
+    poller._session = Mock()
+    with patch('robottelo.utils.pulp_task_poller.time.sleep') as sleep:
+        poller.sleep = sleep
+        yield poller
+
+
+@patch('robottelo.ssh.command', return_value=ssh.SSHCommandResult(stdout=['secret']))
+def test_pulp_password_cached(ssh_command):
+    """Assert the Pulp password is fetched once by server"""
+    with patch.dict(pulp_task_poller._pulp_passwords, clear=True):
+        assert pulp_task_poller.get_pulp_password('one.example.com') == 'secret'
+        assert pulp_task_poller.get_pulp_password('one.example.com') == 'secret'
+        pulp_task_poller.get_pulp_password('two.example.com')
+    assert [call[1]['hostname'] for call in ssh_command.call_args_list] == [
+        'one.example.com',
+        'two.example.com',
+    ]
+
+
+def test_wait_many_repositories(poller):
+    """Assert the sync tasks of the repositories are searched with one query,
+    until a task of each repository finished"""
+    poller.session.post.side_effect = [
+        response(task('repo1', state='running'), task('repo2', state='waiting')),
+        response(task('repo1', state='running'), task('repo2', state='running')),
+        response(task('repo1', state='running'), task('repo2')),
+        response(task('repo1')),
+    ]
+    poller.wait(['repo1', 'repo2'])
+    tags = [
+        call[1]['json']['criteria']['filters']['tags']['$in']
+        for call in poller.session.post.call_args_list
+    ]
+    assert tags == [
+        ['pulp:repository:repo1', 'pulp:repository:repo2'],
+        ['pulp:repository:repo1', 'pulp:repository:repo2'],
+        ['pulp:repository:repo1', 'pulp:repository:repo2'],
+        ['pulp:repository:repo1'],
+    ]
+    # the poll interval grows, and is reset as soon as a repository finished
+    assert [call[0][0] for call in poller.sleep.call_args_list] == [2, 4, 1]
+
+
+def test_wait_task_error(poller):
+    """Assert the wait fails when a sync task errored"""
+    poller.session.post.return_value = response(task('repo1', state='error', error='failed'))
+    with pytest.raises(AssertionError, match="repo_id repo1 errored or not found: 'failed'"):
+        poller.wait(['repo1'])
+
+
+def test_wait_newest_task(poller):
+    """Assert the wait is decided on the newest sync task of a repository, an
+    older finished sync does not hide a running or failed one"""
+    old_sync = task('repo1', start_time='2020-01-01T10:00:00Z')
+    poller.session.post.side_effect = [
+        response(task('repo1', state='running', start_time='2020-01-02T10:00:00Z'), old_sync),
+        response(old_sync, task('repo1', state='waiting')),
+        response(old_sync, task('repo1', start_time='2020-01-02T11:00:00Z')),
+    ]
+    poller.wait(['repo1'])
+    assert poller.session.post.call_count == 3
+    poller.session.post.side_effect = None
+    poller.session.post.return_value = response(
+        old_sync, task('repo1', state='error', error='failed', start_time='2020-01-02T10:00:00Z')
+    )
+    with pytest.raises(AssertionError, match="repo_id repo1 errored or not found: 'failed'"):
+        poller.wait(['repo1'])
+
+
+def test_wait_timeout(poller):
+    """Assert the wait fails when the search fails or the tasks are not
+    finished before the timeout, with a capped poll interval"""
+    poller.session.post.return_value = response(status_code=500)
+    with pytest.raises(PulpTaskError, match='failed with status 500'):
+        poller.wait(['repo1'])
+    poller.session.post.return_value = response()
+    with patch('robottelo.utils.pulp_task_poller.time.time', side_effect=range(0, 10000, 50)):
+        with pytest.raises(PulpTaskError, match='not found'):
+            poller.wait(['repo1'], timeout=1000)
+    assert max(call[0][0] for call in poller.sleep.call_args_list) == poller.max_interval
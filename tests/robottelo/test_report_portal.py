@@ -0,0 +1,94 @@
+"""Tests for module ``robottelo.report_portal.portal``."""
+import threading
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from robottelo.report_portal.portal import Launch
+from robottelo.report_portal.portal import ReportPortal
+
+LAUNCH_INFO = {
+    'id': 42,
+    'name': 'Satellite 6.8',
+    'statistics': {'executions': {}},
+    'tags': ['6.8.0-1.0'],
+}
+
+
+@pytest.fixture
+def report_portal():
+    """Return a report portal with a mocked session"""
+    with patch('robottelo.report_portal.portal.settings') as settings:
+        settings.report_portal.rp_url = 'https://rp.example.com'
+        settings.report_portal.rp_project = 'satellite6'
+        settings.report_portal.rp_key = 'key'
+        settings.report_portal.page_size = 100
+        settings.report_portal.max_workers = 3
+        rp = ReportPortal()
+    rp._session = Mock()
+    return rp
+
+
+def page_response(page, total_pages):
+    return Mock(
+        json=Mock(
+            return_value={
+                'page': {'totalPages': total_pages},
+                'content': [{'name': f'test_{page}'}],
+            }
+        )
+    )
+
+
+def test_settings(report_portal):
+    """Assert the page size and the max workers come from the settings"""
+    assert report_portal.page_size == 100
+    assert report_portal.max_workers == 3
+
+
+def test_session_shared():
+    """Assert the session is created once, with the API request headers"""
+    with patch('robottelo.report_portal.portal.settings') as settings:
+        settings.report_portal.rp_key = 'key'
+        settings.report_portal.max_workers = 3
+        rp = ReportPortal()
+    assert rp.session is rp.session
+    assert rp.session.headers['Authorization'] == 'Bearer key'
+    assert rp.session.get_adapter('https://rp.example.com')._pool_maxsize == 3
+
+
+def test_tests_pages_fan_out(report_portal):
+    """Assert the first page is fetched alone, then the other pages in the
+    workers pool, each with its own page number"""
+    threads = set()
+
+    def get(url, params):
+        threads.add(threading.current_thread().name)
+        return page_response(params['page.page'], 5)
+
+    report_portal.session.get.side_effect = get
+    tests = Launch(report_portal, LAUNCH_INFO).tests(status='failed')
+    assert sorted(tests) == [f'test_{page}' for page in range(1, 6)]
+    calls = report_portal.session.get.call_args_list
+    assert calls[0][1]['params']['page.page'] == 1
+    assert sorted(call[1]['params']['page.page'] for call in calls) == [1, 2, 3, 4, 5]
+    assert {call[1]['params']['page.size'] for call in calls} == {100}
+    assert {call[1]['params']['filter.eq.launch'] for call in calls} == {42}
+    assert len(threads - {threading.current_thread().name}) <= report_portal.max_workers
+
+
+def test_tests_defect_types_filter(report_portal):
+    """Assert one defect type is filtered with filter.eq, and several defect
+    types with one filter.in query"""
+    report_portal.session.get.return_value = page_response(1, 1)
+    launch = Launch(report_portal, LAUNCH_INFO)
+    launch.tests(defect_type='product_bug')
+    launch.tests(defect_type=['product_bug', 'automation_bug'])
+    first, second = [call[1]['params'] for call in report_portal.session.get.call_args_list]
+    assert first['filter.eq.issue$issue_type'] == 'PB001'
+    assert 'filter.in.issue$issue_type' not in first
+    assert second['filter.in.issue$issue_type'] == 'PB001,AB001'
+    assert 'filter.eq.issue$issue_type' not in second
+    with pytest.raises(ValueError, match='Invalid value \'unknown\''):
+        launch.tests(defect_type=['product_bug', 'unknown'])
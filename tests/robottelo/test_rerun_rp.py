@@ -0,0 +1,49 @@
+"""Tests for module ``pytest_plugins.rerun_rp.rerun_rp``."""
+from collections import namedtuple
+
+from pytest_plugins.rerun_rp.rerun_rp import _get_failed_tests
+from pytest_plugins.rerun_rp.rerun_rp import _get_test_collection
+
+Item = namedtuple('Item', 'location')
+
+
+class FakeLaunch:
+    def __init__(self, info, tests):
+        self.info = info
+        self._tests = tests
+        self.calls = []
+
+    def tests(self, **kwargs):
+        self.calls.append(kwargs)
+        return {name: {'name': name} for name in self._tests}
+
+
+def test_get_failed_tests_cached():
+    """Assert the failed tests of a launch are fetched again only if the launch changed"""
+    info = {'id': 1, 'status': 'FAILED', 'statistics': {'executions': {'failed': 1}}}
+    launch = FakeLaunch(info, ['tests/foreman/api/test_a.py::test_one'])
+    cached_tests = {}
+
+    tests = _get_failed_tests(launch, ['automation_bug', 'product_bug'], cached_tests)
+    assert tests == {'tests/foreman/api/test_a.py.test_one'}
+    assert launch.calls == [{'defect_type': ['automation_bug', 'product_bug']}]
+
+    assert _get_failed_tests(launch, ['product_bug', 'automation_bug'], cached_tests) == tests
+    assert len(launch.calls) == 1
+
+    launch.info = dict(info, statistics={'executions': {'failed': 2}})
+    launch._tests.append('tests/foreman/api/test_a.py::test_two')
+    tests = _get_failed_tests(launch, ['automation_bug', 'product_bug'], cached_tests)
+    assert len(tests) == 2
+    assert len(launch.calls) == 2
+
+
+def test_get_test_collection():
+    """Assert the items are selected if failed in the launch"""
+    items = [
+        Item(('tests/foreman/api/test_a.py', 10, 'test_one')),
+        Item(('tests/foreman/api/test_a.py', 20, 'test_two')),
+    ]
+    selected, deselected = _get_test_collection({'tests/foreman/api/test_a.py.test_one'}, items)
+    assert selected == items[:1]
+    assert deselected == items[1:]
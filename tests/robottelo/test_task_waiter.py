@@ -0,0 +1,103 @@
+"""Tests for module ``robottelo.utils.task_waiter``."""
+from types import SimpleNamespace
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+from nailgun import entity_mixins
+
+from robottelo.utils.task_waiter import TaskFailedError
+from robottelo.utils.task_waiter import TaskTimeoutError
+from robottelo.utils.task_waiter import TaskWaiter
+from robottelo.utils.task_waiter import wait_for_cli_tasks
+
+
+def task(task_id, state='stopped', result='success', label='sync'):
+    return SimpleNamespace(id=task_id, state=state, result=result, label=label)
+
+
+def found(*tasks):
+    return {task.id: task for task in tasks}
+
+
+@pytest.fixture(autouse=True)
+def no_sleep():
+    with patch('robottelo.utils.task_waiter.time.sleep') as sleep:
+        yield sleep
+
+
+def test_wait_tasks_and_search(no_sleep):
+    """Assert the tracked tasks and the search tasks are polled together, and
+    their futures completed as they finish"""
+    search_tasks = Mock(
+        side_effect=[
+            # the search
+            found(task(3, state='running', label='upload'), task(4, label='other')),
+            # the polls
+            found(task(1), task(2, state='running'), task(3, state='running')),
+            found(task(2), task(3)),
+        ]
+    )
+    waiter = TaskWaiter(search_tasks)
+    first = waiter.add(1)
+    second = waiter.add(2)
+    uploads = waiter.add_search('label = upload', match=lambda task: task.label == 'upload')
+    waiter.wait()
+    assert first.result().id == 1
+    assert second.result().id == 2
+    assert [task.id for task in uploads.result()] == [3]
+    queries = [call[0][0] for call in search_tasks.call_args_list]
+    assert queries == ['label = upload', 'id = 1 or id = 2 or id = 3', 'id = 2 or id = 3']
+    # the poll interval is reset as soon as a task finishes
+    assert no_sleep.call_count == 1
+
+
+def test_wait_fail_fast():
+    """Assert the wait fails as soon as a task fails"""
+    search_tasks = Mock(return_value=found(task(1, state='running'), task(2, result='error')))
+    waiter = TaskWaiter(search_tasks)
+    waiter.add(1)
+    failed = waiter.add(2)
+    with pytest.raises(TaskFailedError, match='Task 2 finished with result error'):
+        waiter.wait()
+    assert failed.exception().task.id == 2
+    assert failed.exception().task_id == 2
+    assert isinstance(failed.exception(), entity_mixins.TaskFailedError)
+    assert search_tasks.call_count == 1
+
+
+def test_search_not_found():
+    """Assert the wait fails when no task is found by a search"""
+    waiter = TaskWaiter(Mock(return_value={}))
+    waiter.add_search('label = sync', max_tries=3)
+    with pytest.raises(AssertionError, match="No task was found using query 'label = sync'"):
+        waiter.wait()
+    assert waiter.search_tasks.call_count == 3
+
+
+def test_wait_timeout(no_sleep):
+    """Assert the wait fails when the tasks are not finished at timeout, with
+    a growing poll interval"""
+    waiter = TaskWaiter(Mock(return_value=found(task(1, state='running'))), max_interval=2)
+    waiter.add(1)
+    with patch('robottelo.utils.task_waiter.time.time', side_effect=range(0, 10000, 50)):
+        with pytest.raises(entity_mixins.TaskTimedOutError) as context:
+            waiter.wait()
+    assert isinstance(context.value, TaskTimeoutError)
+    assert context.value.task_ids == [1]
+    intervals = [call[0][0] for call in no_sleep.call_args_list]
+    assert intervals == sorted(intervals)
+    assert intervals[-1] == 2
+
+
+@patch('robottelo.utils.task_waiter.Task.list_tasks')
+def test_wait_for_cli_tasks(list_tasks):
+    """Assert the hammer tasks are polled together with one task list call by
+    poll"""
+    list_tasks.side_effect = [
+        [{'id': 1, 'state': 'stopped', 'result': 'success'}, {'id': 2, 'state': 'running'}],
+        [{'id': 2, 'state': 'stopped', 'result': 'success'}],
+    ]
+    assert [task['id'] for task in wait_for_cli_tasks([1, 2])] == [1, 2]
+    queries = [call[0][0]['search'] for call in list_tasks.call_args_list]
+    assert queries == ['id = 1 or id = 2', 'id = 2']
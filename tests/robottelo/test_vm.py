@@ -13,11 +13,17 @@ from robottelo.constants import DISTRO_RHEL6
 from robottelo.constants import DISTRO_RHEL7
 from robottelo.constants import NO_REPOS_AVAILABLE
 from robottelo.constants import SM_OVERALL_STATUS
+from robottelo.vm import READINESS_PROBE_PATH
 from robottelo.vm import VirtualMachine
 from robottelo.vm import VirtualMachineError
 
 
 PROV_SERVER_DEFAULT = 'provisioning.example.com'
+DOMAIN = PROV_SERVER_DEFAULT.split('.', 1)[1]
+SSH_READY_EVENTS = [
+    f'ip-known vma.{DOMAIN} 1.234 10.8.30.135 qemu-ga',
+    f'ssh-ready vma.{DOMAIN} 5.678',
+]
 
 
 class TestVirtualMachine:
@@ -88,8 +94,9 @@ class TestVirtualMachine:
             ):
                 VirtualMachine()
 
-    def test_run(self, config_provisioning_server, host_os_version_patch):
-        """Check if run calls ssh.command"""
+    @patch('robottelo.ssh.get_client')
+    def test_run(self, get_client, config_provisioning_server, host_os_version_patch):
+        """Check if run calls the virtual machine SSH client, opened once"""
         vm = VirtualMachine()
 
         def create_mock():
@@ -100,9 +107,61 @@ class TestVirtualMachine:
         with patch.object(vm, 'create', side_effect=create_mock):
             vm.create()
 
-        with patch('robottelo.ssh.command') as ssh_mock:
-            vm.run('ls')
-            ssh_mock.assert_called_once_with('ls', hostname='192.168.0.1', timeout=None)
+        vm.run('ls')
+        vm.run('pwd', timeout=10)
+        get_client.assert_called_once_with(hostname='192.168.0.1')
+        assert get_client.return_value.run.call_args_list == [
+            call('ls', timeout=None),
+            call('pwd', timeout=10),
+        ]
+
+    @patch('robottelo.ssh.get_client')
+    def test_run_batch(self, get_client, config_provisioning_server, host_os_version_patch):
+        """Check if run_batch runs all the commands in one SSH command"""
+        vm = VirtualMachine()
+        vm._created = True
+        vm.run_batch(['rpm -Uvh ca.rpm', 'rpm -q ca'], stop_on_error=False)
+        vm.run_batch(['echo a || echo b', 'ls'])
+        assert get_client.return_value.run.call_args_list == [
+            call('{ rpm -Uvh ca.rpm; }; { rpm -q ca; }', timeout=None),
+            call('{ echo a || echo b; } && { ls; }', timeout=None),
+        ]
+
+    @patch('robottelo.ssh.command')
+    @patch('robottelo.ssh.get_client')
+    def test_configure_rhel_repo_batched(
+        self, get_client, ssh_command, config_provisioning_server, host_os_version_patch
+    ):
+        """Check if the RHEL repository command is run in the configure_puppet
+        batch, and alone by configure_rhel_repo"""
+        get_client.return_value.run.return_value = ssh.SSHCommandResult()
+        vm = VirtualMachine()
+        vm._created = True
+        vm.configure_rhel_repo('http://example.com/rhel.repo')
+        vm.configure_puppet('http://example.com/rhel.repo', proxy_hostname='capsule.example.com')
+        command = 'wget -O /etc/yum.repos.d/rhel.repo http://example.com/rhel.repo'
+        assert VirtualMachine.rhel_repo_command('http://example.com/rhel.repo') == command
+        commands = [args[0][0] for args in get_client.return_value.run.call_args_list]
+        assert commands[0] == command
+        assert commands[1] == '{{ {0}; }}; {{ yum install puppet -y; }}'.format(command)
+
+    @patch('robottelo.ssh.command')
+    @patch('robottelo.ssh.get_client')
+    def test_ssh_client_reconnect_and_close(
+        self, get_client, ssh_command, config_provisioning_server, host_os_version_patch
+    ):
+        """Check if the SSH client is opened again when its connection is
+        lost, and closed on destroy"""
+        vm = VirtualMachine()
+        vm._created = True
+        client = vm.ssh_client
+        client.get_transport.return_value.is_active.return_value = False
+        assert vm.ssh_client is client
+        assert get_client.call_count == 2
+        with patch.object(vm, 'image_dir', '/opt/robottelo/images'):
+            vm.destroy()
+        client.close.assert_called_once_with()
+        assert vm._ssh_client is None
 
     def test_name_limit(self, vm_settings_patch, config_provisioning_server):
         """Check whether exception is risen in case of too long host name (more
@@ -117,7 +176,7 @@ class TestVirtualMachine:
         with pytest.raises(VirtualMachineError):
             vm.run('ls')
 
-    @patch('time.sleep')
+    @patch('robottelo.vm.upload_readiness_probe', return_value=READINESS_PROBE_PATH)
     @patch(
         'robottelo.ssh.command',
         side_effect=[
@@ -125,24 +184,22 @@ class TestVirtualMachine:
                 return_code=0,
                 stdout=['CPUs:     1', 'Memory:   512 MB', 'MAC:      52:54:00:f7:bb:a8'],
             ),
-            ssh.SSHCommandResult(return_code=1, stderr=''),
-            ssh.SSHCommandResult(stdout=['(192.168.0.1)']),
-            ssh.SSHCommandResult(),
+            ssh.SSHCommandResult(stdout=SSH_READY_EVENTS),
         ],
     )
     def test_dont_create_if_already_created(
-        self, ssh__mock, sleep, config_provisioning_server, host_os_version_patch
+        self, ssh__mock, upload_readiness_probe, config_provisioning_server, host_os_version_patch
     ):
         """Check if the creation steps are run more than once"""
-        vm = VirtualMachine()
+        vm = VirtualMachine(target_image='vma')
 
         with patch.multiple(
             vm, image_dir='/opt/robottelo/images', provisioning_server=PROV_SERVER_DEFAULT
         ):
             vm.create()
             vm.create()
-        assert vm.ip_addr == '192.168.0.1'
-        assert ssh__mock.call_count == 4
+        assert vm.ip_addr == '10.8.30.135'
+        assert ssh__mock.call_count == 2
 
     @patch('robottelo.ssh.command')
     def test_destroy(self, ssh_command, config_provisioning_server, host_os_version_patch):
@@ -175,7 +232,25 @@ class TestVirtualMachine:
 
         assert ssh_command.call_args_list == ssh_command_args_list
 
-    @patch('time.sleep')
+    @patch('robottelo.vm.teardown_service')
+    @patch('robottelo.ssh.command')
+    def test_destroy_async(
+        self, ssh_command, teardown_service, config_provisioning_server, host_os_version_patch
+    ):
+        """Check if destroy queues the virtual machine teardown when async"""
+        image_dir = '/opt/robottelo/images'
+        vm = VirtualMachine()
+
+        with patch.multiple(vm, image_dir=image_dir, _created=True):
+            vm.destroy(async_=True)
+
+        assert ssh_command.call_count == 0
+        image_path = f'{image_dir}/{vm.hostname}.img'
+        teardown_service.submit.assert_called_once_with(
+            PROV_SERVER_DEFAULT, vm.hostname, image_path, connection_timeout=30
+        )
+
+    @patch('robottelo.ssh.upload_file')
     @patch(
         'robottelo.ssh.command',
         side_effect=[
@@ -183,28 +258,46 @@ class TestVirtualMachine:
                 return_code=0,
                 stdout=['CPUs:     1', 'Memory:   512 MB', 'MAC:      52:54:00:f7:bb:a8'],
             ),
-            ssh.SSHCommandResult(
-                stdout=[
-                    '{"return":[{"name":"lo","ip-addresses":[{"ip-address-type":"ipv4",'
-                    '"ip-address":"127.0.0.1","prefix":8}],'
-                    '"hardware-address":"00:00:00:00:00:00"}'
-                    ',{"name":"ens3","ip-addresses":[{"ip-address-type":"ipv4",'
-                    '"ip-address":"10.8.30.135","prefix":19}],'
-                    '"hardware-address":"52:54:00:f7:bb:a8"}]}'
-                ]
-            ),
+            # the probe is not on the host yet
+            ssh.SSHCommandResult(return_code=1),
             ssh.SSHCommandResult(),
+            ssh.SSHCommandResult(stdout=SSH_READY_EVENTS),
         ],
     )
-    def test_qemu_ga_gets_ip(
-        self, ssh_command, sleep, config_provisioning_server, host_os_version_patch
+    def test_readiness_probe(
+        self, ssh_command, upload_file, config_provisioning_server, host_os_version_patch
     ):
-        """Verify that the IP is correctly parsed from the qemu-guest-agent output"""
-        vm = VirtualMachine()
+        """Verify that the IP and the boot timings are parsed from the readiness
+        probe events, and the probe is uploaded only when it is not on the host,
+        moved in place from a unique path"""
+        vm = VirtualMachine(target_image='vma')
         vm.create()
         assert vm.ip_addr == '10.8.30.135'
+        assert vm.boot_timings['ip_source'] == 'qemu-ga'
+        assert vm.boot_timings['snap_guest'] <= vm.boot_timings['ip_known']
+        assert vm.boot_timings['ip_known'] < vm.boot_timings['ssh_ready']
+        commands = [call[0][0] for call in ssh_command.call_args_list]
+        assert commands[1] == f'test -f {READINESS_PROBE_PATH}'
+        upload_path = upload_file.call_args[0][1]
+        assert upload_path.startswith(f'{READINESS_PROBE_PATH}.')
+        assert commands[2] == f'mv -f {upload_path} {READINESS_PROBE_PATH}'
+        assert commands[3].startswith(f'bash {READINESS_PROBE_PATH} ')
+        assert commands[3].endswith(f'vma.{DOMAIN} 52:54:00:f7:bb:a8 vma')
+        assert upload_file.call_count == 1
+
+        ssh_command.side_effect = [
+            ssh.SSHCommandResult(stdout=['MAC:      52:54:00:f7:bb:a9']),
+            ssh.SSHCommandResult(),
+            ssh.SSHCommandResult(stdout=[f'ip-known vmb.{DOMAIN} 1.0 10.8.30.136 avahi']),
+        ] + [ssh.SSHCommandResult()] * 3
+        other_vm = VirtualMachine(target_image='vmb')
+        with pytest.raises(VirtualMachineError, match='Failed to connect to SSH port'):
+            other_vm.create()
+        assert upload_file.call_count == 1
+        # the virtual machine was destroyed
+        assert ssh_command.call_args_list[-1][0][0].endswith(f'/vmb.{DOMAIN}.img')
 
-    @patch('time.sleep')
+    @patch('robottelo.vm.upload_readiness_probe', return_value=READINESS_PROBE_PATH)
     @patch(
         'robottelo.ssh.command',
         side_effect=[
@@ -212,28 +305,58 @@ class TestVirtualMachine:
                 return_code=0,
                 stdout=['CPUs:     1', 'Memory:   512 MB', 'MAC:      52:54:00:f7:bb:a8'],
             ),
-            ssh.SSHCommandResult(
-                stdout=[
-                    '{"return":[{"name":"lo","ip-addresses":[{"ip-address-type":"ipv4",'
-                    '"ip-address":"127.0.0.1","prefix":8}],'
-                    '"hardware-address":"00:00:00:00:00:00"},'
-                    '{"name":"ens3","ip-addresses":[{"ip-address-type":"ipv4",'
-                    '"ip-address":"10.8.30.135","prefix":19}],'
-                    '"hardware-address":"52:54:00:f7:bb:a8"}]}'
-                ]
-            ),
-            ssh.SSHCommandResult(),
-            ssh.SSHCommandResult(stdout=SM_OVERALL_STATUS['current']),
-            ssh.SSHCommandResult(stdout=NO_REPOS_AVAILABLE),
+            ssh.SSHCommandResult(stdout=SSH_READY_EVENTS),
         ],
     )
+    @patch('robottelo.ssh.get_client')
     def test_subscription_manager_overall_status(
-        self, ssh_command, sleep, config_provisioning_server, host_os_version_patch
+        self,
+        get_client,
+        ssh_command,
+        upload_readiness_probe,
+        config_provisioning_server,
+        host_os_version_patch,
     ):
-        vm = VirtualMachine()
+        get_client.return_value.run.side_effect = [
+            ssh.SSHCommandResult(stdout=SM_OVERALL_STATUS['current']),
+            ssh.SSHCommandResult(stdout=NO_REPOS_AVAILABLE),
+        ]
+        vm = VirtualMachine(target_image='vma')
         vm.create()
         assert vm.subscription_manager_status().stdout == 'Overall Status: Current'
         assert (
             vm.subscription_manager_list_repos().stdout
             == 'This system has no repositories available through subscriptions.'
         )
+
+    @patch('robottelo.vm.upload_readiness_probe', return_value=READINESS_PROBE_PATH)
+    @patch('robottelo.ssh.command')
+    def test_create_many(
+        self,
+        ssh_command,
+        upload_readiness_probe,
+        config_provisioning_server,
+        host_os_version_patch,
+    ):
+        """Check the virtual machines are created together, with one readiness
+        probe for all of them"""
+        macs = {'vma': '52:54:00:f7:bb:a8', 'vmb': '52:54:00:f7:bb:a9'}
+
+        def command(cmd, hostname, timeout=None, connection_timeout=None):
+            if cmd.startswith('snap-guest'):
+                target = next(target for target in macs if f'-t {target}' in cmd)
+                return ssh.SSHCommandResult(stdout=[f'MAC:      {macs[target]}'])
+            assert f'vma.{DOMAIN} {macs["vma"]} vma vmb.{DOMAIN} {macs["vmb"]} vmb' in cmd
+            return ssh.SSHCommandResult(
+                stdout=[
+                    f'ip-known vmb.{DOMAIN} 0.5 10.8.30.2 avahi',
+                    f'ip-known vma.{DOMAIN} 0.8 10.8.30.1 qemu-ga',
+                    f'ssh-ready vma.{DOMAIN} 3.2',
+                    f'ssh-ready vmb.{DOMAIN} 3.4',
+                ]
+            )
+
+        ssh_command.side_effect = command
+        vms = VirtualMachine.create_many([{'target_image': 'vma'}, {'target_image': 'vmb'}])
+        assert [vm.ip_addr for vm in vms] == ['10.8.30.1', '10.8.30.2']
+        assert ssh_command.call_count == 3
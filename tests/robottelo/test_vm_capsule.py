@@ -0,0 +1,103 @@
+"""Tests for :mod:`robottelo.vm_capsule`."""
+from unittest.mock import patch
+
+import pytest
+
+from robottelo import ssh
+from robottelo.config.base import DistroSettings
+from robottelo.constants import DISTRO_RHEL7
+from robottelo.decorators.func_locker import locking_function
+from robottelo.vm_capsule import _claim_image_cache_name
+from robottelo.vm_capsule import CapsuleVirtualMachine
+
+PROV_SERVER = 'provisioning.example.com'
+
+
+@pytest.fixture
+def capsule_settings():
+    """Configure the capsule and the provisioning server"""
+    with patch('robottelo.vm.settings', spec=True) as vm_settings, patch(
+        'robottelo.vm_capsule.settings', vm_settings
+    ), patch('robottelo.vm_capsule.setting_is_set', return_value=True), patch(
+        'robottelo.vm_capsule.get_sat_version', return_value='6.8'
+    ):
+        vm_settings.clients.provisioning_server = PROV_SERVER
+        vm_settings.clients.image_dir = '/opt/robottelo/images'
+        vm_settings.distro = DistroSettings()
+        vm_settings.distro.image_el7 = 'rhel7'
+        vm_settings.capsule.instance_name = 'capsule'
+        vm_settings.server.hostname = 'satellite.example.com'
+        yield vm_settings
+
+
+@patch('robottelo.ssh.command')
+def test_use_image_cache(ssh_command, capsule_settings):
+    """Assert the capsule boots from its saved image with a hostname derived
+    from it"""
+    ssh_command.side_effect = [ssh.SSHCommandResult(return_code=1), ssh.SSHCommandResult()]
+    capsule = CapsuleVirtualMachine(distro=DISTRO_RHEL7, image_cache=True)
+    cache_name = capsule._get_image_cache_name()
+    assert cache_name.startswith('rhel7-base-capsule-')
+    assert capsule._use_image_cache()
+    instance_name = f'{cache_name[-4:]}-capsule'
+    assert capsule.hostname == f'{instance_name}.example.com'
+    assert capsule._source_image == cache_name
+    assert ssh_command.call_args_list[0][0][0] == f'virsh dominfo {instance_name}'
+    assert ssh_command.call_args_list[1][0][0] == (
+        f'test -f /opt/robottelo/images/{cache_name}.img'
+    )
+
+
+@patch('robottelo.ssh.command', return_value=ssh.SSHCommandResult())
+def test_image_cache_in_use(ssh_command, capsule_settings):
+    """Assert the capsule is set up from scratch when its saved image is used
+    by a running capsule"""
+    capsule = CapsuleVirtualMachine(distro=DISTRO_RHEL7, image_cache=True)
+    hostname = capsule.hostname
+    assert not capsule._use_image_cache()
+    assert capsule.hostname == hostname
+    assert capsule._image_cache_name is None
+
+
+@patch.object(CapsuleVirtualMachine, '_save_image_cache')
+@patch.object(CapsuleVirtualMachine, '_setup_capsule')
+@patch.object(CapsuleVirtualMachine, '_refresh_capsule')
+@patch('robottelo.vm.VirtualMachine.create')
+def test_create_from_image_cache(
+    vm_create, refresh_capsule, setup_capsule, save_image_cache, capsule_settings
+):
+    """Assert a capsule booted from its saved image is only refreshed, and
+    the image of a capsule set up from scratch is saved"""
+    capsule = CapsuleVirtualMachine(distro=DISTRO_RHEL7, image_cache=True)
+    with patch.object(capsule, '_use_image_cache', return_value=True):
+        capsule.create()
+    refresh_capsule.assert_called_once_with()
+    setup_capsule.assert_not_called()
+
+    capsule = CapsuleVirtualMachine(distro=DISTRO_RHEL7, image_cache=True)
+    capsule._image_cache_name = 'rhel7-base-capsule-0123456789ab'
+    with patch.object(capsule, '_use_image_cache', return_value=False):
+        capsule.create()
+    setup_capsule.assert_called_once_with()
+    save_image_cache.assert_called_once_with()
+
+
+@patch.object(CapsuleVirtualMachine, '_save_image_cache')
+@patch.object(CapsuleVirtualMachine, '_setup_capsule')
+@patch.object(CapsuleVirtualMachine, '_use_image_cache')
+@patch('robottelo.vm.VirtualMachine.create')
+def test_create_image_cache_name_claimed(
+    vm_create, use_image_cache, setup_capsule, save_image_cache, capsule_settings
+):
+    """Assert a capsule is set up from scratch with its unique name while an
+    other capsule is claiming the name of the saved image"""
+    capsule = CapsuleVirtualMachine(distro=DISTRO_RHEL7, image_cache=True)
+    hostname = capsule.hostname
+    with locking_function(
+        _claim_image_cache_name, scope=PROV_SERVER, scope_context=capsule._get_image_cache_name(),
+    ):
+        capsule.create()
+    use_image_cache.assert_not_called()
+    setup_capsule.assert_called_once_with()
+    save_image_cache.assert_not_called()
+    assert capsule.hostname == hostname
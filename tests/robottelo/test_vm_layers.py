@@ -0,0 +1,92 @@
+"""Tests for :mod:`robottelo.vm_layers`."""
+from unittest.mock import Mock
+from unittest.mock import patch
+
+import pytest
+
+from robottelo import ssh
+from robottelo.vm import VirtualMachineError
+from robottelo.vm_layers import IMAGE_LAYER_MAX_AGE
+from robottelo.vm_layers import ImageLayer
+from robottelo.vm_layers import ImageLayerCache
+
+PROV_SERVER = 'provisioning.example.com'
+IMAGE_DIR = '/opt/robottelo/images'
+
+
+def get_vm():
+    """Return a virtual machine to boot from a layer"""
+    return Mock(provisioning_server=PROV_SERVER, image_dir=IMAGE_DIR, _source_image='rhel7-base')
+
+
+def test_image_name():
+    """Assert the layer image name changes with the source image and the
+    steps, not with the identity steps"""
+    layer = ImageLayer('client', ['rpm -Uvh ca.rpm'], ['subscription-manager register'])
+    image_name = layer.get_image_name('rhel7-base')
+    assert image_name.startswith('rhel7-base-client-')
+    assert image_name == ImageLayer('client', ['rpm -Uvh ca.rpm']).get_image_name('rhel7-base')
+    assert image_name != layer.get_image_name('rhel8-base')
+    assert image_name != ImageLayer('client', ['rpm -Uvh a.rpm']).get_image_name('rhel7-base')
+
+
+@patch('robottelo.vm.VirtualMachine')
+@patch('robottelo.ssh.command')
+def test_get_image_builds_once(ssh_command, virtual_machine):
+    """Assert a missing or stale layer image is built once, from a virtual
+    machine running the layer steps, replaces the stale image and removes the
+    unused layer images"""
+    ssh_command.side_effect = [
+        ssh.SSHCommandResult(return_code=1),
+        ssh.SSHCommandResult(),
+        ssh.SSHCommandResult(),
+    ]
+    builder = virtual_machine.return_value
+    builder.target_image = 'builder.example.com'
+    builder.run_batch.return_value = ssh.SSHCommandResult()
+    layer = ImageLayer('client', ['rpm -Uvh ca.rpm', 'yum install -y katello-agent'])
+    cache = ImageLayerCache()
+    vm = get_vm()
+    image_name = layer.get_image_name('rhel7-base')
+    assert cache.get_image(layer, vm) == image_name
+    assert cache.get_image(layer, vm) == image_name
+    assert ssh_command.call_count == 3
+    image_path = f'{IMAGE_DIR}/{image_name}.img'
+    commands = [call[0][0] for call in ssh_command.call_args_list]
+    assert commands[0] == (
+        f'test {image_path} -nt {IMAGE_DIR}/rhel7-base.img && touch -c {image_path}'
+    )
+    assert commands[1].endswith(f'mv -f {IMAGE_DIR}/builder.example.com.img {image_path}')
+    assert commands[2] == (
+        f"find {IMAGE_DIR} -maxdepth 1 -name 'rhel7-base-client-*.img' "
+        f"-mtime +{IMAGE_LAYER_MAX_AGE} -print -delete"
+    )
+    builder.create.assert_called_once_with()
+    assert builder.run_batch.call_args_list[0][0][0] == layer.steps
+    builder.destroy.assert_not_called()
+
+
+@patch('robottelo.vm.VirtualMachine')
+@patch('robottelo.ssh.command', return_value=ssh.SSHCommandResult(return_code=1))
+def test_get_image_build_failure(ssh_command, virtual_machine):
+    """Assert the build virtual machine is destroyed when a layer step fails"""
+    builder = virtual_machine.return_value
+    builder.run_batch.return_value = ssh.SSHCommandResult(return_code=1, stderr='error')
+    with pytest.raises(VirtualMachineError, match='Failed to build the client layer image'):
+        ImageLayerCache().get_image(ImageLayer('client', ['false']), get_vm())
+    builder.destroy.assert_called_once_with()
+
+
+def test_apply_identity():
+    """Assert the identity steps commands and callables are run on the
+    virtual machine"""
+    register = Mock()
+    layer = ImageLayer('client', [], ['service goferd restart', register])
+    vm = get_vm()
+    vm.run.return_value = ssh.SSHCommandResult()
+    layer.apply_identity(vm)
+    vm.run.assert_called_once_with('service goferd restart')
+    register.assert_called_once_with(vm)
+    vm.run.return_value = ssh.SSHCommandResult(return_code=1)
+    with pytest.raises(VirtualMachineError, match='identity step'):
+        layer.apply_identity(vm)
@@ -0,0 +1,105 @@
+"""Tests for :mod:`robottelo.vm_pool`."""
+from unittest.mock import patch
+
+import pytest
+
+from robottelo import ssh
+from robottelo.constants import DISTRO_RHEL7
+from robottelo.vm import VirtualMachineError
+from robottelo.vm_pool import CLEAN_SNAPSHOT_NAME
+from robottelo.vm_pool import VirtualMachinePool
+
+PROV_SERVER = 'provisioning.example.com'
+
+
+class FakeVirtualMachine:
+    """Virtual machine created and destroyed without provisioning server"""
+
+    instances = []
+
+    def __init__(self, distro=None, provisioning_server=None):
+        self.distro = distro
+        self.provisioning_server = provisioning_server
+        self.target_image = 'vm{}'.format(len(self.instances))
+        self.hostname = self.target_image
+        self.created = False
+        self.destroyed = False
+        self.subscribed = False
+        self.instances.append(self)
+
+    def create(self):
+        self.created = True
+
+    def destroy(self):
+        self.destroyed = True
+
+    def unregister(self):
+        self.subscribed = False
+
+    def close_ssh_client(self):
+        self.ssh_closed = True
+
+
+@pytest.fixture
+def ssh_command():
+    FakeVirtualMachine.instances = []
+    with patch('robottelo.ssh.command', return_value=ssh.SSHCommandResult()) as ssh_mock:
+        yield ssh_mock
+
+
+def get_pool(**kwargs):
+    kwargs.setdefault('size', 1)
+    kwargs.setdefault('max_vms', 2)
+    return VirtualMachinePool(vm_class=FakeVirtualMachine, **kwargs)
+
+
+def test_lease_reverts_and_reuses(ssh_command):
+    """Assert a returned virtual machine is reverted to its clean snapshot and
+    leased again"""
+    pool = get_pool(size=0)
+    with pool.lease(DISTRO_RHEL7, PROV_SERVER) as vm:
+        assert vm.created
+        vm.subscribed = True
+    for thread in pool._threads:
+        thread.join()
+    with pool.lease(DISTRO_RHEL7, PROV_SERVER) as same_vm:
+        assert same_vm is vm
+        assert not same_vm.subscribed
+        assert same_vm.ssh_closed
+    commands = [args[0] for args, _ in ssh_command.call_args_list]
+    assert f'virsh snapshot-create-as vm0 {CLEAN_SNAPSHOT_NAME}' in commands
+    assert f'virsh snapshot-revert --running vm0 {CLEAN_SNAPSHOT_NAME}' in commands
+    pool.close()
+    assert all(vm.destroyed for vm in FakeVirtualMachine.instances)
+
+
+def test_fill_within_server_limit(ssh_command):
+    """Assert the pool is filled up to its size within the provisioning
+    server limit"""
+    pool = get_pool(size=3, max_vms=2)
+    pool.fill(DISTRO_RHEL7, PROV_SERVER, wait=True)
+    assert len(FakeVirtualMachine.instances) == 2
+    assert len(pool._idle[PROV_SERVER, DISTRO_RHEL7]) == 2
+    pool.close()
+
+
+def test_lease_timeout(ssh_command):
+    """Assert the lease fails when the provisioning server limit is reached
+    and no virtual machine is returned"""
+    pool = get_pool(max_vms=1, lease_timeout=0.1)
+    with pool.lease(DISTRO_RHEL7, PROV_SERVER):
+        with pytest.raises(VirtualMachineError, match='Timeout'):
+            with pool.lease(DISTRO_RHEL7, PROV_SERVER):
+                pass
+    pool.close()
+
+
+def test_failed_revert_destroys(ssh_command):
+    """Assert a virtual machine that could not be reverted is destroyed"""
+    pool = get_pool(size=0)
+    with pool.lease(DISTRO_RHEL7, PROV_SERVER) as vm:
+        ssh_command.return_value = ssh.SSHCommandResult(return_code=1, stderr='error')
+    pool.close()
+    assert vm.destroyed
+    assert pool._counts[PROV_SERVER] == 0
+    assert not pool._idle[PROV_SERVER, DISTRO_RHEL7]
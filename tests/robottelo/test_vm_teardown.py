@@ -0,0 +1,72 @@
+"""Tests for :mod:`robottelo.vm_teardown`."""
+from unittest.mock import patch
+
+from robottelo import ssh
+from robottelo.vm_teardown import leak_report
+from robottelo.vm_teardown import load_results
+from robottelo.vm_teardown import teardown_command
+from robottelo.vm_teardown import TeardownJob
+from robottelo.vm_teardown import TeardownService
+
+HOST = 'provisioning.example.com'
+IMAGE_PATH = '/opt/robottelo/images/vm.example.com.img'
+
+
+@patch('robottelo.ssh.command', return_value=ssh.SSHCommandResult())
+def test_teardown_single_command(ssh_command):
+    """Assert the queued virtual machines are destroyed with one SSH command
+    by a background worker"""
+    service = TeardownService(workers=2, retry_delay=0)
+    service.submit(HOST, 'vm.example.com', IMAGE_PATH, connection_timeout=30)
+    service.submit(HOST, 'other.example.com', IMAGE_PATH.replace('vm.', 'other.'))
+    service.flush()
+    assert ssh_command.call_count == 2
+    ssh_command.assert_any_call(
+        teardown_command('vm.example.com', IMAGE_PATH), hostname=HOST, connection_timeout=30
+    )
+    assert service.destroyed_count == 2
+    assert service.leaks == []
+
+
+@patch('robottelo.ssh.command')
+def test_teardown_retry_and_leak(ssh_command):
+    """Assert a failed teardown is retried, then reported as leaked"""
+    ssh_command.side_effect = [
+        ssh.SSHCommandResult(return_code=1, stderr='error'),
+        ssh.SSHCommandResult(),
+        ssh.SSHCommandResult(return_code=1, stderr='error'),
+        Exception('unreachable'),
+    ]
+    service = TeardownService(workers=1, retries=2, retry_delay=0)
+    service.submit(HOST, 'vm.example.com', IMAGE_PATH)
+    leaked_image_path = '/opt/robottelo/images/leaked.img'
+    service.submit(HOST, 'leaked.example.com', leaked_image_path)
+    service.flush()
+    assert ssh_command.call_count == 4
+    assert service.destroyed_count == 1
+    assert [(job.domain, error) for job, error in service.leaks] == [
+        ('leaked.example.com', 'unreachable')
+    ]
+    report = service.leak_report()
+    assert report[0] == '1 virtual machines destroyed in the background, 1 leaked'
+    assert report[1] == f'{HOST}: leaked.example.com {leaked_image_path} - unreachable'
+
+
+def test_merge_processes_results(monkeypatch, tmp_path):
+    """Assert the teardown results saved by each process in the session
+    directory are merged in one leak report"""
+    for worker, destroyed_count, domain in [('gw0', 2, 'vm0.example.com'), ('gw1', 1, None)]:
+        monkeypatch.setenv('PYTEST_XDIST_WORKER', worker)
+        service = TeardownService()
+        service.destroyed_count = destroyed_count
+        if domain:
+            service.leaks.append((TeardownJob(HOST, domain, IMAGE_PATH, 30), 'unreachable'))
+        service.save_results(str(tmp_path))
+    assert sorted(path.name.split('-')[0] for path in tmp_path.iterdir()) == ['gw0', 'gw1']
+    destroyed_count, leaks = load_results(str(tmp_path))
+    assert destroyed_count == 3
+    assert leaks == [(TeardownJob(HOST, 'vm0.example.com', IMAGE_PATH, 30), 'unreachable')]
+    assert leak_report(destroyed_count, leaks) == [
+        '3 virtual machines destroyed in the background, 1 leaked',
+        f'{HOST}: vm0.example.com {IMAGE_PATH} - unreachable',
+    ]